@@ -0,0 +1,125 @@
+"""
+Video abuse signals kept as hourly counters in the database.
+
+The VideoAccessLog flusher folds every batch of new rows and URL reuses into
+VideoAccessHourly, in the same transaction as the raw rows: per (hour, user,
+video) request counts and the highest 24 h distinct-IP count seen that hour.
+The admin abuse detector sums the last 24 hours of counters instead of
+aggregating the log table, and lists flagged rows through a partial index
+that only holds flagged events. Works the same with LocMem or Redis.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max, Sum
+
+from .models import VideoAccessHourly, VideoAccessLog
+
+BUCKET_SECONDS = 60 * 60
+WINDOW_BUCKETS = 24
+MAX_FLAGGED = 100
+
+
+def high_request_threshold() -> int:
+    return int(getattr(settings, "VIDEO_ABUSE_HIGH_REQUESTS_24H", 30))
+
+
+def multi_ip_threshold() -> int:
+    return int(getattr(settings, "VIDEO_ABUSE_MULTI_IP_24H", 3))
+
+
+def _hour_of(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts - ts % BUCKET_SECONDS, tz=dt_timezone.utc)
+
+
+def window_start(now: float | None = None) -> datetime:
+    """Start of the oldest hour in the current 24 h window."""
+    now = now if now is not None else time.time()
+    return _hour_of(now) - timedelta(seconds=BUCKET_SECONDS * (WINDOW_BUCKETS - 1))
+
+
+def record_batch(rows, reuses: dict | None = None) -> None:
+    """
+    Fold flushed VideoAccessLog rows (with their transient distinct_ips count)
+    and reuse increments {(user_id, video_id, expires): [count, at]} into the
+    hourly counters. Call inside the transaction that inserted the rows.
+    """
+    if not rows and not reuses:
+        return
+    now = time.time()
+    counts: dict[tuple, list[int]] = {}
+    for row in rows:
+        at = row.requested_at.timestamp() if row.requested_at else now
+        c = counts.setdefault((_hour_of(at), row.user_id, row.video_id), [0, 0])
+        c[0] += 1
+        c[1] = max(c[1], int(getattr(row, "distinct_ips", 0) or 0))
+    hour = _hour_of(now)
+    for (user_id, video_id, _expires), (count, _at) in (reuses or {}).items():
+        c = counts.setdefault((hour, user_id, video_id), [0, 0])
+        c[0] += int(count)
+
+    # Insert missing counters first so the locking read below sees (and locks) every
+    # one of them; a concurrent flusher then waits instead of losing its increment.
+    VideoAccessHourly.objects.bulk_create(
+        [VideoAccessHourly(hour=h, user_id=u, video_id=v) for h, u, v in counts],
+        ignore_conflicts=True,
+    )
+    existing = VideoAccessHourly.objects.select_for_update().filter(
+        hour__in={h for h, _u, _v in counts},
+        user_id__in={u for _h, u, _v in counts},
+        video_id__in={v for _h, _u, v in counts},
+    )
+    changed = []
+    for counter in existing:
+        c = counts.get((counter.hour, counter.user_id, counter.video_id))
+        if c is None:
+            continue
+        counter.requests += c[0]
+        counter.distinct_ips = max(counter.distinct_ips, c[1])
+        changed.append(counter)
+    VideoAccessHourly.objects.bulk_update(changed, ["requests", "distinct_ips"], batch_size=500)
+
+
+def prune(before: datetime) -> int:
+    """Delete counters for hours before `before` (they are past every window)."""
+    deleted, _ = VideoAccessHourly.objects.filter(hour__lt=before).delete()
+    return deleted
+
+
+def top_offenders(min_requests: int | None = None, min_ips: int | None = None) -> dict:
+    """Current offenders over the 24 h window, sorted worst first."""
+    min_requests = high_request_threshold() if min_requests is None else min_requests
+    min_ips = multi_ip_threshold() if min_ips is None else min_ips
+    since = window_start()
+    window = VideoAccessHourly.objects.filter(hour__gte=since)
+    high = (
+        window.values("user_id")
+        .annotate(total=Sum("requests"))
+        .filter(total__gte=min_requests)
+        .order_by("-total")
+        .values_list("user_id", "total")
+    )
+    multi = (
+        window.values("user_id", "video_id")
+        .annotate(ips=Max("distinct_ips"))
+        .filter(ips__gte=min_ips)
+        .order_by("-ips")
+        .values_list("user_id", "video_id", "ips")
+    )
+    flagged = (
+        VideoAccessLog.objects.filter(risk_level=VideoAccessLog.RISK_FLAG, requested_at__gte=since)
+        .order_by("-requested_at")
+        .values_list("user_id", "video_id", "ip_address", "requested_at", "risk_level")[:MAX_FLAGGED]
+    )
+    return {
+        "high_frequency": list(high),
+        "multi_ip": [((uid, vid), n) for uid, vid, n in multi],
+        "flagged": [
+            {"user_id": uid, "video_id": vid, "ip": ip, "at": at.timestamp(), "risk": risk}
+            for uid, vid, ip, at, risk in flagged
+        ],
+        "since": since.timestamp(),
+    }
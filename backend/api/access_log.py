@@ -0,0 +1,249 @@
+"""
+Buffered VideoAccessLog writer and cache-based multi-IP risk scoring.
+
+Signed-URL requests queue their audit rows here instead of inserting them
+inline. A background thread flushes the queue with bulk_create once it holds
+FLUSH_BATCH_SIZE rows or FLUSH_INTERVAL_SECONDS have passed; the queue is also
+flushed at interpreter exit and from gunicorn's worker_exit hook. Each flushed
+batch also updates the hourly abuse counters (api.abuse_signals) in the same
+transaction.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import abuse_signals
+from .models import VideoAccessLog
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 2.0
+# Drop (and log) events beyond this many if the database stays unreachable.
+MAX_PENDING = 10_000
+# Reuse keys per UPDATE statement (about 11 parameters each; SQLite allows 999 on old builds).
+REUSE_UPDATE_CHUNK = 50
+
+RISK_WINDOW_SECONDS = 24 * 60 * 60
+RISK_WARN_IPS = 2
+RISK_FLAG_IPS = 4
+_RISK_CACHE_PREFIX = "video_ips_v1:"
+
+
+def _risk_cache_key(user_id, video_id) -> str:
+    return f"{_RISK_CACHE_PREFIX}{user_id}:{video_id}"
+
+
+def _seed_recent_ips(user_id, video_ids, now: float) -> dict[str, dict[str, float]]:
+    """Cold cache: start from the IPs already in the table (once per window)."""
+    since = timezone.now() - timedelta(seconds=RISK_WINDOW_SECONDS)
+    rows = (
+        VideoAccessLog.objects.filter(
+            user_id=user_id, video_id__in=list(video_ids), requested_at__gte=since
+        )
+        .values_list("video_id", "ip_address")
+        .distinct()
+    )
+    seeded: dict[str, dict[str, float]] = {vid: {} for vid in video_ids}
+    for video_id, ip in rows:
+        seeded[video_id][str(ip or "")] = now
+    return seeded
+
+
+def _risk_for(distinct_ips: int) -> str:
+    if distinct_ips >= RISK_FLAG_IPS:
+        return VideoAccessLog.RISK_FLAG
+    if distinct_ips >= RISK_WARN_IPS:
+        return VideoAccessLog.RISK_WARN
+    return VideoAccessLog.RISK_OK
+
+
+def record_ip_and_score_many(user_id, video_ids, ip) -> dict[str, tuple[str, int]]:
+    """
+    Add ip to the user's 24 h sliding window for each video and return
+    {video_id: (risk level, distinct IPs in the window)} — one cache round trip each way.
+    """
+    now = time.time()
+    keys = {vid: _risk_cache_key(user_id, vid) for vid in video_ids}
+    cached = cache.get_many(list(keys.values()))
+    cold = [vid for vid, key in keys.items() if key not in cached]
+    seeded = _seed_recent_ips(user_id, cold, now) if cold else {}
+    cutoff = now - RISK_WINDOW_SECONDS
+    updates = {}
+    scores = {}
+    for vid, key in keys.items():
+        seen = cached.get(key, seeded.get(vid, {}))
+        seen = {addr: ts for addr, ts in seen.items() if ts >= cutoff}
+        seen[str(ip or "")] = now
+        updates[key] = seen
+        scores[vid] = (_risk_for(len(seen)), len(seen))
+    cache.set_many(updates, RISK_WINDOW_SECONDS)
+    return scores
+
+
+def record_ip_and_score(user_id, video_id, ip) -> tuple[str, int]:
+    """
+    Add ip to the user's 24 h sliding window for this video and return
+    (risk level, distinct IPs in the window).
+    """
+    return record_ip_and_score_many(user_id, [video_id], ip)[video_id]
+
+
+class AccessLogBuffer:
+    """In-process queue of new VideoAccessLog rows and signed-URL reuse counts."""
+
+    def __init__(self, batch_size=FLUSH_BATCH_SIZE, interval=FLUSH_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._rows: list[VideoAccessLog] = []
+        # (user_id, video_id, token_expires) -> [count, last_reused_at]
+        self._reuses: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="video-access-log", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("VideoAccessLog flush failed")
+            finally:
+                connections.close_all()
+
+    def add(self, entry: VideoAccessLog) -> None:
+        self.add_many([entry])
+
+    def add_many(self, entries: list[VideoAccessLog]) -> None:
+        if not entries:
+            return
+        if not getattr(settings, "DEFER_BACKGROUND_WORK", False):
+            with transaction.atomic():
+                VideoAccessLog.objects.bulk_create(entries, batch_size=self.batch_size)
+                abuse_signals.record_batch(entries)
+            return
+        with self._lock:
+            room = max(0, MAX_PENDING - len(self._rows))
+            self.dropped_rows += max(0, len(entries) - room)
+            self._rows.extend(entries[:room])
+            full = len(self._rows) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def add_reuse(self, user_id, video_id, token_expires) -> None:
+        self.add_reuses([(user_id, video_id, token_expires)])
+
+    def add_reuses(self, keys: list[tuple]) -> None:
+        """Count signed-URL reuses, one (user_id, video_id, token_expires) per reuse."""
+        if not keys:
+            return
+        now = timezone.now()
+        if not getattr(settings, "DEFER_BACKGROUND_WORK", False):
+            reuses: dict[tuple, list] = {}
+            for key in keys:
+                reuses.setdefault(key, [0, now])[0] += 1
+            with transaction.atomic():
+                self._apply_reuses(reuses)
+                abuse_signals.record_batch([], reuses)
+            return
+        with self._lock:
+            for key in keys:
+                pending = self._reuses.setdefault(key, [0, now])
+                pending[0] += 1
+                pending[1] = now
+        self._ensure_thread()
+
+    def _apply_reuses(self, reuses: dict[tuple, list]) -> None:
+        """One UPDATE per REUSE_UPDATE_CHUNK keys, each row getting its own increment."""
+        items = list(reuses.items())
+        for i in range(0, len(items), REUSE_UPDATE_CHUNK):
+            match = Q()
+            counts, times = [], []
+            for (user_id, video_id, token_expires), (count, last_at) in items[i:i + REUSE_UPDATE_CHUNK]:
+                key = Q(user_id=user_id, video_id=video_id, token_expires=token_expires)
+                match |= key
+                counts.append(When(key, then=Value(int(count))))
+                times.append(When(key, then=Value(last_at)))
+            VideoAccessLog.objects.filter(match).update(
+                reuse_count=F("reuse_count") + Case(*counts, default=Value(0), output_field=PositiveIntegerField()),
+                last_reused_at=Case(*times, default=F("last_reused_at"), output_field=DateTimeField()),
+            )
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows inserted."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            reuses, self._reuses = self._reuses, {}
+        if not rows and not reuses:
+            return 0
+        started = time.monotonic()
+        try:
+            # One transaction: if the reuse updates or the abuse counters fail, the
+            # inserted rows roll back too and can be requeued without duplicates.
+            with transaction.atomic():
+                if rows:
+                    VideoAccessLog.objects.bulk_create(rows, batch_size=self.batch_size)
+                # Rows first: a reuse may point at a row from this same batch.
+                self._apply_reuses(reuses)
+                abuse_signals.record_batch(rows, reuses)
+        except Exception:
+            for row in rows:
+                # Postgres filled in ids for the rolled-back insert; insert them afresh.
+                row.pk = None
+                row._state.adding = True
+            with self._lock:
+                room = max(0, MAX_PENDING - len(self._rows))
+                self.dropped_rows += max(0, len(rows) - room)
+                self._rows = rows[:room] + self._rows
+                for key, (count, last_at) in reuses.items():
+                    pending = self._reuses.setdefault(key, [0, last_at])
+                    pending[0] += count
+            raise
+        self.flushed_rows += len(rows)
+        logger.debug(
+            "VideoAccessLog flush: rows=%d reuses=%d %.0fms",
+            len(rows),
+            len(reuses),
+            (time.monotonic() - started) * 1000,
+        )
+        return len(rows)
+
+
+access_log_buffer = AccessLogBuffer()
+
+
+def flush_access_log() -> None:
+    """Graceful shutdown hook (atexit / gunicorn worker_exit)."""
+    try:
+        access_log_buffer.flush()
+    except Exception:
+        logger.exception("VideoAccessLog flush at shutdown failed")
+
+
+atexit.register(flush_access_log)
@@ -1,14 +1,32 @@
 """
 Resolve Bunny Stream credentials from env vars and admin-registered libraries (database).
+
+The merged map is built once per process and kept as a read-only registry.
+Saving or deleting a BunnyStreamLibrary row drops it here and bumps a cache
+version so other processes rebuild on their next check.
 """
 import os
 import re
+import threading
+import time
+from types import MappingProxyType
 
 from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 _BUNNY_LIB_SEC_KEY_RE = re.compile(r"^BUNNY_SECURITY_KEY_(\d+)$")
 _BUNNY_LIB_API_KEY_RE = re.compile(r"^BUNNY_STREAM_API_KEY_(\d+)$")
 
+BUNNY_CONFIG_VERSION_KEY = "bunny_library_configs_version"
+# How often a process compares its registry with the shared cache version.
+BUNNY_CONFIG_VERSION_CHECK_SECONDS = 5
+
+_registry = None  # (version, MappingProxyType)
+_registry_checked_at = 0.0
+_registry_lock = threading.Lock()
+
 
 def _merge_bunny_library_entry(configs, lib, *, is_default=False, security_key="", stream_api_key=""):
     """Merge Bunny keys for one library into configs[lib]."""
@@ -68,7 +86,7 @@ def _load_libraries_from_database(configs):
             configs[lib]["label"] = row.label
 
 
-def get_bunny_library_configs():
+def _build_bunny_library_configs():
     """
     Build per-library Bunny config map from:
     1) Django settings / env (optional default + per-library env vars)
@@ -101,6 +119,50 @@ def get_bunny_library_configs():
     return configs
 
 
+def _freeze(configs):
+    return MappingProxyType(
+        {lib: MappingProxyType(dict(entry)) for lib, entry in configs.items()}
+    )
+
+
+def _shared_version():
+    return cache.get(BUNNY_CONFIG_VERSION_KEY) or 0
+
+
+def get_bunny_library_configs():
+    """Read-only {library_id: config} registry; rebuilt only when libraries change."""
+    global _registry, _registry_checked_at
+    registry = _registry
+    now = time.monotonic()
+    if registry is not None and now - _registry_checked_at < BUNNY_CONFIG_VERSION_CHECK_SECONDS:
+        return registry[1]
+    version = _shared_version()
+    if registry is not None and registry[0] == version:
+        _registry_checked_at = now
+        return registry[1]
+    with _registry_lock:
+        if _registry is None or _registry[0] != version:
+            _registry = (version, _freeze(_build_bunny_library_configs()))
+        _registry_checked_at = now
+        return _registry[1]
+
+
+def invalidate_bunny_library_configs():
+    """Drop this process's registry and tell other processes to rebuild theirs."""
+    global _registry
+    _registry = None
+    try:
+        cache.incr(BUNNY_CONFIG_VERSION_KEY)
+    except ValueError:
+        cache.set(BUNNY_CONFIG_VERSION_KEY, 1, None)
+
+
+@receiver(post_save, sender="api.BunnyStreamLibrary")
+@receiver(post_delete, sender="api.BunnyStreamLibrary")
+def _bunny_library_changed(sender, **kwargs):
+    invalidate_bunny_library_configs()
+
+
 def get_bunny_config_for_library(library_id):
     """Return signing/upload config for a library id (env or database)."""
     lib = str(library_id or "").strip()
@@ -109,5 +171,7 @@ def get_bunny_config_for_library(library_id):
     configs = get_bunny_library_configs()
     if lib in configs:
         return configs[lib]
-    _merge_bunny_library_entry(configs, lib)
-    return configs.get(lib)
+    # Not registered: fall back to per-library env keys for this id only.
+    extra = {}
+    _merge_bunny_library_entry(extra, lib)
+    return extra.get(lib)
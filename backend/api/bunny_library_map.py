@@ -0,0 +1,190 @@
+"""
+Persistent Bunny video → library mapping (BunnyVideoLibrary).
+
+Signed-URL requests read the stored mapping instead of asking Bunny's Stream API
+which library holds a video. Bunny is probed only on a cold miss (or once a
+"not found" result expires), within PROBE_BUDGET_SECONDS per request and
+without retries; a lookup cut short is finished by a background job, as is
+re-verifying stale positive entries.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import jobs
+from .bunny_config import get_bunny_library_configs
+from .bunny_stream import BunnyStreamError, bunny_video_exists
+from .models import BunnyVideoLibrary
+
+logger = logging.getLogger(__name__)
+
+# Positive mappings older than this are re-checked in the background.
+REVERIFY_AFTER = timedelta(days=7)
+# "Not in any library" is remembered this long before Bunny is asked again.
+NEGATIVE_TTL = timedelta(hours=1)
+# Per-library timeout for a probe.
+PROBE_TIMEOUT_SECONDS = 10
+# Wall time all in-request probes of one request may take together (libraries × attempts).
+PROBE_BUDGET_SECONDS = 5
+# Don't start a probe with less time than this left.
+_MIN_PROBE_SECONDS = 0.5
+REVERIFY_LOCK_PREFIX = "bunny_map_verify:"
+
+
+def _probe_libraries(
+    video_id: str, library_ids: list[str], configs: dict, deadline: float | None = None
+) -> tuple[str | None, bool]:
+    """
+    Ask Bunny which library has the video. Returns (library_id, conclusive);
+    conclusive is False when a lookup failed or ran out of time (deadline, a
+    time.monotonic() value: one attempt per library), so a miss should not be remembered.
+    """
+    probed = False
+    failed = False
+    for lib in library_ids:
+        cfg = configs.get(lib) or {}
+        if not str(cfg.get("security_key", "") or "").strip():
+            continue
+        api = str(cfg.get("stream_api_key", "") or "").strip()
+        if not api:
+            continue
+        timeout, retries = PROBE_TIMEOUT_SECONDS, None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < _MIN_PROBE_SECONDS:
+                failed = True
+                break
+            timeout, retries = min(timeout, remaining), 0
+        try:
+            probed = True
+            if bunny_video_exists(int(lib), api, video_id, timeout=timeout, retries=retries):
+                return lib, True
+        except (ValueError, BunnyStreamError):
+            failed = True
+            continue
+    return None, probed and not failed
+
+
+def remember_video_library(video_id: str, library_id: str | None) -> None:
+    """Store a verified mapping (empty library_id = not found anywhere)."""
+    BunnyVideoLibrary.objects.update_or_create(
+        video_id=video_id,
+        defaults={"library_id": library_id or "", "verified_at": timezone.now()},
+    )
+
+
+@jobs.job("bunny_library_map.reverify", max_attempts=3)
+def reverify_video_library(video_id: str, library_ids: list[str]) -> None:
+    lib, conclusive = _probe_libraries(video_id, library_ids, get_bunny_library_configs())
+    if not (lib or conclusive):
+        # A library could not be asked; retry later rather than record a miss.
+        raise BunnyStreamError(f"Bunny lookup failed while re-verifying {video_id}")
+    remember_video_library(video_id, lib)
+
+
+def _schedule_reverify(video_id: str, library_ids: list[str]) -> None:
+    # Credentials are looked up again by the worker; only ids go into the job row.
+    if not cache.add(f"{REVERIFY_LOCK_PREFIX}{video_id}", 1, 300):
+        return
+    jobs.enqueue(
+        "bunny_library_map.reverify",
+        [video_id, list(library_ids)],
+        dedupe_key=f"{REVERIFY_LOCK_PREFIX}{video_id}",
+    )
+
+
+@jobs.job("bunny_library_map.lookup_many", max_attempts=3)
+def lookup_video_libraries(items: list) -> None:
+    """Cold probes deferred by the batch signed-URL endpoint: [[video_id, library_ids], ...]."""
+    configs = get_bunny_library_configs()
+    pending = needs_probe([video_id for video_id, _order in items])
+    failed = []
+    for video_id, order in items:
+        if video_id not in pending:
+            continue  # Mapped meanwhile (single endpoint or an earlier attempt).
+        lib, conclusive = _probe_libraries(video_id, order, configs)
+        if lib or conclusive:
+            remember_video_library(video_id, lib)
+        else:
+            failed.append(video_id)
+    if failed:
+        raise BunnyStreamError(f"Bunny lookup failed for {len(failed)} video(s): {', '.join(failed[:5])}")
+
+
+def schedule_lookups(items: list[tuple[str, list[str]]]) -> None:
+    """Probe Bunny for [(video_id, library_ids)] in one background job instead of in the request."""
+    items = [
+        [video_id, list(order)]
+        for video_id, order in items
+        if cache.add(f"{REVERIFY_LOCK_PREFIX}{video_id}", 1, 300)
+    ]
+    if items:
+        jobs.enqueue("bunny_library_map.lookup_many", [items])
+
+
+def needs_probe(video_ids) -> set[str]:
+    """Of video_ids, those resolve_video_library would probe Bunny for (no mapping, or an expired miss)."""
+    video_ids = set(video_ids)
+    settled = BunnyVideoLibrary.objects.filter(video_id__in=list(video_ids)).exclude(
+        library_id="", verified_at__lte=timezone.now() - NEGATIVE_TTL
+    )
+    return video_ids - set(settled.values_list("video_id", flat=True))
+
+
+def resolve_video_library(
+    video_id: str, library_ids: list[str], configs: dict, deadline: float | None = None
+) -> str | None:
+    """
+    Library id holding video_id, from the stored mapping when known.
+    library_ids is the probe order used on a cold miss (mapped library first on re-verify).
+    deadline (time.monotonic()) bounds the probe; it defaults to PROBE_BUDGET_SECONDS from now.
+    """
+    row = BunnyVideoLibrary.objects.filter(video_id=video_id).first()
+    now = timezone.now()
+    if row is not None:
+        if row.library_id:
+            if now - row.verified_at > REVERIFY_AFTER:
+                order = [row.library_id] + [lib for lib in library_ids if lib != row.library_id]
+                _schedule_reverify(video_id, order)
+            return row.library_id
+        if now - row.verified_at < NEGATIVE_TTL:
+            return None
+
+    if deadline is None:
+        deadline = time.monotonic() + PROBE_BUDGET_SECONDS
+    lib, conclusive = _probe_libraries(video_id, library_ids, configs, deadline)
+    if lib or conclusive:
+        try:
+            remember_video_library(video_id, lib)
+        except Exception:
+            logger.exception("Could not store Bunny library mapping for %s", video_id)
+    elif any(str((configs.get(l) or {}).get("stream_api_key", "") or "").strip() for l in library_ids):
+        # Cut short by the budget or a library errored: finish the lookup in the background.
+        schedule_lookups([(video_id, library_ids)])
+    return lib
+
+
+def known_video_libraries(video_ids, library_ids: list[str]) -> dict[str, str]:
+    """
+    Stored positive mappings for many videos in one query (batch signed URLs).
+    Stale ones are queued for re-verification; unknown videos are left to
+    resolve_video_library.
+    """
+    now = timezone.now()
+    known = {}
+    for row in BunnyVideoLibrary.objects.filter(video_id__in=list(video_ids)).exclude(library_id=""):
+        if now - row.verified_at > REVERIFY_AFTER:
+            order = [row.library_id] + [lib for lib in library_ids if lib != row.library_id]
+            _schedule_reverify(row.video_id, order)
+        known[row.video_id] = row.library_id
+    return known
+
+
+def forget_video_library(video_id: str) -> None:
+    """Drop a stored mapping (e.g. after a video is re-uploaded to another library)."""
+    BunnyVideoLibrary.objects.filter(video_id=video_id).delete()
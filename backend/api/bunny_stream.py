@@ -1,8 +1,14 @@
-"""Bunny Stream HTTP API — create video + upload file (stdlib only)."""
+"""Bunny Stream HTTP API — create video + TUS upload (via the pooled api.http_client)."""
+import base64
+import hashlib
 import json
-import urllib.error
-import urllib.request
-from urllib.parse import quote
+import time
+from urllib.parse import quote, urljoin
+
+from . import http_client
+
+TUS_ENDPOINT = "https://video.bunnycdn.com/tusupload"
+TUS_CHUNK_SIZE = 8 * 1024 * 1024
 
 
 class BunnyStreamError(Exception):
@@ -13,18 +19,14 @@ def bunny_create_video(library_id: int, access_key: str, title: str) -> str:
     t = (title or "").strip() or "Video"
     url = f"https://video.bunnycdn.com/library/{int(library_id)}/videos"
     body = json.dumps({"title": t}).encode("utf-8")
-    req = urllib.request.Request(url, data=body, method="POST")
-    req.add_header("AccessKey", access_key)
-    req.add_header("Content-Type", "application/json")
-    req.add_header("Accept", "application/json")
+    headers = {"AccessKey": access_key, "Content-Type": "application/json", "Accept": "application/json"}
     try:
-        with urllib.request.urlopen(req, timeout=90) as resp:
-            raw = resp.read().decode("utf-8")
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode("utf-8", errors="replace")
-        raise BunnyStreamError(f"Create video HTTP {e.code}: {err_body}") from e
-    except urllib.error.URLError as e:
+        resp = http_client.request("POST", url, headers=headers, body=body, timeout=90)
+    except http_client.TransportError as e:
         raise BunnyStreamError(f"Network error: {e}") from e
+    raw = resp.text()
+    if not resp.ok:
+        raise BunnyStreamError(f"Create video HTTP {resp.status}: {raw}")
     data = json.loads(raw)
     guid = data.get("guid")
     if not guid:
@@ -32,52 +34,120 @@ def bunny_create_video(library_id: int, access_key: str, title: str) -> str:
     return guid
 
 
-def bunny_upload_video(library_id: int, access_key: str, video_guid: str, file_bytes: bytes) -> None:
-    safe_guid = quote(str(video_guid), safe="")
-    url = f"https://video.bunnycdn.com/library/{int(library_id)}/videos/{safe_guid}"
-    req = urllib.request.Request(url, data=file_bytes, method="PUT")
-    req.add_header("AccessKey", access_key)
-    req.add_header("Content-Type", "application/octet-stream")
-    try:
-        with urllib.request.urlopen(req, timeout=900) as resp:
-            resp.read()
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode("utf-8", errors="replace")
-        raise BunnyStreamError(f"Upload HTTP {e.code}: {err_body}") from e
-    except urllib.error.URLError as e:
-        raise BunnyStreamError(f"Network error during upload: {e}") from e
-
-
-def bunny_video_exists(library_id: int, access_key: str, video_guid: str) -> bool:
+def bunny_video_exists(
+    library_id: int, access_key: str, video_guid: str, timeout: float = 60, retries: int | None = None
+) -> bool:
     """
     Check if a video GUID exists in a specific Bunny Stream library.
-    Requires the library API key (AccessKey).
+    Requires the library API key (AccessKey). timeout also caps the connect
+    phase; retries=0 for one attempt only (request path).
     """
     safe_guid = quote(str(video_guid), safe="")
     url = f"https://video.bunnycdn.com/library/{int(library_id)}/videos/{safe_guid}"
-    req = urllib.request.Request(url, method="GET")
-    req.add_header("AccessKey", access_key)
-    req.add_header("Accept", "application/json")
+    headers = {"AccessKey": access_key, "Accept": "application/json"}
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            raw = resp.read().decode("utf-8", errors="replace")
-            # A successful response includes the GUID.
-            return str(video_guid) in raw
-    except urllib.error.HTTPError as e:
-        # 404 => definitely not in this library.
-        if e.code == 404:
-            return False
-        err_body = e.read().decode("utf-8", errors="replace")
-        raise BunnyStreamError(
-            f"Video lookup HTTP {e.code} for library {library_id}: {err_body}"
-        ) from e
-    except urllib.error.URLError as e:
+        resp = http_client.request(
+            "GET",
+            url,
+            headers=headers,
+            timeout=timeout,
+            connect_timeout=min(http_client.CONNECT_TIMEOUT_SECONDS, timeout),
+            retries=retries,
+        )
+    except http_client.TransportError as e:
         raise BunnyStreamError(f"Network error during Bunny video lookup: {e}") from e
+    if resp.ok:
+        # A successful response includes the GUID.
+        return str(video_guid) in resp.text()
+    # 404 => definitely not in this library.
+    if resp.status == 404:
+        return False
+    raise BunnyStreamError(
+        f"Video lookup HTTP {resp.status} for library {library_id}: {resp.text()}"
+    )
 
 
-def bunny_create_and_upload(library_id: int, access_key: str, title: str, file_bytes: bytes) -> str:
-    if not file_bytes:
-        raise BunnyStreamError("Empty file")
-    guid = bunny_create_video(library_id, access_key, title)
-    bunny_upload_video(library_id, access_key, guid, file_bytes)
-    return guid
+def _tus_headers(library_id, access_key: str, video_guid: str) -> dict:
+    """Presigned TUS auth: SHA256(library_id + api_key + expiration + video_id)."""
+    expires = int(time.time()) + 24 * 60 * 60
+    signature = hashlib.sha256(
+        f"{library_id}{access_key}{expires}{video_guid}".encode("utf-8")
+    ).hexdigest()
+    return {
+        "AuthorizationSignature": signature,
+        "AuthorizationExpire": str(expires),
+        "VideoId": str(video_guid),
+        "LibraryId": str(library_id),
+        "Tus-Resumable": "1.0.0",
+    }
+
+
+def _tus_request(url: str, method: str, headers: dict, data: bytes | None = None, timeout: int = 120):
+    try:
+        resp = http_client.request(method, url, headers=headers, body=data, timeout=timeout)
+    except http_client.TransportError as e:
+        raise BunnyStreamError(f"Network error during TUS {method}: {e}") from e
+    if not resp.ok:
+        raise BunnyStreamError(f"TUS {method} HTTP {resp.status}: {resp.text()[:500]}")
+    return resp.status, resp.headers
+
+
+def bunny_tus_create(library_id, access_key: str, video_guid: str, size: int, title: str = "") -> str:
+    """Open a resumable upload for an existing Bunny video. Returns the upload URL."""
+    meta = ",".join(
+        f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}"
+        for k, v in (("filetype", "video/mp4"), ("title", (title or "Video").strip()))
+    )
+    headers = _tus_headers(library_id, access_key, video_guid)
+    headers["Upload-Length"] = str(int(size))
+    headers["Upload-Metadata"] = meta
+    _status, resp_headers = _tus_request(TUS_ENDPOINT, "POST", headers)
+    location = resp_headers.get("Location")
+    if not location:
+        raise BunnyStreamError("TUS create returned no Location header")
+    return urljoin(TUS_ENDPOINT, location)
+
+
+def bunny_tus_offset(upload_url: str, library_id, access_key: str, video_guid: str) -> int:
+    """Bytes Bunny already has for this upload (used to resume)."""
+    _status, resp_headers = _tus_request(
+        upload_url, "HEAD", _tus_headers(library_id, access_key, video_guid), timeout=60
+    )
+    try:
+        return int(resp_headers.get("Upload-Offset") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def bunny_tus_upload_file(
+    upload_url: str,
+    library_id,
+    access_key: str,
+    video_guid: str,
+    path: str,
+    offset: int = 0,
+    chunk_size: int = TUS_CHUNK_SIZE,
+    progress=None,
+) -> int:
+    """
+    Stream a file from disk to a TUS upload starting at offset, one chunk in
+    memory at a time. Calls progress(offset) after each chunk; returns the final offset.
+    """
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            headers = _tus_headers(library_id, access_key, video_guid)
+            headers["Upload-Offset"] = str(offset)
+            headers["Content-Type"] = "application/offset+octet-stream"
+            _status, resp_headers = _tus_request(upload_url, "PATCH", headers, data=chunk, timeout=300)
+            try:
+                offset = int(resp_headers.get("Upload-Offset"))
+            except (TypeError, ValueError):
+                offset += len(chunk)
+            fh.seek(offset)
+            if progress:
+                progress(offset)
+    return offset
@@ -0,0 +1,28 @@
+"""Cache backends that count hits/misses for the current request (api.metrics)."""
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from . import metrics
+
+_MISS = object()
+
+
+class _HitCountingMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISS, version=version)
+        metrics.count_cache(value is not _MISS)
+        return default if value is _MISS else value
+
+
+class InstrumentedLocMemCache(_HitCountingMixin, LocMemCache):
+    # BaseCache.get_many() goes through get(), so it is already counted.
+    pass
+
+
+class InstrumentedRedisCache(_HitCountingMixin, RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        metrics.count_cache(True, len(found))
+        metrics.count_cache(False, len(keys) - len(found))
+        return found
@@ -7,6 +7,7 @@ Caches shared content (chapter + videos + files). User progress is always fresh.
 from django.core.cache import cache
 from django.db.models import Count, Exists, OuterRef, Prefetch, Q
 
+from . import cloudinary_urls
 from .models import (
     Chapter, Lesson, Video, File, LessonProgress, QuizAttempt,
 )
@@ -25,8 +26,11 @@ def content_cache_key(chapter_id: str) -> str:
     return f'{CONTENT_CACHE_PREFIX}{chapter_id}'
 
 
-TIGER_SLOT_CACHE_KEY = 'tiger_slots_v2'
-TIGER_SLOT_CACHE_TTL = 60 * 10
+# Value: {"version", "built_at", "verbal", "quant"}; patched per question by
+# tiger_test.update_slot_pool, fully rebuilt hourly.
+TIGER_SLOT_CACHE_KEY = 'tiger_slots_v3'
+TIGER_SLOT_CACHE_TTL = 60 * 60 * 6
+TIGER_SLOT_LOCK_KEY = 'tiger_slots_v3:lock'
 
 
 def invalidate_tiger_slot_cache() -> None:
@@ -37,15 +41,17 @@ def invalidate_sections_tree_cache() -> None:
     cache.delete(SECTIONS_TREE_CACHE_KEY)
 
 
-def invalidate_chapter_dashboard_cache(chapter_id) -> None:
+def invalidate_chapter_dashboard_cache(chapter_id, tiger_pool: bool = True) -> None:
+    """Drop cached chapter content; question edits pass tiger_pool=False and patch the pool instead."""
     invalidate_sections_tree_cache()
-    invalidate_tiger_slot_cache()
+    if tiger_pool:
+        invalidate_tiger_slot_cache()
     if not chapter_id:
         return
     cache.delete(content_cache_key(str(chapter_id)))
 
 
-def invalidate_chapter_dashboard_for_lesson(lesson_id) -> None:
+def invalidate_chapter_dashboard_for_lesson(lesson_id, tiger_pool: bool = True) -> None:
     if not lesson_id:
         return
     chapter_id = (
@@ -53,7 +59,7 @@ def invalidate_chapter_dashboard_for_lesson(lesson_id) -> None:
         .values_list('chapter_id', flat=True)
         .first()
     )
-    invalidate_chapter_dashboard_cache(chapter_id)
+    invalidate_chapter_dashboard_cache(chapter_id, tiger_pool=tiger_pool)
 
 
 def _build_content(chapter_id: str):
@@ -85,14 +91,17 @@ def _build_content(chapter_id: str):
         File.objects
         .filter(Q(chapter_id=chapter_id) | Q(lesson__chapter_id=chapter_id))
         .exclude(section_id__in=DISABLED_SECTION_IDS)
-        .only('id', 'lesson_id', 'title', 'file_type', 'order')
+        .only('id', 'lesson_id', 'title', 'file_type', 'file', 'order')
         .order_by('order', '-created_at')
     )
+    files = list(files_qs)
+    # Sign the chapter's file URLs now so the file list / viewer requests that follow hit the memo.
+    cloudinary_urls.prewarm(f.file for f in files)
 
     return {
         'chapter': ChapterSerializer(chapter).data,
         'videos': VideoLiteSerializer(videos_qs, many=True).data,
-        'files': FileLiteSerializer(files_qs, many=True).data,
+        'files': FileLiteSerializer(files, many=True).data,
     }
 
 
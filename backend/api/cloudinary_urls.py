@@ -0,0 +1,174 @@
+"""
+Signed Cloudinary delivery URLs, memoized per process.
+
+Every File row used to be re-signed (HMAC + URL building) on every
+serialization. A signature covers only the public id and transformation, so
+the same URL is valid until credentials change; entries are kept for
+CLOUDINARY_SIGNED_URL_TTL_SECONDS in a bounded LRU and rebuilt after that.
+Lookups are keyed on the stored file name, so a hit builds no URL at all.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 5000
+
+_cache: OrderedDict[tuple[str, str], tuple[float, str]] = OrderedDict()
+# (storage class, file name) -> Cloudinary resource type, learned from the first
+# storage URL so later lookups skip building fieldfile.url.
+_kinds: OrderedDict[tuple[str, str], str] = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "CLOUDINARY_SIGNED_URL_TTL_SECONDS", 3600) or 0)
+
+
+def _credentials() -> dict:
+    creds = getattr(settings, "CLOUDINARY_STORAGE", {}) or {}
+    return {
+        "api_secret": creds.get("API_SECRET") or getattr(settings, "CLOUDINARY_API_SECRET", None),
+        "cloud_name": creds.get("CLOUD_NAME"),
+        "api_key": creds.get("API_KEY"),
+    }
+
+
+def signing_configured() -> bool:
+    return bool(_credentials()["api_secret"])
+
+
+def is_cloudinary_url(url) -> bool:
+    return isinstance(url, str) and "cloudinary.com" in url
+
+
+def resource_type_for(url: str) -> str:
+    return "image" if "/image/" in url else ("raw" if "/raw/" in url else "image")
+
+
+def sign(public_id: str, resource_type: str) -> str | None:
+    """Signed delivery URL for public_id; None without credentials or on error."""
+    key = (public_id, resource_type)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+    creds = _credentials()
+    if not creds["api_secret"] or not public_id:
+        return None
+    try:
+        import cloudinary.utils
+
+        signed_url, _ = cloudinary.utils.cloudinary_url(
+            public_id,
+            resource_type=resource_type,
+            sign_url=True,
+            api_secret=creds["api_secret"],
+            cloud_name=creds["cloud_name"],
+            api_key=creds["api_key"],
+        )
+    except Exception:
+        logger.exception("Cloudinary URL signing failed for %s", public_id)
+        return None
+    if not signed_url:
+        return None
+    ttl = _ttl()
+    if ttl > 0:
+        with _lock:
+            _cache[key] = (now + ttl, signed_url)
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_ENTRIES:
+                _cache.popitem(last=False)
+    return signed_url
+
+
+def _kind_key(fieldfile) -> tuple[str, str]:
+    return type(getattr(fieldfile, "storage", None)).__qualname__, getattr(fieldfile, "name", None) or ""
+
+
+def _known_type(key: tuple[str, str]) -> str | None:
+    if not key[1]:
+        return None
+    with _lock:
+        rtype = _kinds.get(key)
+        if rtype is not None:
+            _kinds.move_to_end(key)
+    return rtype
+
+
+def _remember_type(key: tuple[str, str], rtype: str) -> None:
+    if not key[1]:
+        return
+    with _lock:
+        _kinds[key] = rtype
+        _kinds.move_to_end(key)
+        while len(_kinds) > MAX_ENTRIES:
+            _kinds.popitem(last=False)
+
+
+def file_url(fieldfile) -> str | None:
+    """Delivery URL for a stored file: signed for Cloudinary, the storage URL otherwise."""
+    if not fieldfile:
+        return None
+    key = _kind_key(fieldfile)
+    rtype = _known_type(key)
+    if rtype:
+        signed = sign(key[1], rtype)
+        if signed:
+            return signed
+    url = fieldfile.url
+    if not url:
+        return None
+    if is_cloudinary_url(url):
+        rtype = resource_type_for(url)
+        _remember_type(key, rtype)
+        return sign(key[1], rtype) or url
+    return url
+
+
+def prewarm(fieldfiles) -> int:
+    """Sign a batch of files ahead of time (e.g. while a dashboard is built). Returns how many were Cloudinary files."""
+    n = 0
+    for fieldfile in fieldfiles:
+        if not fieldfile:
+            continue
+        key = _kind_key(fieldfile)
+        rtype = _known_type(key)
+        if not rtype:
+            try:
+                url = fieldfile.url
+            except Exception:
+                continue
+            if not is_cloudinary_url(url):
+                continue
+            rtype = resource_type_for(url)
+            _remember_type(key, rtype)
+        sign(key[1], rtype)
+        n += 1
+    return n
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        _kinds.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["entries"] = len(_cache)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 3) if lookups else None
+    return snapshot
@@ -0,0 +1,152 @@
+"""
+Read-replica routing for heavy read-only views.
+
+When DATABASE_REPLICA_URL is set, settings add a "replica" alias and install
+ReplicaRouter. Nothing goes to the replica by default: only code running
+inside `replica_reads()` (or a view method decorated with `@replica_view`)
+reads from it, and every write still goes to the primary.
+
+Read-your-writes:
+  - a user who made a successful unsafe request (POST/PUT/PATCH/DELETE) in the
+    last REPLICA_READ_AFTER_WRITE_SECONDS reads from the primary (the marker
+    is set by api.middleware.ReplicaStickinessMiddleware);
+  - the first write inside a replica block pins the rest of it to the primary;
+  - reads inside an atomic block on the primary, and reads of PRIMARY_ONLY
+    models (the job queue), never leave the primary.
+
+Locally, point DATABASE_REPLICA_URL at a second SQLite file (a copy of
+db.sqlite3) or Postgres database to exercise the routing. The router leaves
+allow_migrate alone so `dumpdata --database replica` works; never run
+`migrate` against a real replica (it follows the primary).
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+# Queue rows are claimed with SELECT ... FOR UPDATE and polled right after enqueue.
+PRIMARY_ONLY = frozenset({"api.BackgroundJob"})
+
+_CACHE_PREFIX = "db_replica:wrote:"
+
+
+class _Scope:
+    __slots__ = ("alias", "pinned")
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self.pinned = False
+
+
+_scope: contextvars.ContextVar[_Scope | None] = contextvars.ContextVar("api_db_read_scope", default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _sticky_seconds() -> int:
+    return int(getattr(settings, "REPLICA_READ_AFTER_WRITE_SECONDS", 10) or 0)
+
+
+def note_write(user_id) -> None:
+    """Send this user's replica-eligible reads to the primary for a little while."""
+    seconds = _sticky_seconds()
+    if user_id and seconds > 0 and replica_configured():
+        cache.set(f"{_CACHE_PREFIX}{user_id}", 1, seconds)
+
+
+def wrote_recently(user_id) -> bool:
+    return bool(user_id) and _sticky_seconds() > 0 and bool(cache.get(f"{_CACHE_PREFIX}{user_id}"))
+
+
+def read_alias(user=None) -> str:
+    """Alias a replica-eligible read for `user` should use."""
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+    if user is not None and getattr(user, "is_authenticated", False) and wrote_recently(user.pk):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Route ORM reads in this block to the replica (see module docstring for the exceptions)."""
+    token = _scope.set(_Scope(read_alias(user)))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def replica_view(method):
+    """
+    Decorator for read-only view handlers (`def get(self, request, ...)`).
+    Falls back to the primary once if the replica cannot be reached.
+    """
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        user = getattr(request, "user", None)
+        try:
+            with replica_reads(user):
+                return method(view, request, *args, **kwargs)
+        except (OperationalError, InterfaceError):
+            if read_alias(user) == DEFAULT_DB_ALIAS:
+                raise
+            logger.warning("Replica read failed for %s; retrying on primary", request.path, exc_info=True)
+            return method(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+def status() -> dict:
+    """Replica reachability and, on Postgres streaming replicas, apply lag."""
+    if not replica_configured():
+        return {"configured": False}
+    out = {"configured": True}
+    conn = connections[REPLICA_ALIAS]
+    try:
+        with conn.cursor() as cursor:
+            if conn.vendor == "postgresql":
+                cursor.execute("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+                lag = cursor.fetchone()[0]
+                out["lag_seconds"] = round(float(lag), 3) if lag is not None else None
+            else:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        out["db"] = "ok"
+    except Exception:
+        out["db"] = "error"
+    return out
+
+
+class ReplicaRouter:
+    """Installed by settings; a no-op outside replica_reads() blocks."""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope.pinned or scope.alias == DEFAULT_DB_ALIAS:
+            return None
+        if model._meta.label in PRIMARY_ONLY or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return scope.alias
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases; objects read from the replica may be related to primary ones.
+        return True
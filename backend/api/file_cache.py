@@ -0,0 +1,326 @@
+"""
+Size-bounded local disk cache for study files proxied from Cloudinary.
+
+Entries are keyed by file id + storage version (stored name and updated_at),
+so a re-uploaded file never serves stale bytes, and the key doubles as the
+ETag whether a request is served from disk, from a running fill or proxied.
+
+A miss starts one download per key into a temp file that is renamed into
+place when complete. The request that started it and any concurrent requests
+for the same key read that temp file as it grows (first byte right away, one
+upstream transfer); they only fall back to proxying upstream when the object
+is too large to cache, its length is unknown, or MAX_BACKGROUND_FILLS
+downloads are already running. With DEFER_BACKGROUND_WORK=false the starting
+request downloads inline instead. The least recently used entries are evicted
+when the cache grows past FILE_CACHE_MAX_BYTES, together with temp files a
+crashed fill left behind.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_TIMEOUT_SECONDS = 60
+# How long a request waits for a fill to get the upstream headers before proxying instead.
+FOLLOW_START_SECONDS = 10
+CHUNK_SIZE = 256 * 1024
+# Downloads at once in deferred mode; misses beyond this are only proxied.
+MAX_BACKGROUND_FILLS = 2
+# A temp file untouched this long belongs to a fill that died with its process.
+STALE_TEMP_SECONDS = 60 * 60
+# Evict down to this share of the budget so every fill doesn't trigger a sweep.
+EVICT_TO_RATIO = 0.9
+_TMP_SUFFIX = ".part"
+
+_stats = {
+    "hits": 0, "misses": 0, "followers": 0, "fills": 0, "fill_errors": 0, "evictions": 0, "too_large": 0,
+    "stale_temp_removed": 0,
+}
+_stats_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+
+class _Fill:
+    """One running download; readers wait on `cond` for `written` to grow."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.cond = threading.Condition()
+        self.answered = False  # upstream headers are in
+        self.tmp: str | None = None  # set with them when the length is known and cacheable
+        self.size: int | None = None
+        self.written = 0
+        self.done = False
+        self.failed = False
+
+
+# Downloads in flight by key (entries leave the dict when the fill ends).
+_filling: dict[str, _Fill] = {}
+_filling_lock = threading.Lock()
+
+
+class _GrowingFile:
+    """Read side of a fill's temp file: read() blocks until the writer has the bytes."""
+
+    def __init__(self, fill: _Fill, fh):
+        self._fill = fill
+        self._fh = fh
+        self._pos = 0
+
+    def seekable(self) -> bool:
+        # Keeps FileResponse from reading to the end to measure the length (the caller sets it).
+        return False
+
+    def seek(self, pos: int) -> None:
+        self._fh.seek(pos)
+        self._pos = pos
+
+    def read(self, n: int = -1) -> bytes:
+        fill = self._fill
+        with fill.cond:
+            if not fill.cond.wait_for(lambda: fill.written > self._pos or fill.done, DOWNLOAD_TIMEOUT_SECONDS):
+                raise OSError(f"File cache fill {fill.key} stalled")
+            if fill.failed:
+                raise OSError(f"File cache fill {fill.key} failed")
+            available = fill.written - self._pos
+        if available <= 0:
+            return b""
+        data = self._fh.read(available if n is None or n < 0 else min(n, available))
+        self._pos += len(data)
+        return data
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def max_bytes() -> int:
+    return int(getattr(settings, "FILE_CACHE_MAX_BYTES", 0) or 0)
+
+
+def enabled() -> bool:
+    return max_bytes() > 0
+
+
+def _cache_dir() -> str:
+    path = str(settings.FILE_CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def cache_key(f) -> str:
+    version = f"{getattr(f.file, 'name', '')}|{f.updated_at.isoformat() if f.updated_at else ''}"
+    digest = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+    safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(f.id))[:80]
+    return f"{safe_id}-{digest}"
+
+
+def etag_for(key: str) -> str:
+    return f'"{key}"'
+
+
+def _path(key: str) -> str:
+    return os.path.join(_cache_dir(), key)
+
+
+def _open(key: str):
+    path = _path(key)
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)  # LRU bookkeeping
+    except FileNotFoundError:
+        pass  # evicted just now; the open handle still reads the whole file
+    return fh, os.fstat(fh.fileno()).st_size
+
+
+def open_entry(key: str):
+    """(open file, size) for a cached entry, marked as recently used; None on a miss."""
+    entry = _open(key)
+    if entry is not None:
+        _count("hits")
+    return entry
+
+
+def _download(url: str, fill: _Fill) -> str | None:
+    """Stream url into a temp file and rename it into place. None when it exceeds the per-object limit."""
+    key = fill.key
+    limit = max(1, max_bytes() // 4)
+    with http_client.request(
+        "GET", url, headers={"User-Agent": "Mozilla/5.0"}, timeout=DOWNLOAD_TIMEOUT_SECONDS, stream=True
+    ) as upstream:
+        if not upstream.ok:
+            raise http_client.TransportError(f"HTTP {upstream.status}")
+        length = int(upstream.headers.get("Content-Length") or 0) or None
+        if length is not None and length > limit:
+            _count("too_large")
+            return None
+        fd, tmp = tempfile.mkstemp(dir=_cache_dir(), prefix=f".{key}.", suffix=_TMP_SUFFIX)
+        with fill.cond:
+            fill.answered = True
+            # Readers need the total size up front (Content-Length / Content-Range).
+            if length is not None:
+                fill.tmp, fill.size = tmp, length
+            fill.cond.notify_all()
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while written <= limit:
+                    chunk = upstream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    out.flush()
+                    written += len(chunk)
+                    with fill.cond:
+                        fill.written = written
+                        fill.cond.notify_all()
+            if written > limit or (length is not None and written != length):
+                if written > limit:
+                    _count("too_large")
+                os.unlink(tmp)
+                return None
+            # Readers only ever see a complete file; followers keep their open handle on the temp file.
+            os.replace(tmp, _path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    logger.info("File cache fill %s: %d bytes", key, written)
+    return _path(key)
+
+
+def _run_fill(fill: _Fill, url: str) -> None:
+    ok = False
+    try:
+        if os.path.exists(_path(fill.key)):
+            ok = True
+            return
+        ok = _download(url, fill) is not None
+        if ok:
+            _count("fills")
+            evict()
+    except Exception as e:
+        _count("fill_errors")
+        logger.warning("File cache fill %s failed: %s", fill.key, e)
+    finally:
+        with fill.cond:
+            fill.done = True
+            fill.failed = not ok
+            fill.cond.notify_all()
+        with _filling_lock:
+            _filling.pop(fill.key, None)
+
+
+def _follow(fill: _Fill):
+    """Reader for a running fill, the finished entry, or None (proxy instead)."""
+    with fill.cond:
+        fill.cond.wait_for(lambda: fill.answered or fill.done, FOLLOW_START_SECONDS)
+        if not fill.done:
+            if fill.tmp is None:
+                return None
+            # Opened under the condition, so the temp file can't be renamed away first.
+            _count("followers")
+            return _GrowingFile(fill, open(fill.tmp, "rb")), fill.size
+        if fill.failed:
+            return None
+    return _open(fill.key)
+
+
+def miss(key: str, url: str):
+    """
+    A lookup missed: start (or join) the single download for key and return a
+    reader (file-like, size) over it, or None when the caller should proxy.
+    """
+    _count("misses")
+    inline = not getattr(settings, "DEFER_BACKGROUND_WORK", False)
+    with _filling_lock:
+        fill = _filling.get(key)
+        started = fill is None and (inline or len(_filling) < MAX_BACKGROUND_FILLS)
+        if started:
+            fill = _filling[key] = _Fill(key)
+    if fill is None:
+        return None
+    if started:
+        if inline:
+            _run_fill(fill, url)
+            return None if fill.failed else _open(key)
+        threading.Thread(target=_run_fill, args=(fill, url), name=f"file-cache-{key[:24]}", daemon=True).start()
+    return _follow(fill)
+
+
+def _entries(remove_stale_temp: bool = False) -> list[tuple[float, int, str]]:
+    entries = []
+    stale_before = time.time() - STALE_TEMP_SECONDS
+    with os.scandir(_cache_dir()) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith("."):
+                if remove_stale_temp and entry.name.endswith(_TMP_SUFFIX) and st.st_mtime < stale_before:
+                    try:
+                        os.unlink(entry.path)
+                        _count("stale_temp_removed")
+                    except FileNotFoundError:
+                        pass
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    return entries
+
+
+def evict() -> int:
+    """Remove least recently used entries until the cache fits its budget."""
+    budget = max_bytes()
+    with _evict_lock:
+        entries = _entries(remove_stale_temp=True)
+        total = sum(size for _m, size, _p in entries)
+        if total <= budget:
+            return 0
+        target = int(budget * EVICT_TO_RATIO)
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    _count("evictions", removed)
+    return removed
+
+
+def stats() -> dict:
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 3) if lookups else None
+    snapshot["max_bytes"] = max_bytes()
+    if enabled():
+        entries = _entries()
+        snapshot["entries"] = len(entries)
+        snapshot["bytes"] = sum(size for _m, size, _p in entries)
+    return snapshot
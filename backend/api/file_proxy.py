@@ -0,0 +1,240 @@
+"""
+Streaming delivery of lesson files (PDF viewer) with HTTP Range support.
+
+Cloudinary objects are piped through in chunks instead of being downloaded
+whole; Range / If-Range / If-None-Match are forwarded so PDF.js can fetch pages
+on demand and length/validator headers come back unchanged. Local files are
+served the same way from storage with single-range support.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import cloudinary_urls, http_client
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+UPSTREAM_TIMEOUT_SECONDS = 30
+# Content is behind auth: browsers may keep it, shared caches must not.
+CACHE_CONTROL = "private, max-age=3600"
+_PASS_THROUGH_HEADERS = ("Content-Length", "Content-Range", "ETag", "Last-Modified")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def content_type_for(f) -> str:
+    file_type = (f.file_type or "").lower()
+    if file_type == "application/pdf" or (f.title or "").lower().endswith(".pdf"):
+        return "application/pdf"
+    if file_type in (
+        "application/msword",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ):
+        return file_type
+    return "application/octet-stream"
+
+
+def upstream_url(f) -> str | None:
+    """
+    Remote URL for the file (signed for Cloudinary when credentials exist); None for
+    local storage. Http404 for a Cloudinary file without a public id to sign.
+    """
+    raw_url = getattr(f.file, "url", None) or ""
+    if not isinstance(raw_url, str) or not (raw_url.startswith("http") or cloudinary_urls.is_cloudinary_url(raw_url)):
+        return None
+    if not cloudinary_urls.is_cloudinary_url(raw_url):
+        return raw_url
+    public_id = getattr(f.file, "name", None) or ""
+    if not public_id and cloudinary_urls.signing_configured():
+        raise Http404("File path not found.")
+    return cloudinary_urls.sign(public_id, cloudinary_urls.resource_type_for(raw_url)) or raw_url
+
+
+def _disposition(filename: str) -> str:
+    return 'inline; filename="%s"' % (filename or "file")
+
+
+def _stream(fh, length: int | None = None):
+    """Yield CHUNK_SIZE pieces of fh (at most length bytes), closing it at the end."""
+    try:
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = fh.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def parse_range(header: str, size: int):
+    """
+    Single byte range -> (start, end) inclusive; None to serve the whole file
+    (no/ignored header); False when the range cannot be satisfied.
+    """
+    m = _RANGE_RE.match((header or "").strip())
+    if not m:
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if not suffix:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _not_modified(etag: str) -> HttpResponse:
+    resp = HttpResponse(status=304)
+    resp["ETag"] = etag
+    resp["Cache-Control"] = CACHE_CONTROL
+    return resp
+
+
+def proxy_remote(request, url: str, content_type: str, filename: str, etag: str | None = None) -> HttpResponse | None:
+    """
+    Pipe the upstream object through; None when storage could not be reached.
+    With `etag` (the file cache's validator) conditionals are answered here and
+    that ETag replaces upstream's, so proxied and cached responses validate alike.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if etag is None:
+        for meta, name in (
+            ("HTTP_RANGE", "Range"),
+            ("HTTP_IF_RANGE", "If-Range"),
+            ("HTTP_IF_NONE_MATCH", "If-None-Match"),
+            ("HTTP_IF_MODIFIED_SINCE", "If-Modified-Since"),
+        ):
+            if request.META.get(meta):
+                headers[name] = request.META[meta]
+    else:
+        if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+            return _not_modified(etag)
+        if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+        # A stale If-Range means the client's partial copy is outdated: fetch everything.
+        if request.META.get("HTTP_RANGE") and (not if_range or if_range == etag):
+            headers["Range"] = request.META["HTTP_RANGE"]
+    try:
+        upstream = http_client.request(
+            "GET", url, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS, stream=True
+        )
+    except http_client.TransportError as e:
+        logger.warning("File upstream failed for %s: %s", url.split("?")[0], e)
+        return None
+    if upstream.status in (304, 416):
+        upstream.close()
+        resp = HttpResponse(status=upstream.status)
+        for name in ("ETag", "Last-Modified", "Content-Range"):
+            if upstream.headers.get(name) and (etag is None or name == "Content-Range"):
+                resp[name] = upstream.headers[name]
+        resp["Cache-Control"] = CACHE_CONTROL
+        return resp
+    if not upstream.ok:
+        upstream.close()
+        logger.warning("File upstream HTTP %s for %s", upstream.status, url.split("?")[0])
+        return None
+
+    resp = StreamingHttpResponse(_stream(upstream), status=upstream.status, content_type=content_type)
+    for name in _PASS_THROUGH_HEADERS:
+        value = upstream.headers.get(name)
+        if value and (etag is None or name not in ("ETag", "Last-Modified")):
+            resp[name] = value
+    if etag is not None:
+        resp["ETag"] = etag
+    resp["Accept-Ranges"] = upstream.headers.get("Accept-Ranges") or "none"
+    resp["Cache-Control"] = CACHE_CONTROL
+    resp["Content-Disposition"] = _disposition(filename)
+    return resp
+
+
+def _serve(request, opener, size: int, etag, last_modified, content_type: str, filename: str) -> HttpResponse:
+    """Whole file via FileResponse, or one byte range (206) from a seekable file."""
+    validators = {}
+    if etag:
+        validators["ETag"] = etag
+    if last_modified is not None:
+        validators["Last-Modified"] = http_date(last_modified)
+    if etag and request.META.get("HTTP_IF_NONE_MATCH") == etag:
+        resp = HttpResponse(status=304)
+        for key, value in validators.items():
+            resp[key] = value
+        resp["Cache-Control"] = CACHE_CONTROL
+        return resp
+
+    byte_range = parse_range(request.META.get("HTTP_RANGE", ""), size)
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if byte_range and if_range:
+        # Stale validator: the client's partial copy is outdated, send everything.
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            fresh = etag is not None and if_range == etag
+        else:
+            fresh = last_modified is not None and parse_http_date_safe(if_range) == last_modified
+        if not fresh:
+            byte_range = None
+
+    if byte_range is False:
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+        return resp
+
+    fh = opener()
+    if byte_range:
+        start, end = byte_range
+        fh.seek(start)
+        resp = StreamingHttpResponse(_stream(fh, end - start + 1), status=206, content_type=content_type)
+        resp["Content-Length"] = str(end - start + 1)
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        # Real files go out via wsgi.file_wrapper (sendfile) where the server supports it.
+        resp = FileResponse(fh, content_type=content_type)
+        resp["Content-Length"] = str(size)
+    for key, value in validators.items():
+        resp[key] = value
+    resp["Accept-Ranges"] = "bytes"
+    resp["Cache-Control"] = CACHE_CONTROL
+    resp["Content-Disposition"] = _disposition(filename)
+    return resp
+
+
+def serve_local(request, fieldfile, content_type: str, filename: str) -> HttpResponse:
+    storage = fieldfile.storage
+    name = fieldfile.name
+    size = storage.size(name)
+    try:
+        mtime = int(storage.get_modified_time(name).timestamp())
+    except (NotImplementedError, OSError, AttributeError):
+        mtime = None
+    etag = f'"{size:x}-{mtime:x}"' if mtime is not None else None
+    return _serve(request, lambda: storage.open(name, "rb"), size, etag, mtime, content_type, filename)
+
+
+def serve_open(request, fh, size: int, etag: str, content_type: str, filename: str) -> HttpResponse:
+    """
+    Serve an already-open file from the local disk cache (opened first, so an
+    eviction can't pull it away mid-request). mtime is LRU bookkeeping, so only
+    the ETag validates. fh is closed here unless the response streams it.
+    """
+    streamed = False
+
+    def opener():
+        nonlocal streamed
+        streamed = True
+        return fh
+
+    try:
+        return _serve(request, opener, size, etag, None, content_type, filename)
+    finally:
+        if not streamed:
+            fh.close()
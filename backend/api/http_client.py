@@ -0,0 +1,414 @@
+"""
+Shared outbound HTTP client (Bunny Stream, Cloudinary, Telegram JWKS).
+
+Connections are pooled per (scheme, host, port) and kept alive between calls,
+so repeated requests to the same few hosts skip DNS and the TCP/TLS handshake.
+Each host has a bounded number of concurrent connections; callers beyond that
+wait up to POOL_WAIT_SECONDS. Connect and read timeouts are separate.
+Idempotent requests are retried on network errors and 429/502/503/504 with
+jittered exponential backoff; so is a send on a kept-alive connection the server
+had already closed. Other methods are never re-sent: they only reuse connections
+idle for under NON_IDEMPOTENT_MAX_IDLE_SECONDS, where that race is unlikely.
+Per-host counters and latency are in metrics().
+
+OUTBOUND_HTTP_OVERRIDES ("host=http://127.0.0.1:8765,...") sends a host's
+traffic to another origin, e.g. a local stub server during tests.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import logging
+import random
+import ssl
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT_SECONDS = 5
+READ_TIMEOUT_SECONDS = 30
+POOL_WAIT_SECONDS = 30
+# Idle connections older than this are dropped (servers close them around 60s).
+IDLE_SECONDS = 50
+# POST/PATCH can't be replayed if the server dropped the connection, so only reuse very warm ones.
+NON_IDEMPOTENT_MAX_IDLE_SECONDS = 5
+RETRY_BASE_SECONDS = 0.25
+RETRY_MAX_SECONDS = 4.0
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+LATENCY_SAMPLES = 200
+USER_AGENT = "karim-khaled-api/1.0"
+
+
+class TransportError(OSError):
+    """The request never produced an HTTP response (DNS, connect, TLS, timeout, pool wait)."""
+
+
+class Response:
+    """Status, headers and body of one response. Streamed bodies must be read or closed."""
+
+    def __init__(self, pool: "HostPool", conn, raw: http.client.HTTPResponse, stream: bool):
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        self._pool = pool
+        self._conn = conn
+        self._raw = raw
+        self._content: bytes | None = None
+        if not stream:
+            self._content = self._read_all()
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._read_all()
+        return self._content
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.content.decode(encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+    def read(self, amt: int | None = None) -> bytes:
+        if self._content is not None:
+            data, self._content = self._content, b""
+            return data
+        if self._raw is None:
+            return b""
+        try:
+            data = self._raw.read(amt)
+        except BaseException:
+            self._release(reusable=False)
+            raise
+        if not data or self._raw.isclosed():
+            self._release(reusable=True)
+        return data
+
+    def _read_all(self) -> bytes:
+        try:
+            data = self._raw.read()
+        except BaseException:
+            self._release(reusable=False)
+            raise
+        self._release(reusable=True)
+        return data
+
+    def close(self) -> None:
+        # An unread body leaves the socket mid-response; it can't be reused.
+        self._release(reusable=self._raw is not None and self._raw.isclosed())
+
+    def _release(self, reusable: bool) -> None:
+        if self._raw is None:
+            return
+        reusable = reusable and not self._raw.will_close
+        if not reusable:
+            self._raw.close()
+        self._raw = None
+        self._pool.release(self._conn, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HostPool:
+    """Keep-alive connections to one origin, at most max_size checked out at a time."""
+
+    def __init__(self, scheme: str, host: str, port: int, max_size: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle: list[tuple[http.client.HTTPConnection, float]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, connect_timeout: float, max_idle: float = IDLE_SECONDS) -> tuple[http.client.HTTPConnection, bool]:
+        """A (connection, reused) pair; blocks while the host is at max_size."""
+        if not self._slots.acquire(timeout=POOL_WAIT_SECONDS):
+            raise TransportError(f"Timed out waiting for a connection to {self.host}")
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle[-1]  # most recently used
+                if now - last_used >= IDLE_SECONDS:
+                    self._idle.pop()
+                    conn.close()
+                    continue
+                if now - last_used < max_idle:
+                    self._idle.pop()
+                    return conn, True
+                break  # warm enough for idempotent requests; this one gets a new connection
+        if self.scheme == "https":
+            conn = http.client.HTTPSConnection(
+                self.host, self.port, timeout=connect_timeout, context=_ssl_context()
+            )
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=connect_timeout)
+        return conn, False
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close_idle(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+
+class _HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.connects = 0
+        self.reused = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses: dict[int, int] = {}
+        self.samples: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+
+_pools: dict[tuple[str, str, int], HostPool] = {}
+_metrics: dict[str, _HostMetrics] = {}
+_registry_lock = threading.Lock()
+_ssl: ssl.SSLContext | None = None
+
+
+def _ssl_context() -> ssl.SSLContext:
+    global _ssl
+    if _ssl is None:
+        _ssl = ssl.create_default_context()
+    return _ssl
+
+
+def _overrides() -> dict[str, str]:
+    raw = getattr(settings, "OUTBOUND_HTTP_OVERRIDES", "") or ""
+    if isinstance(raw, dict):
+        return raw
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {host.strip().lower(): origin.strip() for host, origin in pairs}
+
+
+def _target(url: str) -> tuple[str, str, int, str, str]:
+    """(scheme, host, port, request path, metrics label) after applying overrides."""
+    parts = urlsplit(url)
+    label = (parts.hostname or "").lower()
+    origin = _overrides().get(label)
+    target = urlsplit(origin) if origin else parts
+    scheme = (target.scheme or "https").lower()
+    if scheme not in ("http", "https") or not target.hostname:
+        raise TransportError(f"Unsupported URL: {url}")
+    port = target.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return scheme, target.hostname, port, path, label
+
+
+def _pool_for(scheme: str, host: str, port: int) -> HostPool:
+    key = (scheme, host, port)
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            size = int(getattr(settings, "OUTBOUND_HTTP_MAX_PER_HOST", 8) or 8)
+            pool = _pools[key] = HostPool(scheme, host, port, size)
+        return pool
+
+
+def _host_metrics(label: str) -> _HostMetrics:
+    with _registry_lock:
+        m = _metrics.get(label)
+        if m is None:
+            m = _metrics[label] = _HostMetrics()
+        return m
+
+
+def _record(label: str, elapsed_ms: float, status: int | None, reused: bool | None) -> None:
+    m = _host_metrics(label)
+    with _registry_lock:
+        m.requests += 1
+        m.total_ms += elapsed_ms
+        m.max_ms = max(m.max_ms, elapsed_ms)
+        m.samples.append(elapsed_ms)
+        if status is None:
+            m.errors += 1
+        else:
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+        if reused is True:
+            m.reused += 1
+        elif reused is False:
+            m.connects += 1
+
+
+def _record_retry(label: str) -> None:
+    m = _host_metrics(label)
+    with _registry_lock:
+        m.retries += 1
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS))
+
+
+def _send(pool: HostPool, method: str, path: str, headers: dict, body, connect_timeout: float, read_timeout: float):
+    """
+    One attempt on a pooled connection. An idempotent request on a reused
+    connection the server already closed gets one retry on a fresh connection.
+    """
+    idempotent = method in IDEMPOTENT_METHODS
+    conn, reused = pool.acquire(
+        connect_timeout, IDLE_SECONDS if idempotent else NON_IDEMPOTENT_MAX_IDLE_SECONDS
+    )
+    try:
+        try:
+            if conn.sock is None:
+                conn.connect()
+            conn.sock.settimeout(read_timeout)
+            conn.request(method, path, body=body, headers=headers)
+            raw = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server may have acted on the request before dropping the connection.
+            if not (reused and idempotent):
+                raise
+            conn.close()
+            reused = False
+            conn.connect()
+            conn.sock.settimeout(read_timeout)
+            if hasattr(body, "seek"):
+                body.seek(0)
+            conn.request(method, path, body=body, headers=headers)
+            raw = conn.getresponse()
+    except BaseException:
+        pool.release(conn, reusable=False)
+        raise
+    return conn, raw, reused
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    headers: dict | None = None,
+    body: bytes | None = None,
+    timeout: float = READ_TIMEOUT_SECONDS,
+    connect_timeout: float = CONNECT_TIMEOUT_SECONDS,
+    retries: int | None = None,
+    stream: bool = False,
+) -> Response:
+    """
+    Send one request and return the Response whatever its status (callers
+    check .status / .ok). Raises TransportError when no response was received
+    after the retries. retries defaults to 2 for idempotent methods and 0 otherwise.
+    """
+    method = method.upper()
+    scheme, host, port, path, label = _target(url)
+    pool = _pool_for(scheme, host, port)
+    if retries is None:
+        retries = 2 if method in IDEMPOTENT_METHODS else 0
+    send_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+    send_headers.update(headers or {})
+    if body is not None and "Content-Length" not in send_headers:
+        send_headers["Content-Length"] = str(len(body))
+
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            conn, raw, reused = _send(pool, method, path, send_headers, body, connect_timeout, timeout)
+        except (OSError, http.client.HTTPException) as exc:
+            _record(label, (time.monotonic() - started) * 1000, None, None)
+            if attempt < retries:
+                attempt += 1
+                _record_retry(label)
+                time.sleep(backoff(attempt))
+                continue
+            raise TransportError(f"{method} {label} failed: {exc}") from exc
+        retry = raw.status in RETRY_STATUSES and attempt < retries
+        try:
+            response = Response(pool, conn, raw, stream=stream and not retry)
+        except (OSError, http.client.HTTPException) as exc:
+            _record(label, (time.monotonic() - started) * 1000, None, reused)
+            raise TransportError(f"{method} {label} failed reading the response: {exc}") from exc
+        _record(label, (time.monotonic() - started) * 1000, raw.status, reused)
+        if not retry:
+            return response
+        attempt += 1
+        _record_retry(label)
+        retry_after = response.headers.get("Retry-After") or ""
+        delay = backoff(attempt)
+        if retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), RETRY_MAX_SECONDS))
+        logger.info("Outbound %s %s -> HTTP %s, retry %d/%d", method, label, raw.status, attempt, retries)
+        time.sleep(delay)
+
+
+def get(url: str, **kwargs) -> Response:
+    return request("GET", url, **kwargs)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def metrics() -> dict:
+    """Per-host request counts, connection reuse and latency (ms) since process start."""
+    with _registry_lock:
+        snapshot = {
+            label: (m.requests, m.errors, m.retries, m.connects, m.reused, m.total_ms, m.max_ms,
+                    dict(m.statuses), list(m.samples))
+            for label, m in _metrics.items()
+        }
+        idle = {}
+        for (_scheme, host, _port), pool in _pools.items():
+            idle[host] = idle.get(host, 0) + pool.idle_count()
+    out = {}
+    for label, (requests, errors, retries, connects, reused, total_ms, max_ms, statuses, samples) in snapshot.items():
+        out[label] = {
+            "requests": requests,
+            "errors": errors,
+            "retries": retries,
+            "connections_opened": connects,
+            "connections_reused": reused,
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "avg_ms": round(total_ms / requests, 1) if requests else None,
+            "p50_ms": _percentile(samples, 0.5),
+            "p95_ms": _percentile(samples, 0.95),
+            "max_ms": round(max_ms, 1),
+            "idle_connections": idle.get(label, 0),
+        }
+    return out
+
+
+def close_all() -> None:
+    """Drop every idle connection (worker shutdown, tests)."""
+    with _registry_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_idle()
@@ -0,0 +1,381 @@
+"""
+Database-backed background jobs.
+
+Slow side-work is queued as BackgroundJob rows instead of running in the request
+thread. Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED on
+Postgres (a conditional UPDATE per row on SQLite), retry failures with
+exponential backoff and requeue jobs whose worker died (long jobs call
+heartbeat() so they are not mistaken for dead ones). Workers are either the
+in-process thread (JOBS_IN_PROCESS_WORKER, started from gunicorn) or a separate
+`python manage.py run_worker` process.
+
+Task functions register under a name with @job("name") and take JSON-able args.
+With DEFER_BACKGROUND_WORK=false a queued job runs inline right after commit.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Modules whose @job functions the worker must know about.
+TASK_MODULES = ("api.video_upload", "api.tiger_test", "api.bunny_library_map")
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+FINISHED_RETENTION = timedelta(days=7)
+
+# Long jobs refresh locked_at at most this often (see heartbeat()).
+HEARTBEAT_SECONDS = 60
+
+_registry: dict[str, tuple[Callable[..., Any], int]] = {}
+_tasks_loaded = False
+_running = threading.local()
+
+
+class JobLost(Exception):
+    """This runner's claim is gone (requeued as stale or run elsewhere); stop without recording anything."""
+
+
+def job(name: str, max_attempts: int = 5):
+    """Register fn as the task `name` (max_attempts runs before it stays failed)."""
+
+    def decorator(fn):
+        _registry[name] = (fn, max_attempts)
+        fn.job_name = name
+        return fn
+
+    return decorator
+
+
+def _load_tasks() -> None:
+    global _tasks_loaded
+    if _tasks_loaded:
+        return
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+    _tasks_loaded = True
+
+
+def _stale_after() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "JOBS_STALE_AFTER_SECONDS", 3600)))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with ±50% jitter so failed jobs don't retry in lockstep."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _dispatch(job_id) -> None:
+    """After commit: wake the worker, or run the job inline when work isn't deferred."""
+    if getattr(settings, "DEFER_BACKGROUND_WORK", False):
+        transaction.on_commit(_wake_worker)
+    else:
+        transaction.on_commit(lambda: run_job_now(job_id))
+
+
+def enqueue(
+    name: str,
+    args=(),
+    kwargs: dict | None = None,
+    *,
+    delay: float = 0,
+    dedupe_key: str = "",
+    max_attempts: int | None = None,
+) -> BackgroundJob:
+    """
+    Queue task `name`. With a dedupe_key an already queued/running job with the
+    same key is reused (a queued one is made due now) instead of adding another.
+    """
+    _load_tasks()
+    if name not in _registry:
+        raise LookupError(f"Unknown job {name!r}")
+    run_after = timezone.now() + timedelta(seconds=delay)
+    row = None
+    if dedupe_key:
+        row = (
+            BackgroundJob.objects.filter(
+                dedupe_key=dedupe_key,
+                status__in=(BackgroundJob.STATUS_QUEUED, BackgroundJob.STATUS_RUNNING),
+            )
+            .order_by("id")
+            .first()
+        )
+        if row is not None and row.status == BackgroundJob.STATUS_QUEUED and row.run_after > run_after:
+            row.run_after = run_after
+            row.save(update_fields=["run_after"])
+    if row is None:
+        row = BackgroundJob.objects.create(
+            name=name,
+            args=list(args),
+            kwargs=dict(kwargs or {}),
+            dedupe_key=dedupe_key,
+            max_attempts=max_attempts or _registry[name][1],
+            run_after=run_after,
+        )
+    if row.status == BackgroundJob.STATUS_QUEUED and not delay:
+        _dispatch(row.id)
+    return row
+
+
+def requeue(row: BackgroundJob) -> BackgroundJob:
+    """Give a failed job a fresh set of attempts and make it due now."""
+    row.status = BackgroundJob.STATUS_QUEUED
+    row.attempts = 0
+    row.run_after = timezone.now()
+    row.finished_at = None
+    row.locked_by = ""
+    row.locked_at = None
+    row.save(update_fields=["status", "attempts", "run_after", "finished_at", "locked_by", "locked_at"])
+    _dispatch(row.id)
+    return row
+
+
+def _claim_update(now, worker_id: str) -> dict:
+    return {
+        "status": BackgroundJob.STATUS_RUNNING,
+        "locked_by": worker_id[:100],
+        "locked_at": now,
+        "started_at": now,
+        "attempts": F("attempts") + 1,
+    }
+
+
+def claim_jobs(worker_id: str, limit: int = 10) -> list[BackgroundJob]:
+    """Mark up to `limit` due jobs as running for this worker and return them."""
+    now = timezone.now()
+    due = BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_QUEUED, run_after__lte=now
+    ).order_by("run_after", "id")
+    connection = connections[BackgroundJob.objects.db]
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit]
+            )
+            BackgroundJob.objects.filter(id__in=ids).update(**_claim_update(now, worker_id))
+    else:
+        # No row locks (SQLite): the conditional UPDATE decides which worker wins a row.
+        ids = [
+            job_id
+            for job_id in due.values_list("id", flat=True)[:limit]
+            if BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.STATUS_QUEUED).update(
+                **_claim_update(now, worker_id)
+            )
+        ]
+    return list(BackgroundJob.objects.filter(id__in=ids).order_by("run_after", "id"))
+
+
+def requeue_stale_jobs() -> int:
+    """Jobs left running by a worker that died: queue them again (or fail them if out of attempts)."""
+    cutoff = timezone.now() - _stale_after()
+    stale = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING, locked_at__lt=cutoff)
+    n = stale.filter(attempts__lt=F("max_attempts")).update(
+        status=BackgroundJob.STATUS_QUEUED,
+        locked_by="",
+        locked_at=None,
+        run_after=timezone.now(),
+        last_error="Worker stopped before the job finished.",
+    )
+    n += stale.update(
+        status=BackgroundJob.STATUS_FAILED,
+        finished_at=timezone.now(),
+        last_error="Worker stopped before the job finished.",
+    )
+    return n
+
+
+def heartbeat() -> None:
+    """
+    Called from inside long jobs (e.g. per upload chunk): refresh locked_at so
+    requeue_stale_jobs doesn't take a slow job for a dead one. Raises JobLost
+    when the claim was taken away, so two runners never work on one job.
+    """
+    current = getattr(_running, "job", None)
+    if current is None:
+        return
+    row, last = current
+    now = time.monotonic()
+    if now - last < HEARTBEAT_SECONDS:
+        return
+    if not BackgroundJob.objects.filter(
+        id=row.id,
+        status=BackgroundJob.STATUS_RUNNING,
+        locked_by=row.locked_by,
+        started_at=row.started_at,
+    ).update(locked_at=timezone.now()):
+        raise JobLost(f"Job {row.name} #{row.id} is no longer held by {row.locked_by}")
+    _running.job = (row, now)
+
+
+def purge_finished_jobs() -> int:
+    cutoff = timezone.now() - FINISHED_RETENTION
+    deleted, _ = BackgroundJob.objects.filter(
+        status__in=(BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_FAILED),
+        finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def execute(row: BackgroundJob) -> bool:
+    """Run one claimed job and record the outcome. Returns True on success."""
+    _load_tasks()
+    started = time.monotonic()
+    outer, _running.job = getattr(_running, "job", None), (row, started)
+    try:
+        entry = _registry.get(row.name)
+        if entry is None:
+            raise LookupError(f"Unknown job {row.name!r}")
+        entry[0](*row.args, **row.kwargs)
+    except JobLost as exc:
+        logger.warning("Job %s #%s abandoned: %s", row.name, row.id, exc)
+        return False
+    except Exception as exc:
+        now = timezone.now()
+        error = f"{type(exc).__name__}: {exc}"[:4000]
+        if row.attempts < row.max_attempts:
+            delay = retry_delay(row.attempts)
+            logger.warning(
+                "Job %s #%s failed (attempt %d/%d), retry in %.0fs: %s",
+                row.name, row.id, row.attempts, row.max_attempts, delay, exc,
+            )
+            BackgroundJob.objects.filter(id=row.id).update(
+                status=BackgroundJob.STATUS_QUEUED,
+                run_after=now + timedelta(seconds=delay),
+                locked_by="",
+                locked_at=None,
+                last_error=error,
+            )
+        else:
+            logger.exception("Job %s #%s failed permanently", row.name, row.id)
+            BackgroundJob.objects.filter(id=row.id).update(
+                status=BackgroundJob.STATUS_FAILED, finished_at=now, last_error=error
+            )
+        return False
+    finally:
+        # Inline jobs can nest (a job enqueuing another); restore the outer claim.
+        _running.job = outer
+    BackgroundJob.objects.filter(id=row.id).update(
+        status=BackgroundJob.STATUS_SUCCEEDED, finished_at=timezone.now(), last_error=""
+    )
+    logger.info("Job %s #%s done in %.0fms", row.name, row.id, (time.monotonic() - started) * 1000)
+    return True
+
+
+def run_pending(worker_id: str | None = None, limit: int = 10) -> int:
+    """Claim and run one batch of due jobs. Returns how many ran."""
+    worker_id = worker_id or default_worker_id()
+    rows = claim_jobs(worker_id, limit)
+    for row in rows:
+        execute(row)
+    return len(rows)
+
+
+def run_job_now(job_id) -> bool:
+    """Claim one specific job and run it in this thread (inline mode)."""
+    now = timezone.now()
+    if not BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.STATUS_QUEUED).update(
+        **_claim_update(now, default_worker_id())
+    ):
+        return False
+    return execute(BackgroundJob.objects.get(id=job_id))
+
+
+class Worker:
+    """Polling loop shared by the in-process thread and the run_worker command."""
+
+    def __init__(self, worker_id: str | None = None, poll_interval: float | None = None, batch_size: int = 10):
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else float(getattr(settings, "JOBS_POLL_SECONDS", 5))
+        )
+        self.batch_size = batch_size
+        self.wake = threading.Event()
+        self.stop = threading.Event()
+        self._last_housekeeping = 0.0
+
+    def _housekeeping(self) -> None:
+        if time.monotonic() - self._last_housekeeping < 300:
+            return
+        self._last_housekeeping = time.monotonic()
+        requeue_stale_jobs()
+        purge_finished_jobs()
+
+    def run_once(self) -> int:
+        try:
+            self._housekeeping()
+            return run_pending(self.worker_id, self.batch_size)
+        except Exception:
+            logger.exception("Job worker %s poll failed", self.worker_id)
+            return 0
+        finally:
+            connections.close_all()
+
+    def run_forever(self) -> None:
+        _load_tasks()
+        while not self.stop.is_set():
+            if self.run_once():
+                continue
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+
+_worker: Worker | None = None
+_worker_lock = threading.Lock()
+
+
+def start_worker_thread() -> Worker | None:
+    """Start the in-process worker (once per process) when JOBS_IN_PROCESS_WORKER is on."""
+    global _worker
+    if not getattr(settings, "JOBS_IN_PROCESS_WORKER", False):
+        return None
+    with _worker_lock:
+        if _worker is None:
+            _worker = Worker(worker_id=f"{socket.gethostname()}:{os.getpid()}:thread")
+            threading.Thread(target=_worker.run_forever, name="api-jobs", daemon=True).start()
+    return _worker
+
+
+def _wake_worker() -> None:
+    worker = start_worker_thread()
+    if worker is not None:
+        worker.wake.set()
+
+
+def job_payload(row: BackgroundJob) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "status": row.status,
+        "args": row.args,
+        "kwargs": row.kwargs,
+        "attempts": row.attempts,
+        "max_attempts": row.max_attempts,
+        "run_after": row.run_after.isoformat() if row.run_after else None,
+        "last_error": row.last_error,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+    }
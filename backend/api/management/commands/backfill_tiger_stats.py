@@ -0,0 +1,50 @@
+"""
+Rebuild per-student Tiger Test totals (TigerTestUserStats) from completed sessions.
+
+Totals are updated incrementally as attempts finish; run this once after
+deploying the stats table, or any time the totals look out of sync:
+
+    python manage.py backfill_tiger_stats --apply
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api import tiger_test as tt
+from api.models import TigerTestSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute TigerTestUserStats for every student with a completed Tiger Test. "
+        "Dry-run by default; pass --apply to write."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Persist updates to the database. Without this flag the command is dry-run.",
+        )
+
+    def handle(self, *args, **options):
+        apply_changes = bool(options.get("apply"))
+        user_ids = (
+            TigerTestSession.objects.filter(status=TigerTestSession.STATUS_COMPLETED)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        users = get_user_model().objects.filter(id__in=user_ids).order_by("id")
+
+        count = 0
+        for user in users.iterator(chunk_size=200):
+            count += 1
+            if apply_changes:
+                tt.rebuild_user_stats(user)
+
+        if not apply_changes:
+            self.stdout.write(f"Students with completed attempts: {count}")
+            self.stdout.write(
+                self.style.WARNING("Dry-run only. Re-run with --apply to rebuild their totals.")
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt Tiger Test totals for {count} student(s)."))
@@ -0,0 +1,64 @@
+"""
+Close Tiger Test sections whose server-side clock has run out.
+
+Sessions are also closed lazily when the student's client next talks to the
+API; this sweeper covers students who closed the tab mid-section.
+Run periodically (e.g. Render cron): python manage.py close_expired_tiger_sections
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import tiger_test as tt
+from api.models import TigerTestSession
+
+
+class Command(BaseCommand):
+    help = "Score/advance Tiger Test sessions whose section time has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show how many sessions would be closed without saving.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=500,
+            help="Close at most N sessions per run (default 500).",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        limit = max(1, int(options.get("limit") or 500))
+        cutoff = timezone.now() - timedelta(
+            seconds=tt.SECTION_SECONDS + tt.SECTION_GRACE_SECONDS
+        )
+        qs = (
+            TigerTestSession.objects.filter(
+                status=TigerTestSession.STATUS_IN_SECTION,
+                section_started_at__lte=cutoff,
+            )
+            .select_related("user")
+            .order_by("section_started_at")[:limit]
+        )
+
+        closed = 0
+        completed = 0
+        for session in qs:
+            if dry_run:
+                closed += 1
+                continue
+            if tt.close_section_if_expired(session):
+                closed += 1
+                if session.status == TigerTestSession.STATUS_COMPLETED:
+                    completed += 1
+
+        mode = "Would close" if dry_run else "Closed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{mode} {closed} expired section(s). Completed {completed} test(s)."
+            )
+        )
@@ -0,0 +1,207 @@
+"""
+EXPLAIN the app's hot querysets and flag the ones that scan a whole table.
+
+Each catalog entry mirrors a filter the tracker, Tiger Test or pool code runs
+on every request. The command picks a busy student (or --user-id), prints the
+plan summary and median run time per query, and marks sequential scans
+(Postgres "Seq Scan", SQLite "SCAN <table>" without an index); explicit sort
+steps are noted but not flagged.
+
+Read-only. --analyze uses EXPLAIN ANALYZE on Postgres (it runs the query).
+--strict exits non-zero when anything is flagged, for CI / staging checks.
+"""
+
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Avg, Count
+
+from api.models import (
+    IncorrectAnswer,
+    Lesson,
+    Question,
+    QuizAttempt,
+    StudentProgress,
+    TigerTestSession,
+    User,
+    VideoWatch,
+)
+from api.chapter_dashboard import DISABLED_SECTION_IDS
+from api.tiger_test import QUANT_SUBJECT_ID, VERBAL_SUBJECT_ID
+
+# Reads (nearly) every row by design; a full scan is the right plan, so it is reported but not flagged.
+EXPECTED_SCANS = {"question.pool_scan"}
+
+_PG_SEQ_SCAN_RE = re.compile(r"Seq Scan on (\w+)")
+_SQLITE_SCAN_RE = re.compile(r"\bSCAN (\w+)(.*)$")
+
+
+def _catalog(user, lesson, lesson_ids, student_ids):
+    """(name, queryset) for each hot query, bound to a sample student/lesson."""
+    answered = StudentProgress.objects.filter(user=user, answered_at__isnull=False)
+    return [
+        (
+            "progress.engaged_lessons",
+            answered.exclude(lesson_id__isnull=True).values_list("lesson_id", flat=True),
+        ),
+        (
+            "progress.correct_in_lessons",
+            answered.filter(lesson_id__in=lesson_ids, is_correct=True).values("id"),
+        ),
+        (
+            "progress.last_answered_in_lesson",
+            answered.filter(lesson=lesson).order_by("-answered_at")[:1],
+        ),
+        (
+            "incorrect.recent_for_user",
+            IncorrectAnswer.objects.filter(user=user).order_by("-created_at")[:50],
+        ),
+        (
+            "incorrect.group_lesson",
+            IncorrectAnswer.objects.filter(user_id__in=student_ids, lesson=lesson).values(
+                "user_id", "question_id"
+            ),
+        ),
+        (
+            "quiz.latest_for_user",
+            QuizAttempt.objects.filter(user=user).order_by("-completed_at")[:20],
+        ),
+        (
+            "quiz.admin_summary",
+            QuizAttempt.objects.filter(user_id__in=student_ids)
+            .values("user_id")
+            .annotate(n=Count("id"), avg=Avg("score")),
+        ),
+        (
+            "tiger.latest_completed",
+            TigerTestSession.objects.filter(user=user, status=TigerTestSession.STATUS_COMPLETED)
+            .order_by("-completed_at", "-created_at")
+            .only("id")[:1],
+        ),
+        (
+            "tiger.active",
+            TigerTestSession.objects.filter(
+                user=user,
+                status__in=[TigerTestSession.STATUS_IN_SECTION, TigerTestSession.STATUS_BETWEEN_SECTIONS],
+            ).only("id"),
+        ),
+        (
+            "question.pool_scan",
+            Question.objects.filter(subject_id__in=[VERBAL_SUBJECT_ID, QUANT_SUBJECT_ID])
+            .exclude(section_id__in=DISABLED_SECTION_IDS)
+            .values_list("id", flat=True),
+        ),
+        (
+            # QuestionViewSet ?subject_id= page count (disabled sections excluded).
+            "question.admin_subject_count",
+            Question.objects.filter(subject_id=QUANT_SUBJECT_ID)
+            .exclude(section_id__in=DISABLED_SECTION_IDS)
+            .order_by()
+            .values("subject_id")
+            .annotate(n=Count("*")),
+        ),
+        (
+            "video_watch.user_lesson",
+            VideoWatch.objects.filter(user=user, lesson=lesson).values("id", "watch_count"),
+        ),
+    ]
+
+
+def _seq_scans(plan: str) -> list[str]:
+    """Tables the plan reads in full."""
+    if connection.vendor == "postgresql":
+        return _PG_SEQ_SCAN_RE.findall(plan)
+    tables = []
+    for line in plan.splitlines():
+        m = _SQLITE_SCAN_RE.search(line)
+        if m and "USING" not in m.group(2):
+            tables.append(m.group(1))
+    return tables
+
+
+def _sorts(plan: str) -> bool:
+    """Explicit sort step (informational: sorting one student's rows is cheap)."""
+    if connection.vendor == "postgresql":
+        return bool(re.search(r"^\s*(->\s*)?Sort\b", plan, re.MULTILINE))
+    return "USE TEMP B-TREE FOR ORDER BY" in plan
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN hot tracker / Tiger Test querysets and flag sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, help="Student to bind the queries to (default: the busiest).")
+        parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (Postgres only).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (median is reported).")
+        parser.add_argument("--only", help="Comma-separated catalog names to run.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print full plans.")
+        parser.add_argument("--strict", action="store_true", help="Exit non-zero when anything is flagged.")
+
+    def _sample(self, user_id):
+        if user_id:
+            user = User.objects.filter(id=user_id).first()
+            if user is None:
+                raise CommandError(f"User {user_id} not found.")
+        else:
+            busiest = (
+                StudentProgress.objects.values("user_id")
+                .annotate(n=Count("id"))
+                .order_by("-n")
+                .values_list("user_id", flat=True)
+                .first()
+            )
+            user = User.objects.filter(id=busiest).first() if busiest else User.objects.filter(role="student").first()
+        if user is None:
+            raise CommandError("No students to sample; load data first.")
+        lesson_ids = list(
+            StudentProgress.objects.filter(user=user).exclude(lesson_id__isnull=True)
+            .values_list("lesson_id", flat=True).distinct()[:50]
+        ) or list(Lesson.objects.values_list("id", flat=True)[:50])
+        lesson = Lesson.objects.filter(id__in=lesson_ids[:1]).first() or Lesson.objects.first()
+        student_ids = list(User.objects.filter(role="student").values_list("id", flat=True)[:200])
+        return user, lesson, lesson_ids, student_ids
+
+    def handle(self, *args, **options):
+        analyze = options["analyze"] and connection.vendor == "postgresql"
+        repeat = max(1, options["repeat"])
+        only = {n.strip() for n in (options.get("only") or "").split(",") if n.strip()}
+        user, lesson, lesson_ids, student_ids = self._sample(options.get("user_id"))
+        self.stdout.write(
+            f"Backend: {connection.vendor}. Sample student {user.id}, lesson {getattr(lesson, 'id', None)}, "
+            f"{len(lesson_ids)} lessons, {len(student_ids)} students."
+        )
+
+        flagged = 0
+        for name, qs in _catalog(user, lesson, lesson_ids, student_ids):
+            if only and name not in only:
+                continue
+            plan = qs.explain(analyze=True) if analyze else qs.explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(qs.all())  # fresh clone: no result cache
+                timings.append((time.perf_counter() - started) * 1000)
+            scans = _seq_scans(plan)
+            expected = name in EXPECTED_SCANS
+            notes = [f"seq scan {t}" + (" (expected)" if expected else "") for t in scans]
+            notes += ["sort"] if _sorts(plan) else []
+            if expected:
+                scans = []
+            flagged += bool(scans)
+            status = self.style.WARNING("FLAG") if scans else self.style.SUCCESS("ok  ")
+            self.stdout.write(
+                f"{status} {name:<34} {statistics.median(timings):8.2f} ms  {', '.join(notes)}"
+            )
+            if options["verbose_plans"] or scans:
+                for line in plan.splitlines():
+                    self.stdout.write(f"       {line}")
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f"{flagged} query(ies) flagged."))
+            if options["strict"]:
+                raise CommandError("Index advisor found unindexed hot queries.")
+        else:
+            self.stdout.write(self.style.SUCCESS("No sequential scans on hot queries."))
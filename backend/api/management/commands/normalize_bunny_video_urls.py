@@ -7,6 +7,11 @@ Why:
 
 Default behavior is dry-run (no DB writes).
 Use --apply to persist updates.
+
+--backfill-index only fills the indexed Video.bunny_video_id column (parsed
+from video_url, rows written with bulk_update) and leaves video_url as is.
+Migration 0036 fills existing rows; this is an idempotent repair for rows
+whose video_url was changed with queryset.update().
 """
 
 from django.core.management.base import BaseCommand
@@ -39,6 +44,18 @@ class Command(BaseCommand):
             default=None,
             help="Process at most N rows (useful for incremental rollout).",
         )
+        parser.add_argument(
+            "--backfill-index",
+            action="store_true",
+            dest="backfill_index",
+            help="Only fill Video.bunny_video_id for rows where it is missing or stale (always writes).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows per bulk_update (default 500).",
+        )
         parser.add_argument(
             "--verbose-list",
             action="store_true",
@@ -46,7 +63,30 @@ class Command(BaseCommand):
             help="Print every candidate/update row (can be noisy on large datasets).",
         )
 
+    def _backfill_index(self, batch_size):
+        stale = []
+        scanned = 0
+        for video in Video.objects.only("id", "video_url", "bunny_video_id").order_by("id").iterator(
+            chunk_size=2000
+        ):
+            scanned += 1
+            parsed = extract_bunny_video_id(video.video_url or "") or ""
+            if parsed != video.bunny_video_id:
+                video.bunny_video_id = parsed
+                stale.append(video)
+        Video.objects.bulk_update(stale, ["bunny_video_id"], batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"bunny_video_id: scanned {scanned} row(s), updated {len(stale)}."
+            )
+        )
+
     def handle(self, *args, **options):
+        batch_size = max(1, int(options.get("batch_size") or 500))
+        if options.get("backfill_index"):
+            self._backfill_index(batch_size)
+            return
+
         apply_changes = bool(options.get("apply"))
         limit = options.get("limit")
         verbose_list = bool(options.get("verbose_list"))
@@ -128,12 +168,17 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("No normalization changes were needed."))
             return
 
+        rows = [
+            Video(pk=video_id, video_url=new_id, bunny_video_id=new_id, bunny_library_id=new_lib)
+            for video_id, _, new_id, new_lib in candidates
+        ]
+        with_lib = [v for v in rows if v.bunny_library_id]
+        without_lib = [v for v in rows if not v.bunny_library_id]
         with transaction.atomic():
-            for video_id, _, new_id, new_lib in candidates:
-                updates = {"video_url": new_id}
-                if new_lib:
-                    updates["bunny_library_id"] = new_lib
-                Video.objects.filter(pk=video_id).update(**updates)
+            Video.objects.bulk_update(
+                with_lib, ["video_url", "bunny_video_id", "bunny_library_id"], batch_size=batch_size
+            )
+            Video.objects.bulk_update(without_lib, ["video_url", "bunny_video_id"], batch_size=batch_size)
 
         self.stdout.write("")
         self.stdout.write(
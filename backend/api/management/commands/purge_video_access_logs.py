@@ -0,0 +1,139 @@
+"""
+Roll old VideoAccessLog rows into VideoAccessDaily and delete them in small batches.
+
+Each batch is rolled up and deleted in one short transaction, so an interrupted
+run never double-counts and the log table is never locked for long. The batch's
+log rows are locked with SKIP LOCKED, so overlapping runs (a slow cron) split
+the work instead of rolling the same rows up twice. Hourly abuse counters older
+than the detector's 24 h window are dropped as well.
+Run daily (e.g. Render cron):
+
+    python manage.py purge_video_access_logs --days 90
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import abuse_signals
+from api.models import VideoAccessDaily, VideoAccessLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize VideoAccessLog rows older than --days into VideoAccessDaily, "
+        "then delete them in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Keep raw rows for this many days (default 90).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows rolled up and deleted per transaction (default 1000).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=0,
+            help="Stop after N batches (default 0 = until done).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches to leave room for live traffic.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count rows that would be purged.",
+        )
+
+    def _roll_up_batch(self, rows):
+        """Merge one batch of raw rows into the daily table. Returns the ids to delete."""
+        groups = {}
+        for row in rows:
+            key = (timezone.localdate(row["requested_at"]), row["user_id"], row["video_id"])
+            g = groups.setdefault(key, {"requests": 0, "ips": set(), "risk": VideoAccessLog.RISK_OK})
+            g["requests"] += 1 + int(row["reuse_count"] or 0)
+            if row["ip_address"]:
+                g["ips"].add(row["ip_address"])
+            if VideoAccessDaily.RISK_RANK.get(row["risk_level"], 0) > VideoAccessDaily.RISK_RANK[g["risk"]]:
+                g["risk"] = row["risk_level"]
+
+        # Insert missing daily rows first so the locking read below sees (and locks)
+        # every one of them; an overlapping run then waits instead of colliding.
+        VideoAccessDaily.objects.bulk_create(
+            [VideoAccessDaily(day=d, user_id=u, video_id=v) for d, u, v in groups],
+            ignore_conflicts=True,
+        )
+        days = {day for day, _u, _v in groups}
+        users = {u for _d, u, _v in groups}
+        to_update = []
+        for daily in VideoAccessDaily.objects.select_for_update().filter(day__in=days, user_id__in=users):
+            g = groups.get((daily.day, daily.user_id, daily.video_id))
+            if g is None:
+                continue
+            ips = sorted(set(daily.ip_addresses or []) | g["ips"])
+            daily.requests += g["requests"]
+            daily.ip_addresses = ips
+            daily.distinct_ips = len(ips)
+            if VideoAccessDaily.RISK_RANK.get(g["risk"], 0) > VideoAccessDaily.RISK_RANK.get(daily.max_risk, 0):
+                daily.max_risk = g["risk"]
+            to_update.append(daily)
+        VideoAccessDaily.objects.bulk_update(
+            to_update, ["requests", "distinct_ips", "ip_addresses", "max_risk"], batch_size=500
+        )
+        return [row["id"] for row in rows]
+
+    def handle(self, *args, **options):
+        days = max(1, int(options["days"]))
+        batch_size = max(1, int(options["batch_size"]))
+        max_batches = max(0, int(options["max_batches"] or 0))
+        pause = max(0.0, float(options["sleep"] or 0))
+        cutoff = timezone.now() - timedelta(days=days)
+        old = VideoAccessLog.objects.filter(requested_at__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"Rows older than {days} day(s): {old.count()}")
+            self.stdout.write(self.style.WARNING("Dry-run only. Nothing was changed."))
+            return
+
+        fields = ("id", "user_id", "video_id", "ip_address", "requested_at", "risk_level", "reuse_count")
+        started = time.monotonic()
+        purged = 0
+        batches = 0
+        while not max_batches or batches < max_batches:
+            with transaction.atomic():
+                # Rows another (overlapping) run has locked are skipped, never rolled up twice.
+                rows = list(
+                    old.select_for_update(skip_locked=True).order_by("id").values(*fields)[:batch_size]
+                )
+                if not rows:
+                    break
+                ids = self._roll_up_batch(rows)
+                VideoAccessLog.objects.filter(id__in=ids).delete()
+            purged += len(ids)
+            batches += 1
+            if pause:
+                time.sleep(pause)
+
+        counters = abuse_signals.prune(abuse_signals.window_start())
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {purged} row(s) older than {days} day(s) in {batches} batch(es), "
+                f"{elapsed:.1f}s ({purged / elapsed:.0f} rows/s); "
+                f"dropped {counters} expired hourly abuse counter(s)."
+            )
+        )
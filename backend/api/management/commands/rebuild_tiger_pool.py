@@ -0,0 +1,26 @@
+"""
+Rebuild the cached Tiger Test question pool from scratch.
+
+Question edits patch the cached pool in place (tiger_test.update_slot_pool) and
+a background job refreshes it hourly; run this from cron as an extra consistency check. It
+reports how far the cached pool had drifted. Only meaningful with a shared
+cache backend (REDIS_URL) — LocMem caches are per process.
+
+    python manage.py rebuild_tiger_pool
+"""
+from django.core.management.base import BaseCommand
+
+from api import tiger_test as tt
+
+
+class Command(BaseCommand):
+    help = "Fully rebuild the cached Tiger Test slot pool and report drift."
+
+    def handle(self, *args, **options):
+        report = tt.rebuild_slot_pool()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Tiger pool rebuilt: {report['verbal']} verbal / {report['quant']} quant slots. "
+                f"Drift vs cache: +{report['added']} / -{report['removed']}."
+            )
+        )
@@ -0,0 +1,70 @@
+"""
+Refresh answer keys embedded in Tiger Test session layouts.
+
+Sessions capture each slot's correct answer when they are built, so fixing an
+answer key in the admin does not change existing attempts. Run this after such
+a fix to re-read the keys and rescore completed attempts:
+
+    python manage.py rekey_tiger_sessions --question q_123 --apply
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api import tiger_test as tt
+from api.models import TigerTestSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-read embedded Tiger Test answer keys from the question bank and "
+        "rescore completed attempts. Dry-run by default; pass --apply to write."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--question",
+            action="append",
+            dest="questions",
+            default=[],
+            help="Question id whose key changed (repeatable). Omit to re-key every session.",
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Persist updates to the database. Without this flag the command is dry-run.",
+        )
+
+    def handle(self, *args, **options):
+        question_ids = {q.strip() for q in options["questions"] if q and q.strip()}
+        apply_changes = bool(options.get("apply"))
+
+        qs = TigerTestSession.objects.all()
+        if question_ids:
+            match = Q()
+            for qid in question_ids:
+                # Text match on the JSON column; the escaped form covers
+                # backends that store non-ASCII ids as \uXXXX.
+                match |= Q(section_slots__icontains=qid)
+                match |= Q(section_slots__icontains=json.dumps(qid)[1:-1])
+            qs = qs.filter(match)
+
+        scanned = 0
+        changed = 0
+        for session in qs.order_by("created_at").iterator(chunk_size=100):
+            scanned += 1
+            if not apply_changes:
+                continue
+            if tt.rekey_session(session, question_ids or None):
+                changed += 1
+
+        if not apply_changes:
+            self.stdout.write(f"Sessions referencing the question(s): {scanned}")
+            self.stdout.write(
+                self.style.WARNING("Dry-run only. Re-run with --apply to re-key them.")
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Scanned {scanned} session(s). Re-keyed {changed}.")
+        )
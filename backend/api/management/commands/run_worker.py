@@ -0,0 +1,69 @@
+"""
+Run queued BackgroundJob rows (Bunny uploads, tracker writes, cache rebuilds).
+
+Use as a separate Render background worker and set JOBS_IN_PROCESS_WORKER=false
+on the web service, or run once from cron to drain the queue:
+
+    python manage.py run_worker
+    python manage.py run_worker --once
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api import jobs
+
+
+class Command(BaseCommand):
+    help = "Poll the database job queue and run due jobs until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every job that is due now, then exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Jobs claimed per poll (default 10).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds to wait when the queue is empty (default JOBS_POLL_SECONDS).",
+        )
+        parser.add_argument(
+            "--worker-id",
+            default="",
+            help="Name recorded on claimed jobs (default host:pid:thread).",
+        )
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(
+            worker_id=options["worker_id"] or None,
+            poll_interval=options["poll_interval"],
+            batch_size=max(1, int(options["batch_size"])),
+        )
+        if options["once"]:
+            total = 0
+            while True:
+                ran = worker.run_once()
+                if not ran:
+                    break
+                total += ran
+            self.stdout.write(self.style.SUCCESS(f"Ran {total} job(s)."))
+            return
+
+        def _stop(signum, frame):
+            # Finish the job in hand, then exit.
+            worker.stop.set()
+            worker.wake.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+        self.stdout.write(f"Job worker {worker.worker_id} started.")
+        worker.run_forever()
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
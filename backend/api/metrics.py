@@ -0,0 +1,195 @@
+"""
+In-process request metrics, exported in Prometheus text format.
+
+RequestMetricsMiddleware opens a RequestStats for each request. A DB execute
+wrapper, the instrumented cache backends (api.cache_backends) and the gzip
+middleware add to it, and on the way out it is folded into per-(view name,
+method) totals and a latency histogram under one short lock. The numbers are
+per process; gunicorn runs a single worker, so one scrape sees everything.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import http_client
+
+# Upper bounds in seconds (Prometheus le labels); the last bucket is +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED = "unresolved"
+
+
+class RequestStats:
+    __slots__ = ("started", "db_queries", "db_seconds", "cache_hits", "cache_misses", "raw_bytes")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.raw_bytes: int | None = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """DB execute wrapper: time every query on this request's connections."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+class _Series:
+    __slots__ = ("count", "seconds", "buckets", "db_queries", "db_seconds", "cache_hits",
+                 "cache_misses", "raw_bytes", "sent_bytes", "statuses")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.statuses: dict[str, int] = {}
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("api_request_stats", default=None)
+_series: dict[tuple[str, str], _Series] = {}
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "METRICS_ENABLED", True))
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+def count_cache(hit: bool, n: int = 1) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += n
+    else:
+        stats.cache_misses += n
+
+
+def begin() -> tuple[RequestStats, contextvars.Token, ExitStack]:
+    stats = RequestStats()
+    token = _current.set(stats)
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(stats))
+    return stats, token, stack
+
+
+def end(stats: RequestStats, token: contextvars.Token, stack: ExitStack) -> None:
+    stack.close()
+    _current.reset(token)
+
+
+def record(view: str, method: str, status: int, stats: RequestStats, sent_bytes: int | None) -> float:
+    """Fold one finished request into the totals. Returns its duration in seconds."""
+    elapsed = time.perf_counter() - stats.started
+    bucket = len(LATENCY_BUCKETS)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if elapsed <= bound:
+            bucket = i
+            break
+    status_class = f"{status // 100}xx"
+    with _lock:
+        series = _series.get((view, method))
+        if series is None:
+            series = _series[(view, method)] = _Series()
+        series.count += 1
+        series.seconds += elapsed
+        series.buckets[bucket] += 1
+        series.db_queries += stats.db_queries
+        series.db_seconds += stats.db_seconds
+        series.cache_hits += stats.cache_hits
+        series.cache_misses += stats.cache_misses
+        if sent_bytes is not None:
+            series.sent_bytes += sent_bytes
+            series.raw_bytes += stats.raw_bytes if stats.raw_bytes is not None else sent_bytes
+        series.statuses[status_class] = series.statuses.get(status_class, 0) + 1
+    return elapsed
+
+
+def server_timing(stats: RequestStats, elapsed: float) -> str:
+    return (
+        f"app;dur={elapsed * 1000:.1f}, "
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries", '
+        f'cache;desc="{stats.cache_hits} hits {stats.cache_misses} misses"'
+    )
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """All series in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        snapshot = [
+            (view, method, s.count, s.seconds, list(s.buckets), s.db_queries, s.db_seconds, s.cache_hits,
+             s.cache_misses, s.raw_bytes, s.sent_bytes, dict(s.statuses))
+            for (view, method), s in sorted(_series.items())
+        ]
+    families = {
+        "api_request_duration_seconds": ("histogram", "Request latency by view and method.", []),
+        "api_requests_total": ("counter", "Requests by view, method and status class.", []),
+        "api_db_queries_total": ("counter", "DB queries run while handling requests.", []),
+        "api_db_seconds_total": ("counter", "Time spent in DB queries.", []),
+        "api_cache_hits_total": ("counter", "Cache hits while handling requests.", []),
+        "api_cache_misses_total": ("counter", "Cache misses while handling requests.", []),
+        "api_response_bytes_total": ("counter", "Response body bytes before (raw) and after (sent) compression.", []),
+    }
+    for view, method, count, seconds, buckets, queries, db_seconds, hits, misses, raw, sent, statuses in snapshot:
+        base = f'view="{_label(view)}",method="{method}"'
+        hist = families["api_request_duration_seconds"][2]
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, buckets):
+            cumulative += n
+            hist.append(f'api_request_duration_seconds_bucket{{{base},le="{bound}"}} {cumulative}')
+        hist.append(f'api_request_duration_seconds_bucket{{{base},le="+Inf"}} {count}')
+        hist.append(f"api_request_duration_seconds_sum{{{base}}} {seconds:.6f}")
+        hist.append(f"api_request_duration_seconds_count{{{base}}} {count}")
+        for status_class, n in sorted(statuses.items()):
+            families["api_requests_total"][2].append(f'api_requests_total{{{base},status="{status_class}"}} {n}')
+        families["api_db_queries_total"][2].append(f"api_db_queries_total{{{base}}} {queries}")
+        families["api_db_seconds_total"][2].append(f"api_db_seconds_total{{{base}}} {db_seconds:.6f}")
+        families["api_cache_hits_total"][2].append(f"api_cache_hits_total{{{base}}} {hits}")
+        families["api_cache_misses_total"][2].append(f"api_cache_misses_total{{{base}}} {misses}")
+        families["api_response_bytes_total"][2].append(f'api_response_bytes_total{{{base},stage="raw"}} {raw}')
+        families["api_response_bytes_total"][2].append(f'api_response_bytes_total{{{base},stage="sent"}} {sent}')
+
+    outbound = http_client.metrics()
+    families["api_outbound_requests_total"] = ("counter", "Outbound HTTP requests by host.", [
+        f'api_outbound_requests_total{{host="{_label(host)}"}} {m["requests"]}' for host, m in sorted(outbound.items())
+    ])
+    families["api_outbound_errors_total"] = ("counter", "Outbound HTTP requests that got no response.", [
+        f'api_outbound_errors_total{{host="{_label(host)}"}} {m["errors"]}' for host, m in sorted(outbound.items())
+    ])
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _series.clear()
@@ -0,0 +1,88 @@
+"""Project middleware."""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+from . import db_routing, metrics
+
+_KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+_SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class RequestMetricsMiddleware:
+    """
+    Outermost middleware: per-view latency, DB queries/time, cache hits/misses
+    and response bytes (api.metrics), plus a Server-Timing header for staff
+    users (or everyone when DEBUG) so query counts and timings don't leak to
+    anonymous callers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics.enabled():
+            return self.get_response(request)
+        stats, token, stack = metrics.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end(stats, token, stack)
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else '') or metrics.UNRESOLVED
+        method = request.method if request.method in _KNOWN_METHODS else 'OTHER'
+        elapsed = metrics.record(view, method, response.status_code, stats, _sent_bytes(response))
+        if getattr(settings, 'METRICS_SERVER_TIMING', True) and _may_see_timing(request):
+            response['Server-Timing'] = metrics.server_timing(stats, elapsed)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    After a successful write request, keep that user's replica-eligible reads on
+    the primary for REPLICA_READ_AFTER_WRITE_SECONDS (api.db_routing).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in _SAFE_METHODS and response.status_code < 400 and db_routing.replica_configured():
+            # DRF sets the token-authenticated user back on the Django request.
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                db_routing.note_write(user.pk)
+        return response
+
+
+def _may_see_timing(request):
+    if settings.DEBUG:
+        return True
+    # DRF sets the token-authenticated user back on the Django request.
+    user = getattr(request, 'user', None)
+    # Same audience as the staff-only /api/metrics/ endpoint.
+    return bool(user is not None and user.is_authenticated and getattr(user, 'is_content_staff', False))
+
+
+def _sent_bytes(response):
+    if not response.streaming:
+        return len(response.content)
+    try:
+        return int(response['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+class RangeAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZip, except for byte-range capable responses (file proxy): compressing them
+    would drop Content-Length and make Content-Range offsets meaningless.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Accept-Ranges') and response['Accept-Ranges'] != 'none':
+            return response
+        stats = metrics.current()
+        if stats is not None and not response.streaming:
+            stats.raw_bytes = len(response.content)
+        return super().process_response(request, response)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:53
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_section_count(apps, schema_editor):
+    """Existing sessions get len(section_slots); empty layouts keep the default."""
+    TigerTestSession = apps.get_model('api', 'TigerTestSession')
+    ids_by_count = defaultdict(list)
+    for pk, slots in TigerTestSession.objects.values_list('id', 'section_slots').iterator(chunk_size=500):
+        if slots and len(slots) != 5:
+            ids_by_count[len(slots)].append(pk)
+    for count, ids in ids_by_count.items():
+        for i in range(0, len(ids), 500):
+            TigerTestSession.objects.filter(id__in=ids[i:i + 500]).update(section_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_tigertestsession_section_seconds_24'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tigertestsession',
+            name='section_count',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+        migrations.RunPython(backfill_section_count, migrations.RunPython.noop),
+    ]
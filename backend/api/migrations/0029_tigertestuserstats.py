@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_tigertestsession_section_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TigerTestUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('verbal_correct', models.PositiveIntegerField(default=0)),
+                ('verbal_total', models.PositiveIntegerField(default=0)),
+                ('quant_correct', models.PositiveIntegerField(default=0)),
+                ('quant_total', models.PositiveIntegerField(default=0)),
+                ('latest_verbal_percentage', models.FloatField(default=0.0)),
+                ('latest_quant_percentage', models.FloatField(default=0.0)),
+                ('latest_final_percentage', models.PositiveSmallIntegerField(default=0)),
+                ('latest_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tiger_test_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
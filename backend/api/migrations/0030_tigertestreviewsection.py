@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_tigertestuserstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TigerTestReviewSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section_number', models.PositiveSmallIntegerField()),
+                ('items', models.JSONField(default=list)),
+                ('parent_ids', models.JSONField(default=list)),
+                ('lesson_ids', models.JSONField(default=list)),
+                ('content_stamp', models.CharField(max_length=40)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_sections', to='api.tigertestsession')),
+            ],
+            options={
+                'ordering': ['section_number'],
+                'unique_together': {('session', 'section_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_tigertestreviewsection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BunnyVideoLibrary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=100, unique=True)),
+                ('library_id', models.CharField(blank=True, default='', max_length=50)),
+                ('verified_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Bunny video libraries',
+            },
+        ),
+    ]
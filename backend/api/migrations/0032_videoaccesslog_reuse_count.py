@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_bunnyvideolibrary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoaccesslog',
+            name='last_reused_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videoaccesslog',
+            name='reuse_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
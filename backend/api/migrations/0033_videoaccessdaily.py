@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_videoaccesslog_reuse_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoAccessDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('video_id', models.CharField(max_length=200)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('distinct_ips', models.PositiveIntegerField(default=0)),
+                ('ip_addresses', models.JSONField(default=list)),
+                ('max_risk', models.CharField(choices=[('ok', 'OK'), ('warn', 'Warning'), ('flag', 'Flagged')], default='ok', max_length=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_access_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='api_videoac_user_id_913b11_idx')],
+                'unique_together': {('day', 'user', 'video_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_videoaccessdaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('library_id', models.CharField(max_length=50)),
+                ('bunny_video_id', models.CharField(max_length=100)),
+                ('file_path', models.CharField(max_length=500)),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('bytes_uploaded', models.BigIntegerField(default=0)),
+                ('tus_url', models.CharField(blank=True, max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='video_uploads', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='api.video')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
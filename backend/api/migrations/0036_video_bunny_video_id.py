@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+from api.utils import extract_bunny_video_id
+
+
+def backfill_bunny_video_id(apps, schema_editor):
+    """Parse the id from video_url for rows saved before the column existed."""
+    Video = apps.get_model('api', 'Video')
+    stale = []
+    rows = Video.objects.only('id', 'video_url').exclude(video_url__isnull=True).exclude(video_url='')
+    for video in rows.iterator(chunk_size=2000):
+        parsed = extract_bunny_video_id(video.video_url) or ''
+        if parsed:
+            video.bunny_video_id = parsed
+            stale.append(video)
+        if len(stale) >= 500:
+            Video.objects.bulk_update(stale, ['bunny_video_id'])
+            stale = []
+    Video.objects.bulk_update(stale, ['bunny_video_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='bunny_video_id',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_bunny_video_id, migrations.RunPython.noop),
+    ]
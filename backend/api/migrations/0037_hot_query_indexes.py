@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0036_video_bunny_video_id'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tigertestsession',
+            name='api_tiger_user_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='incorrectanswer',
+            index=models.Index(fields=['user', '-created_at'], name='api_ia_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incorrectanswer',
+            index=models.Index(fields=['user', 'lesson'], name='api_ia_user_lesson_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-completed_at'], name='api_qa_user_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(fields=['user', 'lesson', 'answered_at'], name='api_sp_user_lesson_ans_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(condition=models.Q(('answered_at__isnull', False)), fields=['user', 'is_correct', 'lesson'], name='api_sp_user_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tigertestsession',
+            index=models.Index(fields=['user', 'status', '-completed_at'], name='api_tiger_user_status_done_idx'),
+        ),
+    ]
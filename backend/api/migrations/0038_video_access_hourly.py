@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:00
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+
+def backfill_last_day(apps, schema_editor):
+    """Seed the counters from the last 24 h of the log so the first window is complete."""
+    VideoAccessLog = apps.get_model('api', 'VideoAccessLog')
+    VideoAccessHourly = apps.get_model('api', 'VideoAccessHourly')
+    now = timezone.now()
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+    window = VideoAccessLog.objects.filter(requested_at__gte=since)
+    ips = {
+        (user_id, video_id): n
+        for user_id, video_id, n in window.values('user_id', 'video_id')
+        .annotate(n=Count('ip_address', distinct=True))
+        .values_list('user_id', 'video_id', 'n')
+    }
+    hourly = (
+        window.annotate(hour=TruncHour('requested_at', tzinfo=dt_timezone.utc))
+        .values('hour', 'user_id', 'video_id')
+        .annotate(n=Count('id') + Coalesce(Sum('reuse_count'), 0))
+        .values_list('hour', 'user_id', 'video_id', 'n')
+    )
+    VideoAccessHourly.objects.bulk_create(
+        (
+            VideoAccessHourly(
+                hour=hour, user_id=user_id, video_id=video_id, requests=n,
+                distinct_ips=ips.get((user_id, video_id), 0),
+            )
+            for hour, user_id, video_id, n in hourly.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoAccessHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('video_id', models.CharField(max_length=200)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('distinct_ips', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='videoaccesslog',
+            index=models.Index(condition=models.Q(('risk_level', 'flag')), fields=['requested_at'], name='api_val_flagged_idx'),
+        ),
+        migrations.AddField(
+            model_name='videoaccesshourly',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_access_hourly', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='videoaccesshourly',
+            unique_together={('hour', 'user', 'video_id')},
+        ),
+        migrations.RunPython(backfill_last_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_video_access_hourly'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['subject', 'section'], name='api_question_subj_sect_idx'),
+        ),
+    ]
@@ -1,9 +1,12 @@
 import uuid
 
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .utils import extract_bunny_video_id
+
 
 class User(AbstractUser):
     """Custom User model with admin/student roles and permissions."""
@@ -205,6 +208,10 @@ class Question(models.Model):
     
     class Meta:
         ordering = ['order_index', '-created_at']
+        indexes = [
+            # Bank listings filter on subject and exclude disabled sections; answered from the index alone.
+            models.Index(fields=['subject', 'section'], name='api_question_subj_sect_idx'),
+        ]
     
     def __str__(self):
         return f"Question {self.id}"
@@ -249,6 +256,8 @@ class Video(models.Model):
     video_url = models.CharField(max_length=800, blank=True, null=True)
     # For multi-library Bunny setups: which Stream library contains this video.
     bunny_library_id = models.CharField(max_length=50, blank=True, null=True)
+    # Bunny video id parsed from video_url on save (raw id or legacy URL); indexed for playback lookups.
+    bunny_video_id = models.CharField(max_length=100, blank=True, default='', db_index=True, editable=False)
     thumbnail = models.ImageField(upload_to='videos/thumbnails/', blank=True, null=True)
     duration = models.IntegerField(default=0)  # Duration in seconds
     order = models.IntegerField(default=0)
@@ -266,6 +275,13 @@ class Video(models.Model):
             models.Index(fields=['lesson'], name='api_video_lesson_idx'),
         ]
     
+    def save(self, *args, **kwargs):
+        self.bunny_video_id = extract_bunny_video_id(self.video_url or '') or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'bunny_video_id'}
+        super().save(*args, **kwargs)
+
     def sync_hierarchy_from_lesson(self, save=True):
         """Copy chapter/category/subject/section from lesson for student chapter listings."""
         if not self.lesson_id:
@@ -296,6 +312,45 @@ class Video(models.Model):
         return self.title
 
 
+class VideoUpload(models.Model):
+    """
+    Background upload of an admin's video file to Bunny Stream (TUS, resumable).
+    The file is spooled to disk by the request; the admin UI polls this row.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='uploads')
+    library_id = models.CharField(max_length=50)
+    bunny_video_id = models.CharField(max_length=100)
+    file_path = models.CharField(max_length=500)
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    bytes_uploaded = models.BigIntegerField(default=0)
+    tus_url = models.CharField(max_length=500, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='video_uploads')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Upload {self.id} → {self.bunny_video_id} ({self.status})"
+
+
 class BunnyStreamLibrary(models.Model):
     """
     Bunny Stream library credentials registered by admin in the website.
@@ -320,6 +375,22 @@ class BunnyStreamLibrary(models.Model):
         return self.label or f"Library {self.library_id}"
 
 
+class BunnyVideoLibrary(models.Model):
+    """
+    Which Bunny Stream library a video GUID lives in, as last verified via the Stream API.
+    An empty library_id records that no configured library had the video.
+    """
+    video_id = models.CharField(max_length=100, unique=True)
+    library_id = models.CharField(max_length=50, blank=True, default='')
+    verified_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Bunny video libraries'
+
+    def __str__(self):
+        return f"{self.video_id} → {self.library_id or 'not found'}"
+
+
 class File(models.Model):
     """Files (PDFs, documents, etc.)"""
     id = models.CharField(max_length=100, primary_key=True)
@@ -372,6 +443,15 @@ class StudentProgress(models.Model):
     class Meta:
         unique_together = [['user', 'question']]
         ordering = ['-answered_at', '-started_at']
+        indexes = [
+            models.Index(fields=['user', 'lesson', 'answered_at'], name='api_sp_user_lesson_ans_idx'),
+            # Tracker correct/incorrect counts only ever look at answered rows.
+            models.Index(
+                fields=['user', 'is_correct', 'lesson'],
+                name='api_sp_user_correct_idx',
+                condition=models.Q(answered_at__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.question.id}"
@@ -456,6 +536,7 @@ class QuizAttempt(models.Model):
         indexes = [
             models.Index(fields=['user', 'lesson'], name='api_qa_user_lesson_idx'),
             models.Index(fields=['lesson'], name='api_qa_lesson_idx'),
+            models.Index(fields=['user', '-completed_at'], name='api_qa_user_completed_idx'),
         ]
     
     def __str__(self):
@@ -497,18 +578,71 @@ class VideoAccessLog(models.Model):
     token_expires = models.BigIntegerField()             # unix timestamp the signed URL expires
     requested_at = models.DateTimeField(auto_now_add=True)
     risk_level = models.CharField(max_length=10, choices=RISK_CHOICES, default=RISK_OK)
+    # Re-requests that were handed this row's still-valid signed URL (no new row).
+    reuse_count = models.PositiveIntegerField(default=0)
+    last_reused_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-requested_at']
         indexes = [
             models.Index(fields=['user', 'video_id', 'requested_at']),
             models.Index(fields=['ip_address', 'requested_at']),
+            # Flagged rows are rare; the abuse detector lists the latest ones.
+            models.Index(
+                fields=['requested_at'], name='api_val_flagged_idx', condition=models.Q(risk_level='flag'),
+            ),
         ]
 
     def __str__(self):
         return f"{self.user.username} → {self.video_id} @ {self.ip_address}"
 
 
+class VideoAccessHourly(models.Model):
+    """
+    Per-hour abuse counters, folded in by the VideoAccessLog flusher in the same
+    transaction as the raw rows (api.abuse_signals). The abuse detector sums the
+    last 24 of these instead of aggregating the log.
+    """
+    hour = models.DateTimeField()  # start of the hour, UTC
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='video_access_hourly')
+    video_id = models.CharField(max_length=200)
+    requests = models.PositiveIntegerField(default=0)  # rows + signed-URL reuses
+    # Highest 24 h distinct-IP count (access_log's sliding window) seen this hour.
+    distinct_ips = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [['hour', 'user', 'video_id']]
+
+    def __str__(self):
+        return f"{self.user_id} → {self.video_id} at {self.hour:%Y-%m-%d %H}h: {self.requests}"
+
+
+class VideoAccessDaily(models.Model):
+    """
+    Per-day summary of VideoAccessLog rows, written by purge_video_access_logs
+    before the raw rows are deleted (forensics after retention).
+    """
+    RISK_RANK = {'ok': 0, 'warn': 1, 'flag': 2}
+
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='video_access_daily')
+    video_id = models.CharField(max_length=200)
+    requests = models.PositiveIntegerField(default=0)  # rows + signed-URL reuses
+    distinct_ips = models.PositiveIntegerField(default=0)
+    ip_addresses = models.JSONField(default=list)
+    max_risk = models.CharField(max_length=10, choices=VideoAccessLog.RISK_CHOICES, default=VideoAccessLog.RISK_OK)
+
+    class Meta:
+        ordering = ['-day']
+        unique_together = [['day', 'user', 'video_id']]
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} → {self.video_id} on {self.day}: {self.requests}"
+
+
 class IncorrectAnswer(models.Model):
     """Store questions the student answered incorrectly for later review."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='incorrect_answers')
@@ -527,6 +661,10 @@ class IncorrectAnswer(models.Model):
     class Meta:
         unique_together = [['user', 'question_id']]  # One record per user per question
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='api_ia_user_created_idx'),
+            models.Index(fields=['user', 'lesson'], name='api_ia_user_lesson_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.question_id}"
@@ -593,6 +731,8 @@ class TigerTestSession(models.Model):
     current_question_index = models.PositiveSmallIntegerField(default=0)
     section_time_remaining = models.PositiveIntegerField(default=24 * 60)
     section_started_at = models.DateTimeField(null=True, blank=True)
+    # Copy of len(section_slots) so light endpoints can defer the layout JSON.
+    section_count = models.PositiveSmallIntegerField(default=5)
     section_slots = models.JSONField(default=list)
     answers = models.JSONField(default=dict)
     bookmarked = models.JSONField(default=list)
@@ -606,13 +746,33 @@ class TigerTestSession(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'status'], name='api_tiger_user_status_idx'),
+            # Also serves the (user, status) lookups of the index it replaced.
+            models.Index(fields=['user', 'status', '-completed_at'], name='api_tiger_user_status_done_idx'),
         ]
 
     def __str__(self):
         return f"TigerTest {self.id} — {self.user.username}"
 
 
+class TigerTestReviewSection(models.Model):
+    """Post-test review items for one section, built once when the Tiger Test completes."""
+    session = models.ForeignKey(TigerTestSession, on_delete=models.CASCADE, related_name='review_sections')
+    section_number = models.PositiveSmallIntegerField()
+    items = models.JSONField(default=list)
+    # Content the items were built from; a changed stamp means the chunk is rebuilt.
+    parent_ids = models.JSONField(default=list)
+    lesson_ids = models.JSONField(default=list)
+    content_stamp = models.CharField(max_length=40)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['session', 'section_number']]
+        ordering = ['section_number']
+
+    def __str__(self):
+        return f"TigerTest {self.session_id} review — section {self.section_number}"
+
+
 class TigerTestUsedQuestion(models.Model):
     """Track question slots already served to a student (no repeats across tests)."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tiger_used_questions')
@@ -627,3 +787,63 @@ class TigerTestUsedQuestion(models.Model):
 
     def __str__(self):
         return f"{self.user.username} — {self.question_key}"
+
+
+class TigerTestUserStats(models.Model):
+    """Running Tiger Test totals per student (نتائجي) — one row instead of scanning sessions."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tiger_test_stats')
+    attempts_count = models.PositiveIntegerField(default=0)
+    verbal_correct = models.PositiveIntegerField(default=0)
+    verbal_total = models.PositiveIntegerField(default=0)
+    quant_correct = models.PositiveIntegerField(default=0)
+    quant_total = models.PositiveIntegerField(default=0)
+    latest_verbal_percentage = models.FloatField(default=0.0)
+    latest_quant_percentage = models.FloatField(default=0.0)
+    latest_final_percentage = models.PositiveSmallIntegerField(default=0)
+    latest_completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} — {self.attempts_count} tiger attempts"
+
+
+class BackgroundJob(models.Model):
+    """
+    Queued side-work (uploads, tracker writes, cache rebuilds) run outside the request
+    by api.jobs — either the in-process worker thread or `manage.py run_worker`.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Same key while queued/running = one job (e.g. one rebuild no matter how many requests ask).
+    dedupe_key = models.CharField(max_length=200, blank=True, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='api_job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
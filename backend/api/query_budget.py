@@ -0,0 +1,176 @@
+"""
+Query budgets and an N+1 detector.
+
+`QueryBudget` counts the SQL run inside it (on every DB alias), groups the
+statements by shape (literals and IN-lists collapsed) and remembers where in
+our code a repeated shape was issued. On exit it reports a run over the
+budget and any shape repeated N_PLUS_ONE_THRESHOLD+ times.
+
+    with QueryBudget(5, name="tiger results"):
+        ...
+
+    @query_budget(12)
+    def get(self, request): ...
+
+QueryBudgetMiddleware applies the ceilings in api/query_budgets.py to every
+request by method and view name. QUERY_BUDGET_MODE picks what a violation does: "off",
+"log" (staging) or "raise" (tests: QueryBudgetExceeded is an AssertionError).
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import re
+import sys
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_LOG = "log"
+MODE_RAISE = "raise"
+# Same statement shape this many times in one block looks like a query in a loop.
+N_PLUS_ONE_THRESHOLD = 5
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_DIRS = (os.path.join(_BACKEND_DIR, "api", "migrations"),)
+# Execute wrappers sit between the ORM and the query; the call site is above them.
+_INSTRUMENTATION = (os.path.abspath(__file__), os.path.join(_BACKEND_DIR, "api", "metrics.py"))
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN \((?:[^()]*)\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def mode() -> str:
+    value = str(getattr(settings, "QUERY_BUDGET_MODE", MODE_OFF) or MODE_OFF).strip().lower()
+    return value if value in (MODE_LOG, MODE_RAISE) else MODE_OFF
+
+
+def sql_shape(sql: str) -> str:
+    """SQL with literals and IN-lists collapsed, so per-row variants of one query compare equal."""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _IN_LIST_RE.sub("IN (...)", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+def call_site() -> str:
+    """file:line (function) of the innermost frame in project code that issued the query."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path.startswith(_BACKEND_DIR) and path not in _INSTRUMENTATION and not path.startswith(_SKIP_DIRS):
+            return f"{os.path.relpath(path, _BACKEND_DIR)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+
+class QueryBudget:
+    """Context manager / execute wrapper that counts queries and flags N+1 patterns."""
+
+    def __init__(self, max_queries: int | None = None, name: str = "", on_violation: str | None = None):
+        self.max_queries = max_queries
+        self.name = name
+        self.on_violation = on_violation
+        self.count = 0
+        self.shapes: dict[str, int] = {}
+        self.sites: dict[str, str] = {}
+        self._stack: ExitStack | None = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        shape = sql_shape(sql)
+        n = self.shapes.get(shape, 0) + 1
+        self.shapes[shape] = n
+        if n == 2 or n == N_PLUS_ONE_THRESHOLD:
+            # Only repeats need a stack walk; the site of a repeat is the loop.
+            self.sites[shape] = call_site()
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        self._stack = None
+        if exc_type is None:
+            self.check()
+        return False
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int, str]]:
+        """(shape, times, call site) for shapes run at least `threshold` times, most frequent first."""
+        return sorted(
+            ((shape, n, self.sites.get(shape, "?")) for shape, n in self.shapes.items() if n >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def problems(self) -> list[str]:
+        out = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            out.append(f"{self.count} queries, budget {self.max_queries}")
+        for shape, n, site in self.repeated():
+            out.append(f"N+1: {n}x at {site}: {shape[:300]}")
+        return out
+
+    def check(self) -> None:
+        action = self.on_violation or mode()
+        if action == MODE_OFF:
+            return
+        problems = self.problems()
+        if not problems:
+            return
+        message = f"Query budget [{self.name or 'block'}]: " + "; ".join(problems)
+        if action == MODE_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def query_budget(max_queries: int | None = None, name: str = "", on_violation: str | None = None):
+    """Decorator form of QueryBudget (view methods, helpers, test functions)."""
+
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(max_queries, name=label, on_violation=on_violation):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """Checks every request against api.query_budgets by method + view name (no-op when QUERY_BUDGET_MODE is off)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if mode() == MODE_OFF:
+            return self.get_response(request)
+        from .query_budgets import BUDGETS
+
+        budget = QueryBudget()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(budget))
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        budget.name = f"{request.method} {match.view_name if match else request.path}"
+        budget.max_queries = BUDGETS.get(budget.name) if match else None
+        budget.check()
+        return response
@@ -0,0 +1,41 @@
+"""
+Query ceilings for hot endpoints, keyed by "<METHOD> <URL name>" (router
+URL names are "<basename>-<action>"). Enforced by api.query_budget.QueryBudgetMiddleware
+when QUERY_BUDGET_MODE is "log" or "raise".
+
+Each number is the count measured for a typical request plus headroom for
+token/device auth and session bookkeeping. A change that needs more should
+raise the ceiling here in the same commit, with the reason in the message.
+"""
+
+BUDGETS = {
+    # Student hot path
+    "GET chapter-dashboard": 8,
+    "GET lesson-list": 6,
+    "GET file-list": 5,
+    "GET file-content": 5,
+    "GET video-list": 6,
+    # Inline access-log writes (DEFER_BACKGROUND_WORK=false) add 3 for the abuse counters.
+    "GET bunny-signed-url": 17,
+    "GET bunny-signed-url-batch": 31,  # up to MAX_COLD_RESOLVES cold library lookups
+    "POST tiger-test-start": 16,
+    "GET tiger-test-session": 36,
+    "POST tiger-test-answer": 6,
+    "POST tiger-test-end-section": 32,
+    "POST tiger-test-next-section": 8,
+    "GET tiger-test-review": 22,
+    "GET tiger-test-results": 5,
+    "GET tiger-test-history": 5,
+    "GET tracker-student-summary": 7,
+    "GET tracker-student-results": 26,
+    "GET incorrect-answers-list": 14,
+    # Public pages
+    "GET public-foundation": 5,
+    "GET public-try-free": 16,
+    "GET public-try-free-lesson": 10,
+    "GET section-list": 8,
+    "GET health": 2,
+    # Staff
+    "GET tracker-admin-summary": 8,
+    "GET job-list": 5,
+}
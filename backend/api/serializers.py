@@ -10,6 +10,7 @@ from .models import (
     BunnyStreamLibrary,
 )
 from .utils import is_bunny_video_id, extract_bunny_video_id
+from . import cloudinary_urls
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -524,33 +525,10 @@ class FileSerializer(serializers.ModelSerializer):
     def get_file_url(self, obj):
         if not obj.file:
             return None
-        url = obj.file.url
+        url = cloudinary_urls.file_url(obj.file)
         if not url:
             return None
-        if isinstance(url, str) and 'cloudinary.com' in url:
-            try:
-                from django.conf import settings
-                import cloudinary.utils
-                creds = getattr(settings, 'CLOUDINARY_STORAGE', {}) or {}
-                api_secret = creds.get('API_SECRET') or getattr(settings, 'CLOUDINARY_API_SECRET', None)
-                if api_secret:
-                    public_id = getattr(obj.file, 'name', None) or ''
-                    if public_id:
-                        resource_type = 'image' if '/image/' in url else ('raw' if '/raw/' in url else 'image')
-                        signed_url, _ = cloudinary.utils.cloudinary_url(
-                            public_id,
-                            resource_type=resource_type,
-                            sign_url=True,
-                            api_secret=api_secret,
-                            cloud_name=creds.get('CLOUD_NAME'),
-                            api_key=creds.get('API_KEY'),
-                        )
-                        if signed_url:
-                            return signed_url
-            except Exception:
-                pass
-            return url
-        if isinstance(url, str) and (url.startswith('http://') or url.startswith('https://')):
+        if cloudinary_urls.is_cloudinary_url(url) or url.startswith('http://') or url.startswith('https://'):
             return url
         request = self.context.get('request')
         if request:
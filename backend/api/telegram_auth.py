@@ -11,12 +11,39 @@ from typing import Any, Dict, Optional, Tuple
 
 import jwt
 from jwt import PyJWKClient
+from jwt.exceptions import PyJWKClientConnectionError, PyJWKClientError
+
+from . import http_client
 
 logger = logging.getLogger(__name__)
 
 TELEGRAM_ISSUER = "https://oauth.telegram.org"
 TELEGRAM_JWKS_URI = "https://oauth.telegram.org/.well-known/jwks.json"
 
+
+class _PooledJWKClient(PyJWKClient):
+    """PyJWKClient whose key-set fetch goes through the shared keep-alive client."""
+
+    def fetch_data(self) -> Any:
+        try:
+            resp = http_client.request(
+                "GET", self.uri, headers=getattr(self, "headers", None) or {}, timeout=self.timeout
+            )
+            if not resp.ok:
+                raise http_client.TransportError(f"HTTP {resp.status}")
+            jwk_set = resp.json()
+        except (http_client.TransportError, ValueError) as e:
+            raise PyJWKClientConnectionError(f'Fail to fetch data from the url, err: "{e}"') from e
+        if not isinstance(jwk_set, dict):
+            raise PyJWKClientError("The JWKS endpoint did not return a JSON object")
+        if self.jwk_set_cache is not None:
+            self.jwk_set_cache.put(jwk_set)
+        if hasattr(self, "_last_successful_fetch"):
+            # Newer PyJWT uses this for its refresh cooldown.
+            self._last_successful_fetch = time.monotonic()
+        return jwk_set
+
+
 _jwks_client: Optional[PyJWKClient] = None
 
 
@@ -35,7 +62,7 @@ def telegram_enabled() -> bool:
 def _get_jwks_client() -> PyJWKClient:
     global _jwks_client
     if _jwks_client is None:
-        _jwks_client = PyJWKClient(TELEGRAM_JWKS_URI, cache_keys=True)
+        _jwks_client = _PooledJWKClient(TELEGRAM_JWKS_URI, cache_keys=True)
     return _jwks_client
 
 
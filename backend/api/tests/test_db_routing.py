@@ -0,0 +1,134 @@
+"""Replica routing: which alias reads go to, write pinning, read-after-write stickiness and fallback."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api import db_routing
+from api.middleware import ReplicaStickinessMiddleware
+from api.models import BackgroundJob, Question
+
+REPLICA = db_routing.REPLICA_ALIAS
+
+
+@override_settings(REPLICA_READ_AFTER_WRITE_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(db_routing, "replica_configured", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = db_routing.ReplicaRouter()
+        self.user = SimpleNamespace(pk=7, is_authenticated=True)
+
+    def test_reads_stay_on_primary_outside_replica_block(self):
+        self.assertIsNone(self.router.db_for_read(Question))
+
+    def test_reads_in_replica_block_go_to_replica(self):
+        with db_routing.replica_reads(self.user):
+            self.assertEqual(self.router.db_for_read(Question), REPLICA)
+        self.assertIsNone(self.router.db_for_read(Question))
+
+    def test_first_write_pins_rest_of_block_to_primary(self):
+        with db_routing.replica_reads():
+            self.assertEqual(self.router.db_for_write(Question), DEFAULT_DB_ALIAS)
+            self.assertIsNone(self.router.db_for_read(Question))
+        with db_routing.replica_reads():
+            self.assertEqual(self.router.db_for_read(Question), REPLICA)
+
+    def test_primary_only_models_and_atomic_blocks_read_primary(self):
+        with db_routing.replica_reads():
+            self.assertEqual(self.router.db_for_read(BackgroundJob), DEFAULT_DB_ALIAS)
+            with mock.patch.object(connections[DEFAULT_DB_ALIAS], "in_atomic_block", True):
+                self.assertEqual(self.router.db_for_read(Question), DEFAULT_DB_ALIAS)
+
+    def test_recent_writer_reads_primary_until_window_passes(self):
+        db_routing.note_write(self.user.pk)
+        self.assertEqual(db_routing.read_alias(self.user), DEFAULT_DB_ALIAS)
+        self.assertEqual(db_routing.read_alias(SimpleNamespace(pk=8, is_authenticated=True)), REPLICA)
+        with db_routing.replica_reads(self.user):
+            self.assertIsNone(self.router.db_for_read(Question))
+        cache.delete(f"{db_routing._CACHE_PREFIX}{self.user.pk}")
+        self.assertEqual(db_routing.read_alias(self.user), REPLICA)
+
+    @override_settings(REPLICA_READ_AFTER_WRITE_SECONDS=0)
+    def test_stickiness_can_be_disabled(self):
+        db_routing.note_write(self.user.pk)
+        self.assertEqual(db_routing.read_alias(self.user), REPLICA)
+
+    def test_unconfigured_replica_always_reads_primary(self):
+        with mock.patch.object(db_routing, "replica_configured", return_value=False):
+            self.assertEqual(db_routing.read_alias(self.user), DEFAULT_DB_ALIAS)
+            with db_routing.replica_reads(self.user):
+                self.assertIsNone(self.router.db_for_read(Question))
+
+
+class _View:
+    def __init__(self, fail_times: int):
+        self.fail_times = fail_times
+        self.aliases = []
+
+    @db_routing.replica_view
+    def get(self, request):
+        scope = db_routing._scope.get()
+        self.aliases.append(scope.alias if scope else None)
+        if len(self.aliases) <= self.fail_times:
+            raise OperationalError("replica down")
+        return HttpResponse("ok")
+
+
+@override_settings(REPLICA_READ_AFTER_WRITE_SECONDS=10)
+class ReplicaViewTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(db_routing, "replica_configured", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get("/api/x/")
+        self.request.user = SimpleNamespace(pk=7, is_authenticated=True)
+
+    def test_replica_failure_retries_once_on_primary(self):
+        view = _View(fail_times=1)
+        with self.assertLogs("api.db_routing", level="WARNING"):
+            self.assertEqual(view.get(self.request).status_code, 200)
+        self.assertEqual(view.aliases, [REPLICA, None])
+
+    def test_primary_failure_is_not_retried(self):
+        db_routing.note_write(7)
+        view = _View(fail_times=1)
+        with self.assertRaises(OperationalError):
+            view.get(self.request)
+        self.assertEqual(view.aliases, [DEFAULT_DB_ALIAS])
+
+
+@override_settings(REPLICA_READ_AFTER_WRITE_SECONDS=10)
+class StickinessMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(db_routing, "replica_configured", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rf = RequestFactory()
+
+    def _run(self, method: str, status: int, user=None):
+        request = getattr(self.rf, method)("/api/x/")
+        request.user = user or SimpleNamespace(pk=7, is_authenticated=True)
+        ReplicaStickinessMiddleware(lambda r: HttpResponse(status=status))(request)
+
+    def test_successful_write_marks_user(self):
+        self._run("post", 201)
+        self.assertTrue(db_routing.wrote_recently(7))
+
+    def test_reads_failed_writes_and_anonymous_users_do_not_mark(self):
+        self._run("get", 200)
+        self._run("patch", 400)
+        self._run("delete", 204, user=SimpleNamespace(pk=None, is_authenticated=False))
+        self.assertFalse(db_routing.wrote_recently(7))
@@ -0,0 +1,247 @@
+"""Disk file cache: single-flight fills, followers on a growing file, eviction and validators."""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import file_cache, file_proxy, http_client
+from api.models import Category, Chapter, File, Lesson, Section, Subject, User
+
+BLOB = os.urandom(50_000)
+URL = "https://res.cloudinary.com/demo/raw/upload/a.pdf"
+
+
+class _Upstream:
+    """Streamed upstream body; with `gate` set, only the first chunk is sent until the gate opens."""
+
+    def __init__(
+        self, body: bytes, status: int = 200, gate: threading.Event | None = None, length=True, headers_etag=False
+    ):
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = {"Content-Length": str(len(body))} if length else {}
+        if headers_etag:
+            # Cloudinary's own validator, which must not leak through.
+            self.headers.update({"ETag": '"cloudinary"', "Last-Modified": "Tue, 14 Nov 2023 22:13:20 GMT"})
+        self._body = body
+        self._pos = 0
+        self._gate = gate
+
+    def read(self, n: int) -> bytes:
+        if self._pos and self._gate is not None:
+            self._gate.wait(5)
+        data = self._body[self._pos:self._pos + n]
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_all(entry) -> bytes:
+    fh, size = entry
+    try:
+        data = b""
+        while len(data) < size:
+            chunk = fh.read(4096)
+            if not chunk:
+                break
+            data += chunk
+        return data
+    finally:
+        fh.close()
+
+
+class FileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        settings_override = override_settings(FILE_CACHE_DIR=self.dir, FILE_CACHE_MAX_BYTES=1_000_000)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for name, value in (("CHUNK_SIZE", 4096), ("FOLLOW_START_SECONDS", 5)):
+            patcher = mock.patch.object(file_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.downloads = []
+
+    def _serve_upstream(self, body=BLOB, **kwargs):
+        def fake_request(method, url, **_kw):
+            self.downloads.append(url)
+            return _Upstream(body, **kwargs)
+
+        patcher = mock.patch.object(http_client, "request", side_effect=fake_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _wait_for_fills(self):
+        for _ in range(100):
+            if not file_cache._filling:
+                return
+            time.sleep(0.02)
+        self.fail("fill did not finish")
+
+    def test_cache_key_tracks_storage_version(self):
+        updated = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        f = SimpleNamespace(id="f/1", file=SimpleNamespace(name="files/a.pdf"), updated_at=updated)
+        key = file_cache.cache_key(f)
+        self.assertTrue(key.startswith("f_1-"))
+        self.assertEqual(file_cache.etag_for(key), f'"{key}"')
+        f.updated_at = datetime(2026, 1, 2, tzinfo=dt_timezone.utc)
+        self.assertNotEqual(file_cache.cache_key(f), key)
+
+    @override_settings(DEFER_BACKGROUND_WORK=False)
+    def test_inline_miss_fills_then_hits(self):
+        self._serve_upstream()
+        self.assertIsNone(file_cache.open_entry("k1"))
+        self.assertEqual(_read_all(file_cache.miss("k1", URL)), BLOB)
+        self.assertEqual(_read_all(file_cache.open_entry("k1")), BLOB)
+        self.assertEqual(len(self.downloads), 1)
+        self.assertFalse(file_cache._filling)
+
+    @override_settings(DEFER_BACKGROUND_WORK=True)
+    def test_concurrent_misses_share_one_download(self):
+        gate = threading.Event()
+        self._serve_upstream(gate=gate)
+        results = []
+
+        def request():
+            results.append(_read_all(file_cache.miss("k2", URL)))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)  # every reader is following the first chunk
+        gate.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(results, [BLOB] * 4)
+        self.assertEqual(len(self.downloads), 1)
+        self._wait_for_fills()
+        self.assertEqual(_read_all(file_cache.open_entry("k2")), BLOB)
+
+    @override_settings(DEFER_BACKGROUND_WORK=True)
+    def test_follower_can_start_mid_file(self):
+        gate = threading.Event()
+        self._serve_upstream(gate=gate)
+        fh, size = file_cache.miss("k3", URL)
+        self.assertEqual(size, len(BLOB))
+        fh.seek(10_000)
+        gate.set()
+        self.assertEqual(_read_all((fh, size - 10_000)), BLOB[10_000:])
+        self._wait_for_fills()
+
+    @override_settings(DEFER_BACKGROUND_WORK=True)
+    def test_no_free_fill_slot_means_proxy(self):
+        self._serve_upstream()
+        with mock.patch.object(file_cache, "MAX_BACKGROUND_FILLS", 0):
+            self.assertIsNone(file_cache.miss("k4", URL))
+        self.assertEqual(self.downloads, [])
+
+    @override_settings(DEFER_BACKGROUND_WORK=False, FILE_CACHE_MAX_BYTES=100_000)
+    def test_object_over_quarter_budget_is_not_cached(self):
+        self._serve_upstream()
+        self.assertIsNone(file_cache.miss("k5", URL))
+        self.assertIsNone(file_cache.open_entry("k5"))
+        self.assertEqual(os.listdir(self.dir), [])
+
+    @override_settings(DEFER_BACKGROUND_WORK=False)
+    def test_upstream_error_leaves_nothing_behind(self):
+        self._serve_upstream(status=503)
+        with self.assertLogs("api.file_cache", level="WARNING"):
+            self.assertIsNone(file_cache.miss("k6", URL))
+        self.assertEqual(os.listdir(self.dir), [])
+        self.assertFalse(file_cache._filling)
+
+    @override_settings(DEFER_BACKGROUND_WORK=True)
+    def test_unknown_length_is_proxied(self):
+        self._serve_upstream(length=False)
+        self.assertIsNone(file_cache.miss("k7", URL))
+        self._wait_for_fills()
+
+    def test_open_entry_survives_eviction(self):
+        with open(os.path.join(self.dir, "k8"), "wb") as out:
+            out.write(BLOB)
+        entry = file_cache.open_entry("k8")
+        os.unlink(os.path.join(self.dir, "k8"))
+        self.assertEqual(_read_all(entry), BLOB)
+
+    @override_settings(FILE_CACHE_MAX_BYTES=100_000)
+    def test_evict_removes_least_recently_used_and_stale_temp(self):
+        now = time.time()
+        for i, name in enumerate(("old", "mid", "new")):
+            path = os.path.join(self.dir, name)
+            with open(path, "wb") as out:
+                out.write(b"x" * 40_000)
+            os.utime(path, (now - 100 + i, now - 100 + i))
+        stale = os.path.join(self.dir, ".k.abc.part")
+        with open(stale, "wb") as out:
+            out.write(b"x")
+        os.utime(stale, (now - file_cache.STALE_TEMP_SECONDS - 5,) * 2)
+
+        self.assertEqual(file_cache.evict(), 1)
+        self.assertEqual(sorted(os.listdir(self.dir)), ["mid", "new"])
+
+
+@override_settings(DEFER_BACKGROUND_WORK=True, FILE_CACHE_MAX_BYTES=1_000_000)
+class FileContentViewTests(TestCase):
+    """A cached hit and a proxied miss must carry the same validator."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        settings_override = override_settings(FILE_CACHE_DIR=self.dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        section = Section.objects.create(id="sec", name="sec")
+        subject = Subject.objects.create(id="sub", section=section, name="sub")
+        category = Category.objects.create(id="cat", subject=subject, name="cat")
+        chapter = Chapter.objects.create(id="ch", category=category, name="ch")
+        lesson = Lesson.objects.create(id="les", chapter=chapter, name="les")
+        self.file = File.objects.create(
+            id="f1", lesson=lesson, title="a.pdf", file_type="application/pdf", file="files/a.pdf"
+        )
+        self.url = f"/api/files/{self.file.id}/content/"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="staff", password="x", role="admin", is_active_account=True)
+        )
+        for patcher in (
+            mock.patch.object(file_proxy, "upstream_url", return_value=URL),
+            mock.patch.object(
+                http_client, "request", side_effect=lambda *a, **kw: _Upstream(BLOB, headers_etag=True)
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_proxied_and_cached_responses_share_etag(self):
+        etag = file_cache.etag_for(file_cache.cache_key(self.file))
+        with mock.patch.object(file_cache, "MAX_BACKGROUND_FILLS", 0):
+            proxied = self.client.get(self.url)
+        self.assertEqual(proxied.status_code, 200)
+        self.assertEqual(proxied["ETag"], etag)
+        self.assertEqual(b"".join(proxied.streaming_content), BLOB)
+
+        with open(os.path.join(self.dir, file_cache.cache_key(self.file)), "wb") as out:
+            out.write(BLOB)
+        cached = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=proxied["ETag"])
+        self.assertEqual(cached.status_code, 206)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,194 @@
+"""Range / If-Range / If-None-Match handling for local, cached and proxied file delivery."""
+from __future__ import annotations
+
+import io
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from api import file_proxy, http_client
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+ETAG = '"abc-1"'
+
+
+class _File(io.BytesIO):
+    closed_by_server = False
+
+    def close(self):
+        self.closed_by_server = True
+        super().close()
+
+
+class _Upstream(io.BytesIO):
+    def __init__(self, body=b"", status=200, headers=None):
+        super().__init__(body)
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers or {}
+
+
+def _body(resp) -> bytes:
+    return b"".join(resp.streaming_content)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = {
+            "bytes=0-9": (0, 9),
+            "bytes=100-": (100, 999),
+            "bytes=-10": (990, 999),
+            "bytes=-5000": (0, 999),
+            "bytes=990-5000": (990, 999),
+            "": None,
+            "bytes=-": None,
+            "items=0-9": None,
+            # Multiple ranges are not supported: the whole file is sent.
+            "bytes=0-9,20-29": None,
+            "bytes=1000-": False,
+            "bytes=9-3": False,
+            "bytes=-0": False,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(file_proxy.parse_range(header, 1000), expected)
+
+
+class ServeOpenTests(SimpleTestCase):
+    def setUp(self):
+        self.rf = RequestFactory()
+
+    def _serve(self, **headers):
+        fh = _File(DATA)
+        resp = file_proxy.serve_open(self.rf.get("/", **headers), fh, len(DATA), ETAG, "application/pdf", "a.pdf")
+        return resp, fh
+
+    def test_whole_file(self):
+        resp, _fh = self._serve()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Length"], str(len(DATA)))
+        self.assertEqual(resp["ETag"], ETAG)
+        self.assertEqual(resp["Accept-Ranges"], "bytes")
+        self.assertEqual(_body(resp), DATA)
+
+    def test_single_range(self):
+        resp, _fh = self._serve(HTTP_RANGE="bytes=100-199")
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp["Content-Range"], f"bytes 100-199/{len(DATA)}")
+        self.assertEqual(resp["Content-Length"], "100")
+        self.assertEqual(_body(resp), DATA[100:200])
+
+    def test_suffix_range(self):
+        resp, _fh = self._serve(HTTP_RANGE="bytes=-16")
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(_body(resp), DATA[-16:])
+
+    def test_unsatisfiable_range(self):
+        resp, fh = self._serve(HTTP_RANGE=f"bytes={len(DATA)}-")
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], f"bytes */{len(DATA)}")
+        self.assertTrue(fh.closed_by_server)
+
+    def test_if_range_matching_etag_gets_range(self):
+        resp, _fh = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=ETAG)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(_body(resp), DATA[:10])
+
+    def test_stale_if_range_gets_whole_file(self):
+        for if_range in ('"old"', 'W/"abc-1"', "Wed, 21 Oct 2015 07:28:00 GMT"):
+            with self.subTest(if_range=if_range):
+                resp, _fh = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=if_range)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(_body(resp), DATA)
+
+    def test_if_none_match(self):
+        resp, fh = self._serve(HTTP_IF_NONE_MATCH=ETAG)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], ETAG)
+        self.assertEqual(resp["Cache-Control"], file_proxy.CACHE_CONTROL)
+        self.assertTrue(fh.closed_by_server)
+
+
+class ServeLocalIfRangeDateTests(SimpleTestCase):
+    def test_if_range_date_matches_last_modified(self):
+        rf = RequestFactory()
+        mtime = 1_700_000_000
+
+        def opener():
+            return _File(DATA)
+
+        fresh = file_proxy._serve(
+            rf.get("/", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE="Tue, 14 Nov 2023 22:13:20 GMT"),
+            opener, len(DATA), ETAG, mtime, "application/pdf", "a.pdf",
+        )
+        self.assertEqual(fresh.status_code, 206)
+        self.assertEqual(fresh["Last-Modified"], "Tue, 14 Nov 2023 22:13:20 GMT")
+        stale = file_proxy._serve(
+            rf.get("/", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE="Mon, 13 Nov 2023 22:13:20 GMT"),
+            opener, len(DATA), ETAG, mtime, "application/pdf", "a.pdf",
+        )
+        self.assertEqual(stale.status_code, 200)
+
+
+class ProxyRemoteTests(SimpleTestCase):
+    url = "https://res.cloudinary.com/demo/raw/upload/a.pdf"
+
+    def setUp(self):
+        self.rf = RequestFactory()
+        self.sent = []
+
+    def _proxy(self, upstream, etag=None, **headers):
+        def fake_request(method, url, headers=None, **kwargs):
+            self.sent.append(dict(headers or {}))
+            return upstream
+
+        with mock.patch.object(http_client, "request", side_effect=fake_request):
+            return file_proxy.proxy_remote(self.rf.get("/", **headers), self.url, "application/pdf", "a.pdf", etag=etag)
+
+    def test_conditionals_are_forwarded_without_local_validator(self):
+        upstream = _Upstream(
+            DATA[:10], 206, {"Content-Range": f"bytes 0-9/{len(DATA)}", "ETag": '"up"', "Accept-Ranges": "bytes"}
+        )
+        resp = self._proxy(upstream, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"up"')
+        self.assertEqual(self.sent[0]["Range"], "bytes=0-9")
+        self.assertEqual(self.sent[0]["If-Range"], '"up"')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp["ETag"], '"up"')
+        self.assertEqual(_body(resp), DATA[:10])
+
+    def test_local_etag_replaces_upstream_validators(self):
+        upstream = _Upstream(DATA, 200, {"ETag": '"up"', "Last-Modified": "Tue, 14 Nov 2023 22:13:20 GMT"})
+        resp = self._proxy(upstream, etag=ETAG)
+        self.assertEqual(resp["ETag"], ETAG)
+        self.assertFalse(resp.has_header("Last-Modified"))
+
+    def test_matching_if_range_forwards_range(self):
+        upstream = _Upstream(DATA[:10], 206, {"Content-Range": f"bytes 0-9/{len(DATA)}"})
+        resp = self._proxy(upstream, etag=ETAG, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=ETAG)
+        self.assertEqual(self.sent[0].get("Range"), "bytes=0-9")
+        self.assertNotIn("If-Range", self.sent[0])
+        self.assertEqual(resp.status_code, 206)
+
+    def test_stale_if_range_fetches_whole_object(self):
+        resp = self._proxy(_Upstream(DATA, 200), etag=ETAG, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+        self.assertNotIn("Range", self.sent[0])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(_body(resp), DATA)
+
+    def test_if_none_match_answered_locally(self):
+        resp = self._proxy(_Upstream(), etag=ETAG, HTTP_IF_NONE_MATCH=ETAG)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(self.sent, [])
+
+    def test_upstream_416_keeps_content_range(self):
+        upstream = _Upstream(b"", 416, {"Content-Range": f"bytes */{len(DATA)}", "ETag": '"up"'})
+        resp = self._proxy(upstream, etag=ETAG, HTTP_RANGE="bytes=99999-")
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], f"bytes */{len(DATA)}")
+        self.assertFalse(resp.has_header("ETag"))
+
+    def test_unreachable_upstream_returns_none(self):
+        with mock.patch.object(http_client, "request", side_effect=http_client.TransportError("down")):
+            with self.assertLogs("api.file_proxy", level="WARNING"):
+                resp = file_proxy.proxy_remote(self.rf.get("/"), self.url, "application/pdf", "a.pdf")
+        self.assertIsNone(resp)
@@ -0,0 +1,183 @@
+"""Pooled HTTP client: keep-alive reuse, retry rules by method, and the in-request Bunny probe budget."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api import bunny_library_map, http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: Counter = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code: int, body: bytes = b"", headers: dict | None = None, close: bool = False):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # close=True drops the connection without announcing it, like a keep-alive timeout.
+        self.close_connection = close
+
+    def _drop(self):
+        """Act on the request, then lose the connection before replying."""
+        self.close_connection = True
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.hits[path] += 1
+        n = self.hits[path]
+        if path == "/flaky":
+            return self._reply(503 if n < 3 else 200, b"ok")
+        if path == "/busy":
+            return self._reply(429, b"", {"Retry-After": "2"})
+        if path == "/close-after":
+            return self._reply(200, b"bye", close=True)
+        if path == "/drop-once" and n == 1:
+            return self._drop()
+        return self._reply(200, b"hello")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?")[0]
+        self.hits[path] += 1
+        if path == "/drop":
+            return self._drop()
+        if path == "/flaky":
+            return self._reply(503)
+        return self._reply(201, b"created")
+
+
+class HttpClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _Handler.hits.clear()
+        http_client.close_all()
+        # Each test talks to its own host label so metrics don't mix.
+        self.host = f"{self._testMethodName.replace('_', '-')}.test"
+        settings_override = override_settings(OUTBOUND_HTTP_OVERRIDES=f"{self.host}={self.origin}")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.object(http_client, "RETRY_BASE_SECONDS", 0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def url(self, path: str) -> str:
+        return f"https://{self.host}{path}"
+
+    def metrics(self) -> dict:
+        return http_client.metrics()[self.host]
+
+    def test_keep_alive_connection_is_reused(self):
+        for _ in range(3):
+            self.assertEqual(http_client.get(self.url("/x")).content, b"hello")
+        self.assertEqual(self.metrics()["connections_opened"], 1)
+        self.assertEqual(self.metrics()["connections_reused"], 2)
+
+    def test_get_retries_retryable_statuses(self):
+        resp = http_client.get(self.url("/flaky"))
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(_Handler.hits["/flaky"], 3)
+        self.assertEqual(self.metrics()["retries"], 2)
+
+    def test_retries_zero_returns_first_response(self):
+        self.assertEqual(http_client.get(self.url("/flaky"), retries=0).status, 503)
+        self.assertEqual(_Handler.hits["/flaky"], 1)
+
+    def test_post_is_not_retried_by_default(self):
+        self.assertEqual(http_client.request("POST", self.url("/flaky"), body=b"x").status, 503)
+        self.assertEqual(_Handler.hits["/flaky"], 1)
+
+    def test_retry_after_is_honoured(self):
+        with mock.patch.object(http_client.time, "sleep") as sleep:
+            resp = http_client.get(self.url("/busy"), retries=1)
+        self.assertEqual(resp.status, 429)
+        sleep.assert_called_once()
+        self.assertEqual(sleep.call_args[0][0], 2.0)
+
+    def test_get_resent_when_kept_alive_connection_was_closed(self):
+        http_client.get(self.url("/close-after"))
+        self.assertEqual(http_client.get(self.url("/x")).content, b"hello")
+        self.assertEqual(_Handler.hits["/x"], 1)
+
+    def test_idempotent_request_replayed_after_drop_on_reused_connection(self):
+        http_client.get(self.url("/x"))
+        self.assertEqual(http_client.get(self.url("/drop-once"), retries=0).content, b"hello")
+        self.assertEqual(_Handler.hits["/drop-once"], 2)
+
+    def test_post_dropped_on_reused_connection_is_not_resent(self):
+        http_client.get(self.url("/x"))
+        with self.assertRaises(http_client.TransportError):
+            http_client.request("POST", self.url("/drop"), body=b"x")
+        self.assertEqual(_Handler.hits["/drop"], 1)
+
+    def test_post_skips_connections_idle_too_long(self):
+        http_client.get(self.url("/x"))
+        with mock.patch.object(http_client, "NON_IDEMPOTENT_MAX_IDLE_SECONDS", 0):
+            self.assertEqual(http_client.request("POST", self.url("/make"), body=b"x").status, 201)
+        self.assertEqual(self.metrics()["connections_opened"], 2)
+        # The warm connection stays pooled for idempotent calls.
+        http_client.get(self.url("/x"))
+        self.assertEqual(self.metrics()["connections_opened"], 2)
+
+    def test_unreachable_host_raises_after_retries(self):
+        with override_settings(OUTBOUND_HTTP_OVERRIDES=f"{self.host}=http://127.0.0.1:1"):
+            with self.assertRaises(http_client.TransportError):
+                http_client.get(self.url("/x"), retries=1, connect_timeout=1)
+        self.assertEqual(self.metrics()["retries"], 1)
+        self.assertEqual(self.metrics()["errors"], 2)
+
+    def test_stream_partially_read_does_not_poison_pool(self):
+        resp = http_client.get(self.url("/x"), stream=True)
+        resp.read(2)
+        resp.close()
+        self.assertEqual(http_client.get(self.url("/x")).content, b"hello")
+
+
+class ProbeBudgetTests(SimpleTestCase):
+    configs = {lib: {"security_key": "s", "stream_api_key": "k"} for lib in ("1", "2", "3")}
+
+    def test_probes_share_one_deadline_without_retries(self):
+        calls = []
+
+        def slow_lookup(library_id, api_key, video_id, timeout, retries):
+            calls.append((library_id, timeout, retries))
+            time.sleep(0.4)
+            return False
+
+        with mock.patch.object(bunny_library_map, "bunny_video_exists", side_effect=slow_lookup):
+            started = time.monotonic()
+            result = bunny_library_map._probe_libraries("vid", ["1", "2", "3"], self.configs, deadline=started + 0.7)
+
+        self.assertEqual(result, (None, False))  # ran out of time: not a conclusive miss
+        self.assertEqual([lib for lib, _t, _r in calls], [1])
+        self.assertLessEqual(calls[0][1], 0.7)
+        self.assertEqual(calls[0][2], 0)
+
+    def test_background_probe_uses_default_retries(self):
+        with mock.patch.object(bunny_library_map, "bunny_video_exists", return_value=False) as lookup:
+            self.assertEqual(bunny_library_map._probe_libraries("vid", ["1", "2"], self.configs), (None, True))
+        self.assertEqual(lookup.call_count, 2)
+        self.assertIsNone(lookup.call_args.kwargs["retries"])
@@ -0,0 +1,132 @@
+"""Job queue: claiming, retry/backoff, stale requeue and lost heartbeats."""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.models import BackgroundJob
+
+calls: list = []
+
+
+@jobs.job("tests.record", max_attempts=3)
+def _record(value):
+    calls.append(value)
+
+
+@jobs.job("tests.fail", max_attempts=2)
+def _fail():
+    calls.append("fail")
+    raise RuntimeError("nope")
+
+
+@jobs.job("tests.requeued_mid_run")
+def _requeued_mid_run():
+    # Another worker decided this run was dead and requeued it.
+    jobs.requeue_stale_jobs()
+    jobs.heartbeat()
+    calls.append("after heartbeat")
+
+
+@override_settings(DEFER_BACKGROUND_WORK=True, JOBS_IN_PROCESS_WORKER=False, JOBS_STALE_AFTER_SECONDS=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_dedupes_on_key(self):
+        first = jobs.enqueue("tests.record", [1], dedupe_key="k")
+        second = jobs.enqueue("tests.record", [2], dedupe_key="k")
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue("tests.missing")
+
+    def test_job_is_claimed_by_one_worker(self):
+        row = jobs.enqueue("tests.record", [1])
+        self.assertEqual([j.id for j in jobs.claim_jobs("w1")], [row.id])
+        self.assertEqual(jobs.claim_jobs("w2"), [])
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.locked_by, row.attempts), (BackgroundJob.STATUS_RUNNING, "w1", 1))
+
+    def test_delayed_job_is_not_claimed_early(self):
+        jobs.enqueue("tests.record", [1], delay=60)
+        self.assertEqual(jobs.claim_jobs("w1"), [])
+
+    def test_run_job_now_runs_once(self):
+        row = jobs.enqueue("tests.record", [7])
+        self.assertTrue(jobs.run_job_now(row.id))
+        self.assertFalse(jobs.run_job_now(row.id))
+        self.assertEqual(calls, [7])
+        row.refresh_from_db()
+        self.assertEqual(row.status, BackgroundJob.STATUS_SUCCEEDED)
+
+    def test_failure_is_retried_with_backoff_then_fails(self):
+        row = jobs.enqueue("tests.fail")
+        before = timezone.now()
+        with self.assertLogs("api.jobs", level="WARNING"):
+            self.assertEqual(jobs.run_pending("w1"), 1)
+        row.refresh_from_db()
+        self.assertEqual(row.status, BackgroundJob.STATUS_QUEUED)
+        self.assertIn("RuntimeError: nope", row.last_error)
+        self.assertGreaterEqual(row.run_after, before + timedelta(seconds=jobs.RETRY_BASE_SECONDS * 0.5))
+        self.assertEqual(row.locked_by, "")
+
+        BackgroundJob.objects.filter(id=row.id).update(run_after=timezone.now())
+        with self.assertLogs("api.jobs", level="ERROR"):
+            jobs.run_pending("w1")
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (BackgroundJob.STATUS_FAILED, 2))
+        self.assertEqual(calls, ["fail", "fail"])
+
+    def test_retry_delay_grows_and_is_capped(self):
+        with mock.patch("api.jobs.random.uniform", return_value=1.0):
+            self.assertEqual(jobs.retry_delay(1), jobs.RETRY_BASE_SECONDS)
+            self.assertEqual(jobs.retry_delay(3), jobs.RETRY_BASE_SECONDS * 4)
+            self.assertEqual(jobs.retry_delay(50), jobs.RETRY_MAX_SECONDS)
+
+    def test_stale_running_job_is_requeued_or_failed(self):
+        retry = jobs.enqueue("tests.record", [1])
+        spent = jobs.enqueue("tests.record", [2], max_attempts=1)
+        jobs.claim_jobs("dead-worker")
+        BackgroundJob.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 2)
+        retry.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual(retry.status, BackgroundJob.STATUS_QUEUED)
+        self.assertEqual(spent.status, BackgroundJob.STATUS_FAILED)
+
+    def test_fresh_running_job_is_left_alone(self):
+        jobs.enqueue("tests.record", [1])
+        jobs.claim_jobs("w1")
+        self.assertEqual(jobs.requeue_stale_jobs(), 0)
+
+    def test_heartbeat_keeps_claim_fresh(self):
+        row = jobs.enqueue("tests.record", [1])
+        (claimed,) = jobs.claim_jobs("w1")
+        BackgroundJob.objects.filter(id=row.id).update(locked_at=timezone.now() - timedelta(minutes=5))
+        with mock.patch.object(jobs, "HEARTBEAT_SECONDS", 0), mock.patch.object(
+            jobs, "_running", mock.Mock(job=(claimed, 0.0))
+        ):
+            jobs.heartbeat()
+        self.assertEqual(jobs.requeue_stale_jobs(), 0)
+
+    def test_lost_claim_stops_job_without_recording(self):
+        row = jobs.enqueue("tests.requeued_mid_run")
+        (claimed,) = jobs.claim_jobs("w1")
+        BackgroundJob.objects.filter(id=row.id).update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        with mock.patch.object(jobs, "HEARTBEAT_SECONDS", 0), self.assertLogs("api.jobs", level="WARNING"):
+            self.assertFalse(jobs.execute(claimed))
+
+        self.assertEqual(calls, [])
+        row.refresh_from_db()
+        # Left as the requeue made it: due again for the next worker, not failed or succeeded.
+        self.assertEqual(row.status, BackgroundJob.STATUS_QUEUED)
+        self.assertIn("Worker stopped", row.last_error)
@@ -0,0 +1,93 @@
+"""Query budgets: statement shapes, ceilings, N+1 detection and the per-view middleware."""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import query_budget as qb
+from api.models import TigerTestSession, User
+
+
+class SqlShapeTests(SimpleTestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            qb.sql_shape("SELECT * FROM t WHERE id = 12 AND name = 'o''k'  AND x IN (1, 2, 3)"),
+            "SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)",
+        )
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"u{i}", password="x", role="student")
+            for i in range(qb.N_PLUS_ONE_THRESHOLD)
+        ]
+
+    def test_within_budget_is_quiet(self):
+        with qb.QueryBudget(1, name="one", on_violation=qb.MODE_RAISE) as budget:
+            list(User.objects.all())
+        self.assertEqual(budget.count, 1)
+
+    def test_over_budget_raises(self):
+        with self.assertRaisesMessage(qb.QueryBudgetExceeded, "2 queries, budget 1"):
+            with qb.QueryBudget(1, name="two", on_violation=qb.MODE_RAISE):
+                User.objects.count()
+                User.objects.count()
+
+    def test_query_in_loop_is_reported_with_call_site(self):
+        with self.assertRaises(qb.QueryBudgetExceeded) as ctx:
+            with qb.QueryBudget(on_violation=qb.MODE_RAISE):
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+        self.assertIn(f"N+1: {qb.N_PLUS_ONE_THRESHOLD}x at api/tests/test_query_budget.py:", str(ctx.exception))
+
+    def test_log_mode_warns_and_off_mode_ignores(self):
+        with override_settings(QUERY_BUDGET_MODE="log"), self.assertLogs("api.query_budget", level="WARNING"):
+            with qb.QueryBudget(0):
+                User.objects.count()
+        with override_settings(QUERY_BUDGET_MODE="off"), mock.patch.object(qb.logger, "warning") as warn:
+            with qb.QueryBudget(0):
+                User.objects.count()
+        warn.assert_not_called()
+
+    def test_decorator_names_budget_after_function(self):
+        @qb.query_budget(0, on_violation=qb.MODE_RAISE)
+        def lookup():
+            return User.objects.count()
+
+        with self.assertRaisesMessage(qb.QueryBudgetExceeded, "lookup"):
+            lookup()
+
+
+@override_settings(QUERY_BUDGET_MODE="raise", DEFER_BACKGROUND_WORK=True, JOBS_IN_PROCESS_WORKER=False)
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="budget", password="x", role="student", is_active_account=True, allow_multi_device=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        layout = [[{"slot_id": "s0_0", "parent_id": "q0", "subject": "verbal", "correct_answer_id": "b"}]]
+        self.session = TigerTestSession.objects.create(
+            user=self.user,
+            status=TigerTestSession.STATUS_IN_SECTION,
+            current_section=1,
+            section_count=1,
+            section_slots=layout,
+            section_started_at=timezone.now(),
+        )
+        self.url = f"/api/tiger-test/{self.session.id}/answer/"
+
+    def _answer(self):
+        return self.client.post(self.url, {"slot_id": "s0_0", "answer_id": "b"}, format="json")
+
+    def test_answer_view_fits_its_budget(self):
+        self.assertEqual(self._answer().status_code, 200)
+
+    def test_view_over_its_ceiling_raises(self):
+        with mock.patch.dict("api.query_budgets.BUDGETS", {"POST tiger-test-answer": 0}):
+            with self.assertRaisesMessage(qb.QueryBudgetExceeded, "POST tiger-test-answer"):
+                self._answer()
@@ -0,0 +1,146 @@
+"""
+Tiger Test section transitions are conditional UPDATEs (status + current_section),
+so racing closers and stale answer writes lose instead of overwriting each other.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import tiger_test as tt
+from api.models import TigerTestSession, TigerTestUserStats, User
+
+
+def _layout(sections: int = 2, per_section: int = 2) -> list[list[dict]]:
+    """Slots with embedded answer keys (scoring never needs the question bank)."""
+    return [
+        [
+            {
+                "slot_id": f"s{i}_{j}",
+                "parent_id": f"q{i}_{j}",
+                "subject": "verbal" if j % 2 == 0 else "quant",
+                "correct_answer_id": "b",
+            }
+            for j in range(per_section)
+        ]
+        for i in range(sections)
+    ]
+
+
+@override_settings(DEFER_BACKGROUND_WORK=True, JOBS_IN_PROCESS_WORKER=False)
+class SectionTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="tiger1", password="x", role="student", is_active_account=True, allow_multi_device=True
+        )
+
+    def _session(self, current_section=1, started_ago=0, **fields) -> TigerTestSession:
+        layout = _layout()
+        return TigerTestSession.objects.create(
+            user=self.user,
+            status=TigerTestSession.STATUS_IN_SECTION,
+            current_section=current_section,
+            section_count=len(layout),
+            section_slots=layout,
+            section_started_at=timezone.now() - timedelta(seconds=started_ago),
+            **fields,
+        )
+
+    def _expired(self) -> int:
+        return tt.SECTION_SECONDS + tt.SECTION_GRACE_SECONDS + 5
+
+    def test_only_first_closer_moves_section_on(self):
+        session = self._session(started_ago=self._expired())
+        first = TigerTestSession.objects.get(pk=session.pk)
+        second = TigerTestSession.objects.get(pk=session.pk)
+
+        self.assertTrue(tt.close_section_if_expired(first))
+        self.assertFalse(tt.end_current_section(second))
+        # The loser is refreshed to the winner's state.
+        self.assertEqual(second.status, TigerTestSession.STATUS_BETWEEN_SECTIONS)
+
+    def test_final_section_completes_once(self):
+        session = self._session(current_section=2, answers={"s1_0": "b"})
+        copies = [TigerTestSession.objects.get(pk=session.pk) for _ in range(3)]
+
+        results = [tt.end_current_section(copy) for copy in copies]
+
+        self.assertEqual(results, [True, False, False])
+        session.refresh_from_db()
+        self.assertEqual(session.status, TigerTestSession.STATUS_COMPLETED)
+        self.assertEqual(TigerTestUserStats.objects.get(user=self.user).attempts_count, 1)
+        self.assertFalse(tt.complete_session(TigerTestSession.objects.get(pk=session.pk)))
+
+    def test_live_section_is_not_closed_early(self):
+        session = self._session(started_ago=10)
+        self.assertFalse(tt.close_section_if_expired(session))
+        self.assertEqual(session.status, TigerTestSession.STATUS_IN_SECTION)
+
+    def test_stale_answer_write_does_not_reach_closed_section(self):
+        session = self._session()
+        stale = tt.light_sessions().get(pk=session.pk)
+        tt.end_current_section(TigerTestSession.objects.get(pk=session.pk))
+
+        self.assertFalse(tt.save_section_answers(stale, answers={"s0_0": "a"}))
+        session.refresh_from_db()
+        self.assertNotIn("s0_0", session.answers)
+
+    def test_answer_saved_in_next_section_is_not_written_by_old_request(self):
+        # Section 1 closed and section 2 started: status is in_section again,
+        # but the old request still carries current_section=1.
+        session = self._session()
+        stale = tt.light_sessions().get(pk=session.pk)
+        TigerTestSession.objects.filter(pk=session.pk).update(current_section=2)
+
+        self.assertFalse(tt.save_section_answers(stale, answers={"s0_0": "a"}))
+        session.refresh_from_db()
+        self.assertEqual(session.answers, {})
+
+
+@override_settings(DEFER_BACKGROUND_WORK=True, JOBS_IN_PROCESS_WORKER=False, QUERY_BUDGET_MODE="raise")
+class SessionViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="tiger2", password="x", role="student", is_active_account=True, allow_multi_device=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        layout = _layout()
+        self.session = TigerTestSession.objects.create(
+            user=self.user,
+            status=TigerTestSession.STATUS_IN_SECTION,
+            current_section=1,
+            section_count=len(layout),
+            section_slots=layout,
+            section_started_at=timezone.now(),
+            seen=["s0_0", "s0_1"],
+        )
+
+    def test_answer_in_open_section(self):
+        r = self.client.post(
+            f"/api/tiger-test/{self.session.id}/answer/",
+            {"slot_id": "s0_0", "answer_id": "B", "bookmarked": True},
+            format="json",
+        )
+        self.assertEqual(r.status_code, 200)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.answers, {"s0_0": "b"})
+        self.assertEqual(self.session.bookmarked, ["s0_0"])
+
+    def test_answer_after_section_closed_is_rejected(self):
+        tt.end_current_section(TigerTestSession.objects.get(pk=self.session.pk))
+        r = self.client.post(
+            f"/api/tiger-test/{self.session.id}/answer/", {"slot_id": "s0_0", "answer_id": "b"}, format="json"
+        )
+        self.assertEqual(r.status_code, 400)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.answers, {})
+
+    def test_patch_seen_replaces_list(self):
+        r = self.client.patch(f"/api/tiger-test/{self.session.id}/", {"seen": ["s0_1"]}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.seen, ["s0_1"])
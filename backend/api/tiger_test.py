@@ -1,24 +1,39 @@
 """Tiger Test (محاكي اختبار النمر) — question pool, session building, scoring."""
 from __future__ import annotations
 
+import hashlib
+import logging
 import random
+import time
 from typing import Any
 
-from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Prefetch, Q
 
 from django.core.cache import cache
+from django.utils import timezone
 
 from .models import (
     Question,
     Answer,
     TigerTestSession,
+    TigerTestReviewSection,
     TigerTestUsedQuestion,
+    TigerTestUserStats,
     Video,
     Lesson,
     IncorrectAnswer,
 )
+from . import jobs
 from .tiger_test_demo import make_demo_slots
-from .chapter_dashboard import TIGER_SLOT_CACHE_KEY, TIGER_SLOT_CACHE_TTL
+from .chapter_dashboard import (
+    TIGER_SLOT_CACHE_KEY,
+    TIGER_SLOT_CACHE_TTL,
+    TIGER_SLOT_LOCK_KEY,
+    invalidate_tiger_slot_cache,
+)
+
+logger = logging.getLogger(__name__)
 
 VERBAL_SUBJECT_ID = "مادة_اللفظي"
 QUANT_SUBJECT_ID = "مادة_الكمي"
@@ -27,6 +42,8 @@ VERBAL_PER_SECTION = 13
 QUANT_PER_SECTION = 11
 QUESTIONS_PER_SECTION = VERBAL_PER_SECTION + QUANT_PER_SECTION  # 24
 SECTION_SECONDS = 24 * 60
+# Slack for network latency before the server closes a section on its own.
+SECTION_GRACE_SECONDS = 5
 VERBAL_TOTAL = VERBAL_PER_SECTION * SECTION_COUNT  # 65
 QUANT_TOTAL = QUANT_PER_SECTION * SECTION_COUNT  # 55
 TOTAL_QUESTIONS = SECTION_COUNT * QUESTIONS_PER_SECTION  # 120
@@ -44,6 +61,21 @@ SUBJECT_LABELS = {
     "quant": "الكمي",
 }
 
+# Incremental updates keep the cached pool current; a full rebuild still runs
+# this often as a consistency check.
+TIGER_POOL_REBUILD_SECONDS = 60 * 60
+# Bulky JSON columns (120 slot dicts, scores, warnings) that answer/timer sync never reads.
+SESSION_LAYOUT_FIELDS = ("section_slots", "results", "pool_warnings")
+INCORRECT_ANSWER_UPSERT_FIELDS = [
+    "lesson",
+    "lesson_name",
+    "category_name",
+    "subject_name",
+    "question_snapshot",
+    "user_answer_id",
+    "correct_answer_id",
+]
+
 
 def _slot_id_for_passage(parent_id: str, index: int) -> str:
     return f"passage_{parent_id}_{index}"
@@ -74,26 +106,53 @@ def _passage_answers_ok(pq: dict) -> bool:
     return isinstance(answers, list) and len(answers) > 0
 
 
-def flatten_all_slots() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
-    """Build verbal/quant pools without heavy joins, DISTINCT, or prefetching answers."""
-    cached = cache.get(TIGER_SLOT_CACHE_KEY)
-    if isinstance(cached, (list, tuple)) and len(cached) == 2:
-        return list(cached[0]), list(cached[1])
+_POOL_FIELDS = (
+    "id",
+    "question_type",
+    "subject_id",
+    "chapter_id",
+    "lesson_id",
+    "passage_questions",
+)
 
-    has_answers = Exists(Answer.objects.filter(question_id=OuterRef("pk")))
-    field_names = (
-        "id",
-        "question_type",
-        "subject_id",
-        "chapter_id",
-        "lesson_id",
-        "passage_questions",
-    )
 
+def _slots_for_question(q: Question, kind: str) -> list[dict[str, Any]]:
+    """Pool slots of one question: one per passage sub-question, else the question itself."""
+    if q.question_type == Question.QUESTION_TYPE_PASSAGE:
+        pq_list = q.passage_questions or []
+        if not isinstance(pq_list, list):
+            return []
+        return [
+            {
+                "slot_id": _slot_id_for_passage(q.id, idx),
+                "parent_id": q.id,
+                "passage_index": idx,
+                "subject": kind,
+                "lesson_id": q.lesson_id,
+            }
+            for idx, pq in enumerate(pq_list)
+            if isinstance(pq, dict) and _passage_answers_ok(pq)
+        ]
+    if not getattr(q, "has_answers", False):
+        return []
+    return [
+        {
+            "slot_id": q.id,
+            "parent_id": q.id,
+            "passage_index": None,
+            "subject": kind,
+            "lesson_id": q.lesson_id,
+        }
+    ]
+
+
+def _build_slot_pool() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Full scan of the verbal/quant bank without heavy joins, DISTINCT, or prefetching answers."""
+    has_answers = Exists(Answer.objects.filter(question_id=OuterRef("pk")))
     primary = (
         Question.objects.filter(subject_id__in=[VERBAL_SUBJECT_ID, QUANT_SUBJECT_ID])
         .exclude(section_id__in=["قسم_تحصيلي"])
-        .only(*field_names)
+        .only(*_POOL_FIELDS)
         .annotate(has_answers=has_answers)
     )
 
@@ -101,47 +160,17 @@ def flatten_all_slots() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
     quant: list[dict[str, Any]] = []
     seen_ids: set[str] = set()
 
-    def _consume(qs, kind_hint: str | None = None):
+    def _consume(qs):
         for q in qs:
-            kind = kind_hint or _resolve_subject_kind(q)
+            kind = _resolve_subject_kind(q)
             if kind not in ("verbal", "quant"):
                 continue
             target = verbal if kind == "verbal" else quant
-            if q.question_type == Question.QUESTION_TYPE_PASSAGE:
-                pq_list = q.passage_questions or []
-                if not isinstance(pq_list, list) or len(pq_list) == 0:
+            for slot in _slots_for_question(q, kind):
+                if slot["slot_id"] in seen_ids:
                     continue
-                for idx, pq in enumerate(pq_list):
-                    if not isinstance(pq, dict) or not _passage_answers_ok(pq):
-                        continue
-                    slot_id = _slot_id_for_passage(q.id, idx)
-                    if slot_id in seen_ids:
-                        continue
-                    seen_ids.add(slot_id)
-                    target.append(
-                        {
-                            "slot_id": slot_id,
-                            "parent_id": q.id,
-                            "passage_index": idx,
-                            "subject": kind,
-                            "lesson_id": q.lesson_id,
-                        }
-                    )
-            else:
-                if not getattr(q, "has_answers", False):
-                    continue
-                if q.id in seen_ids:
-                    continue
-                seen_ids.add(q.id)
-                target.append(
-                    {
-                        "slot_id": q.id,
-                        "parent_id": q.id,
-                        "passage_index": None,
-                        "subject": kind,
-                        "lesson_id": q.lesson_id,
-                    }
-                )
+                seen_ids.add(slot["slot_id"])
+                target.append(slot)
 
     _consume(primary)
 
@@ -166,11 +195,101 @@ def flatten_all_slots() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
     )
     if Question.objects.filter(subject_id__isnull=True).exists():
         _consume(extra)
-
-    cache.set(TIGER_SLOT_CACHE_KEY, (verbal, quant), TIGER_SLOT_CACHE_TTL)
     return verbal, quant
 
 
+def _store_slot_pool(verbal: list[dict], quant: list[dict], version: int, built_at: float) -> None:
+    cache.set(
+        TIGER_SLOT_CACHE_KEY,
+        {"version": version, "built_at": built_at, "verbal": verbal, "quant": quant},
+        TIGER_SLOT_CACHE_TTL,
+    )
+
+
+@jobs.job("tiger_test.rebuild_slot_pool", max_attempts=3)
+def rebuild_slot_pool() -> dict:
+    """Full rebuild (consistency check). Returns slot counts and drift against the cached pool."""
+    cached = cache.get(TIGER_SLOT_CACHE_KEY)
+    verbal, quant = _build_slot_pool()
+    report = {"verbal": len(verbal), "quant": len(quant), "added": 0, "removed": 0}
+    version = 1
+    if isinstance(cached, dict):
+        old = {slot["slot_id"] for slot in cached["verbal"] + cached["quant"]}
+        new = {slot["slot_id"] for slot in verbal + quant}
+        report["added"] = len(new - old)
+        report["removed"] = len(old - new)
+        version = int(cached.get("version") or 0) + 1
+    _store_slot_pool(verbal, quant, version, time.time())
+    return report
+
+
+def flatten_all_slots() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Verbal/quant pools from the cache; built when missing, refreshed in the background when older than TIGER_POOL_REBUILD_SECONDS."""
+    cached = cache.get(TIGER_SLOT_CACHE_KEY)
+    if isinstance(cached, dict):
+        if time.time() - float(cached.get("built_at") or 0) >= TIGER_POOL_REBUILD_SECONDS:
+            # Serve the old pool; a worker refreshes it.
+            schedule_slot_pool_rebuild()
+        return list(cached["verbal"]), list(cached["quant"])
+    verbal, quant = _build_slot_pool()
+    version = int(cached.get("version") or 0) + 1 if isinstance(cached, dict) else 1
+    _store_slot_pool(verbal, quant, version, time.time())
+    return list(verbal), list(quant)
+
+
+def schedule_slot_pool_rebuild() -> None:
+    """Queue one full pool rebuild (deduplicated while one is pending)."""
+    try:
+        jobs.enqueue("tiger_test.rebuild_slot_pool", dedupe_key="tiger_test.rebuild_slot_pool")
+    except Exception:
+        logger.exception("Could not queue Tiger slot pool rebuild")
+
+
+def update_slot_pool(question_ids) -> bool:
+    """
+    Patch the cached pool after questions were created, edited or deleted:
+    their old slots are dropped and current ones (incl. passage sub-slots) added.
+    Falls back to dropping the cache when another update holds the lock.
+    """
+    ids = {str(qid) for qid in question_ids if qid}
+    if not ids or not isinstance(cache.get(TIGER_SLOT_CACHE_KEY), dict):
+        # Nothing cached: the next start builds the pool from scratch.
+        return True
+    if not cache.add(TIGER_SLOT_LOCK_KEY, 1, 30):
+        invalidate_tiger_slot_cache()
+        schedule_slot_pool_rebuild()
+        return False
+    try:
+        pool = cache.get(TIGER_SLOT_CACHE_KEY)
+        if not isinstance(pool, dict):
+            return True
+        has_answers = Exists(Answer.objects.filter(question_id=OuterRef("pk")))
+        changed = (
+            Question.objects.filter(id__in=ids)
+            .exclude(section_id__in=["قسم_تحصيلي"])
+            .select_related("chapter__category", "lesson__chapter__category")
+            .annotate(has_answers=has_answers)
+        )
+        verbal = [slot for slot in pool["verbal"] if slot["parent_id"] not in ids]
+        quant = [slot for slot in pool["quant"] if slot["parent_id"] not in ids]
+        for q in changed:
+            kind = _resolve_subject_kind(q)
+            if kind == "verbal":
+                verbal.extend(_slots_for_question(q, kind))
+            elif kind == "quant":
+                quant.extend(_slots_for_question(q, kind))
+        _store_slot_pool(
+            verbal, quant, int(pool.get("version") or 0) + 1, float(pool.get("built_at") or 0)
+        )
+        return True
+    except Exception:
+        logger.exception("Tiger pool update failed; dropping the cached pool")
+        invalidate_tiger_slot_cache()
+        return False
+    finally:
+        cache.delete(TIGER_SLOT_LOCK_KEY)
+
+
 def flatten_subject_slots(subject_kind: str) -> list[dict[str, Any]]:
     verbal, quant = flatten_all_slots()
     return verbal if subject_kind == "verbal" else quant
@@ -418,6 +537,9 @@ def build_sections_for_user(user) -> tuple[list[list[dict]], list[dict]]:
     if len(sections) != SECTION_COUNT:
         raise ValueError("تعذر تجهيز أقسام اختبار النمر.")
 
+    # Pool dicts may be shared with the slot cache — give the session its own copies.
+    sections = [[dict(slot) for slot in section] for section in sections]
+    embed_answer_keys(sections)
     return sections, warnings
 
 
@@ -452,9 +574,11 @@ def _answers_for_slot(question: Question, slot: dict) -> list[dict]:
             )
         return out
 
+    # Answers are prefetched ordered by answer_id (also the model ordering); a
+    # further .order_by() here would bypass the prefetch with a query per slot.
     return [
         {"answer_id": a.answer_id, "text": a.text}
-        for a in question.answers.all().order_by("answer_id")
+        for a in question.answers.all()
     ]
 
 
@@ -494,6 +618,105 @@ def _correct_answer_id(question: Question, slot: dict) -> str | None:
     return correct.answer_id if correct else None
 
 
+def _question_version(question: Question | None) -> int | None:
+    if not question or not question.updated_at:
+        return None
+    return int(question.updated_at.timestamp())
+
+
+def embed_answer_keys(sections: list[list[dict]]) -> None:
+    """
+    Store correct_answer_id + question_version on each bank slot (in place), so
+    scoring never has to query answers. Two queries for the whole layout.
+    """
+    slots = [
+        slot
+        for section in sections
+        for slot in section
+        if not slot.get("is_demo") and slot.get("parent_id")
+    ]
+    if not slots:
+        return
+    parent_ids = {slot["parent_id"] for slot in slots}
+    parents = {
+        q.id: q
+        for q in Question.objects.filter(id__in=parent_ids).only(
+            "id", "question_type", "passage_questions", "updated_at"
+        )
+    }
+    single_keys: dict[str, str] = {}
+    for qid, aid in (
+        Answer.objects.filter(question_id__in=parent_ids, is_correct=True)
+        .order_by("answer_id")
+        .values_list("question_id", "answer_id")
+    ):
+        single_keys.setdefault(qid, aid)
+
+    for slot in slots:
+        parent = parents.get(slot["parent_id"])
+        if parent is None:
+            correct = None
+        elif slot.get("passage_index") is not None:
+            correct = _correct_answer_id(parent, slot)
+        else:
+            correct = single_keys.get(parent.id)
+        slot["correct_answer_id"] = correct
+        slot["question_version"] = _question_version(parent)
+
+
+def _slot_correct_id(slot: dict, questions_map: dict[str, Question] | None = None) -> str | None:
+    """Answer key for a slot: demo key, embedded key, or (legacy sessions) a DB lookup."""
+    if slot.get("is_demo"):
+        return (slot.get("demo") or {}).get("correct")
+    if "correct_answer_id" in slot:
+        return slot["correct_answer_id"]
+    question = (questions_map or {}).get(slot.get("parent_id"))
+    return _correct_answer_id(question, slot) if question else None
+
+
+def _has_embedded_keys(sections: list[list[dict]]) -> bool:
+    return all(
+        slot.get("is_demo") or "correct_answer_id" in slot
+        for section in sections
+        for slot in section
+    )
+
+
+def rekey_session(session: TigerTestSession, question_ids: set[str] | None = None) -> bool:
+    """
+    Re-read answer keys from the bank after an admin fixes a key.
+    Completed (non-abandoned) attempts are rescored. Returns True when anything changed.
+    """
+    sections = session.section_slots or []
+    targets = [
+        slot
+        for section in sections
+        for slot in section
+        if not slot.get("is_demo")
+        and slot.get("parent_id")
+        and (question_ids is None or slot["parent_id"] in question_ids)
+    ]
+    if not targets:
+        return False
+    before = [(s.get("correct_answer_id"), s.get("question_version")) for s in targets]
+    embed_answer_keys([targets])
+    after = [(s.get("correct_answer_id"), s.get("question_version")) for s in targets]
+    if before == after:
+        return False
+
+    fields = ["section_slots"]
+    results = session.results or {}
+    if session.status == TigerTestSession.STATUS_COMPLETED and not results.get("abandoned"):
+        session.results = score_session(session)
+        fields.append("results")
+    session.save(update_fields=fields)
+    # Stored review chunks carry the old keys; they are rebuilt on next read.
+    TigerTestReviewSection.objects.filter(session=session).delete()
+    if "results" in fields:
+        rebuild_user_stats(session.user)
+    return True
+
+
 def _sub_question_html(question: Question, slot: dict) -> str:
     pq_list = question.passage_questions or []
     idx = slot["passage_index"]
@@ -746,14 +969,22 @@ def _source_link_for_slot(
     }
 
 
-def persist_session_incorrect_answers(user, session: TigerTestSession) -> None:
-    """Save wrong/skipped Tiger items so نتائجي and الأجوبة الخاطئة can open the source video."""
+def persist_session_incorrect_answers(
+    user, session: TigerTestSession, items: list[dict] | None = None
+) -> int:
+    """
+    Save wrong/skipped Tiger items so نتائجي and الأجوبة الخاطئة can open the source video.
+    One bulk upsert on (user, question_id); returns the number of rows written.
+    """
+    started = time.monotonic()
     try:
-        items = build_review_items(session)
+        if items is None:
+            items = stored_review_items(session)
         lesson_ids = {item.get("lesson_id") for item in items if item.get("lesson_id")}
         valid_lessons = set(
             Lesson.objects.filter(id__in=lesson_ids).values_list("id", flat=True)
         )
+        rows: dict[str, IncorrectAnswer] = {}
         for item in items:
             if item.get("is_correct") or item.get("is_demo"):
                 continue
@@ -761,32 +992,55 @@ def persist_session_incorrect_answers(user, session: TigerTestSession) -> None:
             if not qid:
                 continue
             lid = item.get("lesson_id") if item.get("lesson_id") in valid_lessons else None
-            IncorrectAnswer.objects.update_or_create(
+            rows[qid] = IncorrectAnswer(
                 user=user,
                 question_id=qid,
-                defaults={
-                    "lesson_id": lid,
-                    "lesson_name": (item.get("lesson_name") or "")[:200],
-                    "category_name": "اختبار النمر",
-                    "subject_name": SUBJECT_LABELS.get(item.get("subject"), "")[:200],
-                    "question_snapshot": {
-                        "question": item.get("question"),
-                        "answers": item.get("answers"),
-                        "explanation": item.get("explanation"),
-                        "site_question_number": item.get("site_question_number"),
-                        "video": item.get("video"),
-                        "video_start_seconds": item.get("video_start_seconds"),
-                        "video_end_seconds": item.get("video_end_seconds"),
-                        "subject": item.get("subject"),
-                        "source": "tiger",
-                    },
-                    "user_answer_id": str(item.get("user_answer_id") or "")[:10],
-                    "correct_answer_id": str(item.get("correct_answer_id") or "")[:10],
+                lesson_id=lid,
+                lesson_name=(item.get("lesson_name") or "")[:200],
+                category_name="اختبار النمر",
+                subject_name=SUBJECT_LABELS.get(item.get("subject"), "")[:200],
+                question_snapshot={
+                    "question": item.get("question"),
+                    "answers": item.get("answers"),
+                    "explanation": item.get("explanation"),
+                    "site_question_number": item.get("site_question_number"),
+                    "video": item.get("video"),
+                    "video_start_seconds": item.get("video_start_seconds"),
+                    "video_end_seconds": item.get("video_end_seconds"),
+                    "subject": item.get("subject"),
+                    "source": "tiger",
                 },
+                user_answer_id=str(item.get("user_answer_id") or "")[:10],
+                correct_answer_id=str(item.get("correct_answer_id") or "")[:10],
+            )
+        if rows:
+            IncorrectAnswer.objects.bulk_create(
+                list(rows.values()),
+                batch_size=200,
+                update_conflicts=True,
+                unique_fields=["user", "question_id"],
+                update_fields=INCORRECT_ANSWER_UPSERT_FIELDS,
             )
     except Exception:
         # Completing the test must not fail if tracker write has a problem.
-        return
+        logger.exception("Tiger incorrect answers not saved for session %s", session.id)
+        return 0
+    logger.info(
+        "Tiger incorrect answers: session=%s rows=%d items=%d %.0fms",
+        session.id,
+        len(rows),
+        len(items),
+        (time.monotonic() - started) * 1000,
+    )
+    return len(rows)
+
+
+@jobs.job("tiger_test.persist_incorrect_answers")
+def persist_incorrect_answers_job(session_id: str) -> int:
+    session = TigerTestSession.objects.select_related("user").filter(id=session_id).first()
+    if session is None:
+        return 0
+    return persist_session_incorrect_answers(session.user, session)
 
 
 def wrong_video_items_for_user(user, limit: int = 80) -> list[dict]:
@@ -902,7 +1156,7 @@ def wrong_video_items_for_user(user, limit: int = 80) -> list[dict]:
         results = (latest.results or {}) if latest else {}
         if latest and not results.get("abandoned"):
             try:
-                for item in build_review_items(latest):
+                for item in stored_review_items(latest):
                     if item.get("is_correct") or item.get("is_demo") or not item.get("video"):
                         continue
                     qid = item.get("id")
@@ -932,7 +1186,9 @@ def wrong_video_items_for_user(user, limit: int = 80) -> list[dict]:
     return out
 
 
-def _review_answers_for_slot(question: Question | None, slot: dict) -> list[dict]:
+def _review_answers_for_slot(
+    question: Question | None, slot: dict, correct_id: str | None = None
+) -> list[dict]:
     if slot.get("is_demo"):
         demo = slot.get("demo") or {}
         correct = str((demo.get("correct") or "")).lower()[:1]
@@ -951,7 +1207,8 @@ def _review_answers_for_slot(question: Question | None, slot: dict) -> list[dict
         return out
     if not question:
         return []
-    correct_id = _correct_answer_id(question, slot)
+    if correct_id is None:
+        correct_id = _slot_correct_id(slot, {question.id: question})
     correct_s = str(correct_id).lower()[:1] if correct_id else None
     return [
         {
@@ -1001,11 +1258,10 @@ def build_review_items(
             source = _source_link_for_slot(
                 parent, slot, site_maps, videos_by_lesson, lessons
             )
+            correct_id = _slot_correct_id(slot, questions_map)
             if slot.get("is_demo"):
-                correct_id = (slot.get("demo") or {}).get("correct")
                 explanation = None
             else:
-                correct_id = _correct_answer_id(parent, slot) if parent else None
                 explanation = (
                     _explanation_for_slot(parent, slot) if include_explanation else None
                 )
@@ -1017,7 +1273,7 @@ def build_review_items(
             items.append(
                 {
                     **base,
-                    "answers": _review_answers_for_slot(parent, slot),
+                    "answers": _review_answers_for_slot(parent, slot, correct_id),
                     "number": number,
                     "section_number": section_i + 1,
                     "correct_answer_id": correct_s,
@@ -1031,10 +1287,150 @@ def build_review_items(
     return items
 
 
+def _review_sources(section: list[dict], items: list[dict]) -> tuple[list[str], list[str]]:
+    """Question and lesson ids a section's review items were built from."""
+    parent_ids = {slot["parent_id"] for slot in section if slot.get("parent_id")}
+    lesson_ids = {slot["lesson_id"] for slot in section if slot.get("lesson_id")}
+    lesson_ids |= {item["lesson_id"] for item in items if item.get("lesson_id")}
+    return sorted(parent_ids), sorted(lesson_ids)
+
+
+def _review_content_state(parent_ids: set[str], lesson_ids: set[str]) -> tuple[dict, dict]:
+    """Current updated_at/count of every question, lesson and video a review can show (4 queries)."""
+    questions: dict[str, Any] = {}
+    lessons: dict[str, dict] = {}
+    if parent_ids:
+        questions = dict(
+            Question.objects.filter(id__in=parent_ids).values_list("id", "updated_at")
+        )
+    if lesson_ids:
+        for lid, ts in Lesson.objects.filter(id__in=lesson_ids).values_list("id", "updated_at"):
+            lessons.setdefault(lid, {})["lesson"] = ts
+        # Counts catch deletions; max(updated_at) catches edits and additions.
+        for model, key in ((Question, "questions"), (Video, "videos")):
+            rows = (
+                model.objects.filter(lesson_id__in=lesson_ids)
+                .values("lesson_id")
+                .annotate(n=Count("id"), m=Max("updated_at"))
+                .order_by()
+            )
+            for row in rows:
+                lessons.setdefault(row["lesson_id"], {})[key] = (row["n"], row["m"])
+    return questions, lessons
+
+
+def _review_stamp(parent_ids, lesson_ids, state: tuple[dict, dict]) -> str:
+    questions, lessons = state
+    raw = repr(
+        (
+            [(qid, questions.get(qid)) for qid in sorted(parent_ids)],
+            [(lid, sorted(lessons.get(lid, {}).items())) for lid in sorted(lesson_ids)],
+        )
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def materialize_review(session: TigerTestSession) -> list[dict]:
+    """Build the whole review once and store it per section. Returns all items."""
+    items = build_review_items(session)
+    sections = session.section_slots or []
+    by_section: dict[int, list[dict]] = {}
+    for item in items:
+        by_section.setdefault(item["section_number"], []).append(item)
+
+    sources = {}
+    for number in range(1, len(sections) + 1):
+        sources[number] = _review_sources(sections[number - 1], by_section.get(number, []))
+    state = _review_content_state(
+        {qid for parent_ids, _ in sources.values() for qid in parent_ids},
+        {lid for _, lesson_ids in sources.values() for lid in lesson_ids},
+    )
+    rows = [
+        TigerTestReviewSection(
+            session=session,
+            section_number=number,
+            items=by_section.get(number, []),
+            parent_ids=parent_ids,
+            lesson_ids=lesson_ids,
+            content_stamp=_review_stamp(parent_ids, lesson_ids, state),
+        )
+        for number, (parent_ids, lesson_ids) in sources.items()
+    ]
+    with transaction.atomic():
+        TigerTestReviewSection.objects.filter(session=session).delete()
+        TigerTestReviewSection.objects.bulk_create(rows)
+    return items
+
+
+def _rebuild_review_section(session: TigerTestSession, number: int) -> list[dict]:
+    items = build_review_items(session, section_number=number)
+    sections = session.section_slots or []
+    section = sections[number - 1] if 0 < number <= len(sections) else []
+    parent_ids, lesson_ids = _review_sources(section, items)
+    state = _review_content_state(set(parent_ids), set(lesson_ids))
+    TigerTestReviewSection.objects.update_or_create(
+        session=session,
+        section_number=number,
+        defaults={
+            "items": items,
+            "parent_ids": parent_ids,
+            "lesson_ids": lesson_ids,
+            "content_stamp": _review_stamp(parent_ids, lesson_ids, state),
+        },
+    )
+    return items
+
+
+def stored_review_items(
+    session: TigerTestSession,
+    section_number: int | None = None,
+    include_explanation: bool = True,
+) -> list[dict]:
+    """
+    Review items from TigerTestReviewSection; chunks whose questions/lessons/videos
+    changed since they were built (or that don't exist yet) are rebuilt.
+    """
+    n_sections = len(session.section_slots or [])
+    if section_number is not None:
+        number = max(1, int(section_number))
+        if number > n_sections:
+            return []
+        wanted = [number]
+    else:
+        wanted = list(range(1, n_sections + 1))
+
+    chunks = {
+        chunk.section_number: chunk
+        for chunk in TigerTestReviewSection.objects.filter(
+            session=session, section_number__in=wanted
+        )
+    }
+    state = None
+    if chunks:
+        state = _review_content_state(
+            {qid for chunk in chunks.values() for qid in chunk.parent_ids},
+            {lid for chunk in chunks.values() for lid in chunk.lesson_ids},
+        )
+
+    items: list[dict] = []
+    for number in wanted:
+        chunk = chunks.get(number)
+        if chunk is not None and chunk.content_stamp == _review_stamp(
+            chunk.parent_ids, chunk.lesson_ids, state
+        ):
+            items.extend(chunk.items)
+        else:
+            items.extend(_rebuild_review_section(session, number))
+    if not include_explanation:
+        items = [{**item, "explanation": None} for item in items]
+    return items
+
+
 def score_session(session: TigerTestSession) -> dict:
+    """In-memory scoring from embedded answer keys; legacy layouts fall back to the DB."""
     sections = session.section_slots or []
     answers = session.answers or {}
-    questions_map = load_questions_map(sections)
+    questions_map = {} if _has_embedded_keys(sections) else load_questions_map(sections)
 
     verbal_correct = 0
     verbal_total = 0
@@ -1043,13 +1439,13 @@ def score_session(session: TigerTestSession) -> dict:
 
     for section in sections:
         for slot in section:
-            if slot.get("is_demo"):
-                correct_id = (slot.get("demo") or {}).get("correct")
-            else:
-                q = questions_map.get(slot.get("parent_id"))
-                if not q:
-                    continue
-                correct_id = _correct_answer_id(q, slot)
+            if (
+                not slot.get("is_demo")
+                and "correct_answer_id" not in slot
+                and slot.get("parent_id") not in questions_map
+            ):
+                continue
+            correct_id = _slot_correct_id(slot, questions_map)
             user_ans = answers.get(slot["slot_id"])
             subject = slot.get("subject") or "quant"
             if subject == "verbal":
@@ -1082,77 +1478,136 @@ def score_session(session: TigerTestSession) -> dict:
     }
 
 
-def namr_stats_for_user(user) -> dict:
-    """Light Tiger Test totals for نتائجي — scores only, no question review."""
-    empty = {
-        "attempts_count": 0,
-        "verbal_percentage": 0,
-        "quant_percentage": 0,
-        "final_percentage": 0,
-        "verbal_correct": 0,
-        "verbal_total": 0,
-        "quant_correct": 0,
-        "quant_total": 0,
-        "correct_answers": 0,
-        "incorrect_answers": 0,
-        "answered_questions_total": 0,
-    }
-    sessions = TigerTestSession.objects.filter(
-        user=user,
-        status=TigerTestSession.STATUS_COMPLETED,
-    ).order_by("-completed_at", "-created_at")
-
-    attempts = []
-    verbal_correct = 0
-    verbal_total = 0
-    quant_correct = 0
-    quant_total = 0
-    for session in sessions:
-        results = session.results or {}
-        if results.get("abandoned"):
-            continue
-        attempts.append(results)
-        verbal_correct += int(results.get("verbal_correct") or 0)
-        verbal_total += int(results.get("verbal_total") or 0)
-        quant_correct += int(results.get("quant_correct") or 0)
-        quant_total += int(results.get("quant_total") or 0)
+NAMR_EMPTY_STATS = {
+    "attempts_count": 0,
+    "verbal_percentage": 0,
+    "quant_percentage": 0,
+    "final_percentage": 0,
+    "verbal_correct": 0,
+    "verbal_total": 0,
+    "quant_correct": 0,
+    "quant_total": 0,
+    "correct_answers": 0,
+    "incorrect_answers": 0,
+    "answered_questions_total": 0,
+}
 
-    if not attempts:
-        return empty
 
-    latest = attempts[0]
+def _latest_percentages(results: dict) -> tuple[float, float, int]:
+    """(verbal %, quant %, final %) shown for the most recent attempt."""
     try:
-        verbal_pct = float(latest.get("verbal_percentage") or 0)
+        verbal_pct = float(results.get("verbal_percentage") or 0)
     except (TypeError, ValueError):
         verbal_pct = 0.0
     try:
-        quant_pct = float(latest.get("quant_percentage") or 0)
+        quant_pct = float(results.get("quant_percentage") or 0)
     except (TypeError, ValueError):
         quant_pct = 0.0
     parts = []
-    if int(latest.get("verbal_total") or 0):
+    if int(results.get("verbal_total") or 0):
         parts.append(verbal_pct)
-    if int(latest.get("quant_total") or 0):
+    if int(results.get("quant_total") or 0):
         parts.append(quant_pct)
     try:
-        stored_final = latest.get("final_percentage")
+        stored_final = results.get("final_percentage")
         final_pct = int(round(float(stored_final))) if stored_final is not None else (
             int(round(sum(parts) / len(parts))) if parts else 0
         )
     except (TypeError, ValueError):
         final_pct = int(round(sum(parts) / len(parts))) if parts else 0
+    return verbal_pct, quant_pct, final_pct
+
+
+def record_completed_attempt(user, results: dict, completed_at=None) -> None:
+    """Fold one finished attempt into the student's running totals (abandoned ones don't count)."""
+    results = results or {}
+    if results.get("abandoned"):
+        return
+    stats, created = TigerTestUserStats.objects.get_or_create(user=user)
+    if created:
+        # First row for this student: older attempts (finished before the table or
+        # before backfill_tiger_stats ran) must be counted too, so total them all.
+        rebuild_user_stats(user)
+        return
+    verbal_pct, quant_pct, final_pct = _latest_percentages(results)
+    TigerTestUserStats.objects.filter(pk=stats.pk).update(
+        attempts_count=F("attempts_count") + 1,
+        verbal_correct=F("verbal_correct") + int(results.get("verbal_correct") or 0),
+        verbal_total=F("verbal_total") + int(results.get("verbal_total") or 0),
+        quant_correct=F("quant_correct") + int(results.get("quant_correct") or 0),
+        quant_total=F("quant_total") + int(results.get("quant_total") or 0),
+        latest_verbal_percentage=verbal_pct,
+        latest_quant_percentage=quant_pct,
+        latest_final_percentage=final_pct,
+        latest_completed_at=completed_at or timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_user_stats(user) -> TigerTestUserStats:
+    """Recompute a student's totals from their completed sessions (backfill / rescoring)."""
+    rows = (
+        TigerTestSession.objects.filter(
+            user=user,
+            status=TigerTestSession.STATUS_COMPLETED,
+        )
+        .order_by("-completed_at", "-created_at")
+        .values_list("results", "completed_at")
+    )
+    totals = {
+        "attempts_count": 0,
+        "verbal_correct": 0,
+        "verbal_total": 0,
+        "quant_correct": 0,
+        "quant_total": 0,
+        "latest_verbal_percentage": 0.0,
+        "latest_quant_percentage": 0.0,
+        "latest_final_percentage": 0,
+        "latest_completed_at": None,
+    }
+    for results, completed_at in rows:
+        results = results or {}
+        if results.get("abandoned"):
+            continue
+        if not totals["attempts_count"]:
+            verbal_pct, quant_pct, final_pct = _latest_percentages(results)
+            totals["latest_verbal_percentage"] = verbal_pct
+            totals["latest_quant_percentage"] = quant_pct
+            totals["latest_final_percentage"] = final_pct
+            totals["latest_completed_at"] = completed_at
+        totals["attempts_count"] += 1
+        totals["verbal_correct"] += int(results.get("verbal_correct") or 0)
+        totals["verbal_total"] += int(results.get("verbal_total") or 0)
+        totals["quant_correct"] += int(results.get("quant_correct") or 0)
+        totals["quant_total"] += int(results.get("quant_total") or 0)
+    stats, _ = TigerTestUserStats.objects.update_or_create(user=user, defaults=totals)
+    return stats
+
 
-    correct_answers = verbal_correct + quant_correct
-    answered_total = verbal_total + quant_total
+def namr_stats_for_user(user) -> dict:
+    """Light Tiger Test totals for نتائجي — one row from TigerTestUserStats."""
+    stats = TigerTestUserStats.objects.filter(user=user).first()
+    if stats is None:
+        # Students who finished attempts before the stats table existed.
+        if not TigerTestSession.objects.filter(
+            user=user, status=TigerTestSession.STATUS_COMPLETED
+        ).exists():
+            return dict(NAMR_EMPTY_STATS)
+        stats = rebuild_user_stats(user)
+    if not stats.attempts_count:
+        return dict(NAMR_EMPTY_STATS)
+
+    correct_answers = stats.verbal_correct + stats.quant_correct
+    answered_total = stats.verbal_total + stats.quant_total
     return {
-        "attempts_count": len(attempts),
-        "verbal_percentage": int(round(verbal_pct)),
-        "quant_percentage": int(round(quant_pct)),
-        "final_percentage": final_pct,
-        "verbal_correct": verbal_correct,
-        "verbal_total": verbal_total,
-        "quant_correct": quant_correct,
-        "quant_total": quant_total,
+        "attempts_count": stats.attempts_count,
+        "verbal_percentage": int(round(stats.latest_verbal_percentage)),
+        "quant_percentage": int(round(stats.latest_quant_percentage)),
+        "final_percentage": stats.latest_final_percentage,
+        "verbal_correct": stats.verbal_correct,
+        "verbal_total": stats.verbal_total,
+        "quant_correct": stats.quant_correct,
+        "quant_total": stats.quant_total,
         "correct_answers": correct_answers,
         "incorrect_answers": max(0, answered_total - correct_answers),
         "answered_questions_total": answered_total,
@@ -1193,27 +1648,144 @@ def _count_subjects_in_sections(sections: list[list[dict]]) -> tuple[int, int]:
     return verbal, quant
 
 
+def light_sessions():
+    """Session rows without the layout/results JSON (see SESSION_LAYOUT_FIELDS)."""
+    return TigerTestSession.objects.defer(*SESSION_LAYOUT_FIELDS)
+
+
 def session_section_count(session: TigerTestSession) -> int:
-    sections = session.section_slots or []
-    return SECTION_COUNT if not sections else max(1, len(sections))
+    return max(1, session.section_count or SECTION_COUNT)
+
+
+def section_time_remaining(session: TigerTestSession, now=None) -> int:
+    """Seconds left in the current section, derived from section_started_at."""
+    if session.status != TigerTestSession.STATUS_IN_SECTION:
+        return 0
+    if not session.section_started_at:
+        # Legacy rows started before the server owned the clock.
+        return max(0, int(session.section_time_remaining or 0))
+    now = now or timezone.now()
+    elapsed = int((now - session.section_started_at).total_seconds())
+    return max(0, SECTION_SECONDS - elapsed)
+
+
+def section_expired(session: TigerTestSession, now=None) -> bool:
+    """True once the section budget (plus grace) has run out."""
+    if session.status != TigerTestSession.STATUS_IN_SECTION:
+        return False
+    if not session.section_started_at:
+        return False
+    now = now or timezone.now()
+    elapsed = (now - session.section_started_at).total_seconds()
+    return elapsed >= SECTION_SECONDS + SECTION_GRACE_SECONDS
+
+
+# Fields the light views hold; reloaded when another request moved the session on first.
+_SESSION_STATE_FIELDS = (
+    "status",
+    "current_section",
+    "current_question_index",
+    "section_time_remaining",
+    "section_started_at",
+    "bookmarked",
+    "deferred",
+    "completed_at",
+)
+
+
+def _transition(session: TigerTestSession, from_status: str, **fields) -> bool:
+    """
+    Conditional status change: only the request whose UPDATE still sees
+    from_status (and the same section) wins. The read-time close, the sweeper and
+    double clicks can all race to close one section.
+    """
+    changed = TigerTestSession.objects.filter(
+        pk=session.pk,
+        status=from_status,
+        current_section=session.current_section,
+    ).update(**fields)
+    if changed:
+        for name, value in fields.items():
+            setattr(session, name, value)
+        return True
+    session.refresh_from_db(fields=_SESSION_STATE_FIELDS)
+    return False
+
+
+def complete_session(
+    session: TigerTestSession,
+    user=None,
+    from_status: str = TigerTestSession.STATUS_BETWEEN_SECTIONS,
+    **extra_fields,
+) -> bool:
+    """Score and complete the test, then update the student's totals and wrong answers."""
+    user = user or session.user
+    completed = _transition(
+        session,
+        from_status,
+        results=score_session(session),
+        status=TigerTestSession.STATUS_COMPLETED,
+        completed_at=timezone.now(),
+        **extra_fields,
+    )
+    if not completed:
+        return False
+    record_completed_attempt(user, session.results, session.completed_at)
+    try:
+        materialize_review(session)
+    except Exception:
+        # The review is rebuilt lazily on first read; completing must not fail.
+        logger.exception("Tiger review not materialized for session %s", session.id)
+    # Wrong answers are a tracker side effect; a background job writes them.
+    jobs.enqueue("tiger_test.persist_incorrect_answers", [str(session.id)])
+    return True
+
+
+def end_current_section(session: TigerTestSession, user=None) -> bool:
+    """Close the active section; the last one scores and completes the test. False if already closed."""
+    if session.current_section >= session_section_count(session):
+        return complete_session(
+            session,
+            user=user,
+            from_status=TigerTestSession.STATUS_IN_SECTION,
+            section_time_remaining=0,
+        )
+    return _transition(
+        session,
+        TigerTestSession.STATUS_IN_SECTION,
+        section_time_remaining=0,
+        status=TigerTestSession.STATUS_BETWEEN_SECTIONS,
+        bookmarked=[],
+        deferred=[],
+    )
+
+
+def save_section_answers(session: TigerTestSession, **fields) -> bool:
+    """Write answer state only while the same section is still open (False if it closed meanwhile)."""
+    return _transition(session, TigerTestSession.STATUS_IN_SECTION, **fields)
+
+
+def close_section_if_expired(session: TigerTestSession, user=None) -> bool:
+    """Read-time sweeper: close the section when its time ran out server-side (True if this call closed it)."""
+    if not section_expired(session):
+        return False
+    return end_current_section(session, user=user)
 
 
 def session_light_state(session: TigerTestSession) -> dict:
-    """Tiny payload for answer/timer sync — no question HTML."""
-    sections = session.section_slots or []
-    n_sections = len(sections) if sections else 0
+    """Tiny payload for answer/timer sync — no question HTML, no section_slots read."""
     return {
         "ok": True,
         "id": str(session.id),
         "status": session.status,
         "current_section": session.current_section,
         "current_question_index": session.current_question_index,
-        "section_time_remaining": session.section_time_remaining,
+        "section_time_remaining": section_time_remaining(session),
         "answers": session.answers or {},
         "bookmarked": session.bookmarked or [],
         "deferred": session.deferred or [],
         "seen": session.seen or [],
-        "section_count": n_sections,
+        "section_count": session.section_count,
         "questions_per_section": QUESTIONS_PER_SECTION,
         "section_seconds": SECTION_SECONDS,
     }
@@ -1258,7 +1830,7 @@ def session_to_payload(
         "status": session.status,
         "current_section": session.current_section,
         "current_question_index": session.current_question_index,
-        "section_time_remaining": session.section_time_remaining,
+        "section_time_remaining": section_time_remaining(session),
         "section_started_at": (
             session.section_started_at.isoformat()
             if session.section_started_at
@@ -1286,7 +1858,7 @@ def session_to_payload(
         if session.status == TigerTestSession.STATUS_COMPLETED
         else None,
         "review": (
-            build_review_items(session)
+            stored_review_items(session)
             if include_review and session.status == TigerTestSession.STATUS_COMPLETED
             else None
         ),
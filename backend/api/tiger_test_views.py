@@ -10,7 +10,10 @@ from . import tiger_test as tt
 
 
 def _abandon_active_sessions(user):
-    """Mark any in-progress sessions as completed so a new one can start quickly."""
+    """
+    Mark any in-progress sessions as completed so a new one can start quickly.
+    Abandoned attempts are excluded from TigerTestUserStats, so totals stay as they are.
+    """
     now = timezone.now()
     TigerTestSession.objects.filter(
         user=user,
@@ -51,6 +54,7 @@ class TigerTestActiveView(APIView):
         )
         if not session:
             return Response({"session": None})
+        tt.close_section_if_expired(session, user=request.user)
         return Response({"session": tt.session_to_payload(session)})
 
 
@@ -72,6 +76,7 @@ class TigerTestStartView(APIView):
         ).first()
 
         if active and not force:
+            tt.close_section_if_expired(active, user=request.user)
             return Response(
                 {"session": tt.session_to_payload(active)},
                 status=status.HTTP_200_OK,
@@ -94,6 +99,7 @@ class TigerTestStartView(APIView):
             current_question_index=0,
             section_time_remaining=tt.SECTION_SECONDS,
             section_started_at=timezone.now(),
+            section_count=len(sections),
             section_slots=sections,
             answers={},
             bookmarked=[],
@@ -123,10 +129,14 @@ class TigerTestHistoryView(APIView):
     permission_classes = [IsAuthenticatedDeviceAllowed]
 
     def get(self, request):
-        sessions = TigerTestSession.objects.filter(
-            user=request.user,
-            status=TigerTestSession.STATUS_COMPLETED,
-        ).order_by("-completed_at", "-created_at")[:50]
+        sessions = (
+            TigerTestSession.objects.filter(
+                user=request.user,
+                status=TigerTestSession.STATUS_COMPLETED,
+            )
+            .only("id", "created_at", "completed_at", "results")
+            .order_by("-completed_at", "-created_at")[:50]
+        )
 
         attempts = []
         for session in sessions:
@@ -163,9 +173,10 @@ class TigerTestHistoryView(APIView):
 class TigerTestSessionView(APIView):
     permission_classes = [IsAuthenticatedDeviceAllowed]
 
-    def _get_session(self, request, session_id):
+    def _get_session(self, request, session_id, light=False):
+        qs = tt.light_sessions() if light else TigerTestSession.objects
         try:
-            return TigerTestSession.objects.get(id=session_id, user=request.user)
+            return qs.get(id=session_id, user=request.user)
         except TigerTestSession.DoesNotExist:
             return None
 
@@ -173,39 +184,39 @@ class TigerTestSessionView(APIView):
         session = self._get_session(request, session_id)
         if not session:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        tt.close_section_if_expired(session, user=request.user)
         return Response({"session": tt.session_to_payload(session)})
 
     def patch(self, request, session_id):
-        session = self._get_session(request, session_id)
+        """
+        Navigation sync. The section clock is server-owned (section_started_at),
+        so a client section_time_remaining is ignored and unchanged state is not written.
+        """
+        session = self._get_session(request, session_id, light=True)
         if not session:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if tt.close_section_if_expired(session, user=request.user):
+            return Response({"session": tt.session_to_payload(session)})
         if session.status == TigerTestSession.STATUS_COMPLETED:
             return Response({"session": tt.session_to_payload(session)})
 
         data = request.data or {}
+        changed = []
         if "current_question_index" in data:
             try:
-                session.current_question_index = max(
-                    0, int(data["current_question_index"])
-                )
+                index = max(0, int(data["current_question_index"]))
             except (TypeError, ValueError):
-                pass
-        if "section_time_remaining" in data:
-            try:
-                session.section_time_remaining = max(
-                    0, int(data["section_time_remaining"])
-                )
-            except (TypeError, ValueError):
-                pass
+                index = session.current_question_index
+            if index != session.current_question_index:
+                session.current_question_index = index
+                changed.append("current_question_index")
         if "seen" in data and isinstance(data["seen"], list):
-            session.seen = data["seen"]
-        session.save(
-            update_fields=[
-                "current_question_index",
-                "section_time_remaining",
-                "seen",
-            ]
-        )
+            # The client sends the full list; it replaces the stored one.
+            if data["seen"] != (session.seen or []):
+                session.seen = data["seen"]
+                changed.append("seen")
+        if changed:
+            session.save(update_fields=changed)
         return Response({"session": tt.session_light_state(session)})
 
 
@@ -214,10 +225,11 @@ class TigerTestAnswerView(APIView):
 
     def post(self, request, session_id):
         try:
-            session = TigerTestSession.objects.get(id=session_id, user=request.user)
+            session = tt.light_sessions().get(id=session_id, user=request.user)
         except TigerTestSession.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        tt.close_section_if_expired(session, user=request.user)
         if session.status != TigerTestSession.STATUS_IN_SECTION:
             return Response(
                 {"detail": "Cannot answer outside an active section."},
@@ -258,7 +270,18 @@ class TigerTestAnswerView(APIView):
                 deferred.remove(sid)
             session.deferred = deferred
 
-        session.save(update_fields=["answers", "bookmarked", "deferred"])
+        # Conditional on status + section: a request that raced the timer or an
+        # end-section click must not write into the section that just closed.
+        if not tt.save_section_answers(
+            session,
+            answers=session.answers,
+            bookmarked=session.bookmarked,
+            deferred=session.deferred,
+        ):
+            return Response(
+                {"detail": "Cannot answer outside an active section."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         return Response({"session": tt.session_light_state(session)})
 
 
@@ -276,35 +299,7 @@ class TigerTestEndSectionView(APIView):
         if session.status != TigerTestSession.STATUS_IN_SECTION:
             return Response({"session": tt.session_to_payload(session)})
 
-        n_sections = tt.session_section_count(session)
-        session.section_time_remaining = 0
-
-        if session.current_section >= n_sections:
-            results = tt.score_session(session)
-            session.results = results
-            session.status = TigerTestSession.STATUS_COMPLETED
-            session.completed_at = timezone.now()
-            session.save(
-                update_fields=[
-                    "section_time_remaining",
-                    "results",
-                    "status",
-                    "completed_at",
-                ]
-            )
-            tt.persist_session_incorrect_answers(request.user, session)
-        else:
-            session.status = TigerTestSession.STATUS_BETWEEN_SECTIONS
-            session.bookmarked = []
-            session.deferred = []
-            session.save(
-                update_fields=[
-                    "section_time_remaining",
-                    "status",
-                    "bookmarked",
-                    "deferred",
-                ]
-            )
+        tt.end_current_section(session, user=request.user)
         return Response({"session": tt.session_to_payload(session)})
 
 
@@ -332,12 +327,7 @@ class TigerTestNextSectionView(APIView):
         next_section = session.current_section + 1
 
         if next_section > n_sections:
-            results = tt.score_session(session)
-            session.results = results
-            session.status = TigerTestSession.STATUS_COMPLETED
-            session.completed_at = timezone.now()
-            session.save(update_fields=["results", "status", "completed_at"])
-            tt.persist_session_incorrect_answers(request.user, session)
+            tt.complete_session(session, user=request.user)
             return Response({"session": tt.session_to_payload(session)})
 
         # Skip any accidental empty sections
@@ -349,12 +339,7 @@ class TigerTestNextSectionView(APIView):
             next_section += 1
 
         if next_section > n_sections:
-            results = tt.score_session(session)
-            session.results = results
-            session.status = TigerTestSession.STATUS_COMPLETED
-            session.completed_at = timezone.now()
-            session.save(update_fields=["results", "status", "completed_at"])
-            tt.persist_session_incorrect_answers(request.user, session)
+            tt.complete_session(session, user=request.user)
             return Response({"session": tt.session_to_payload(session)})
 
         session.current_section = next_section
@@ -381,7 +366,7 @@ class TigerTestNextSectionView(APIView):
 
 
 class TigerTestReviewView(APIView):
-    """Load one completed-section review (avoids building all 120 questions)."""
+    """Load one completed-section review, served from the stored per-section chunk."""
 
     permission_classes = [IsAuthenticatedDeviceAllowed]
 
@@ -404,7 +389,7 @@ class TigerTestReviewView(APIView):
             "true",
             "yes",
         )
-        items = tt.build_review_items(
+        items = tt.stored_review_items(
             session,
             section_number=section,
             include_explanation=explain,
@@ -23,12 +23,19 @@ router.register(r'student-groups', views.StudentGroupViewSet, basename='student-
 urlpatterns = [
     # Must be before router.urls: otherwise videos/<pk>/ catches "bunny-signed-url" → 404
     path('videos/bunny-signed-url/', views.BunnySignedUrlView.as_view(), name='bunny-signed-url'),
+    path('videos/bunny-signed-urls/', views.BunnySignedUrlBatchView.as_view(), name='bunny-signed-url-batch'),
     path('videos/abuse-detector/', views.VideoAbuseDetectorView.as_view(), name='video-abuse-detector'),
+    path('videos/uploads/<uuid:upload_id>/', views.VideoUploadStatusView.as_view(), name='video-upload-status'),
+    path('videos/uploads/<uuid:upload_id>/retry/', views.VideoUploadRetryView.as_view(), name='video-upload-retry'),
     # Password endpoints before router so they never 404 behind users/<pk>/
     path('users/change-password/', views.ChangePasswordView.as_view(), name='user-change-password'),
     path('users/<int:user_id>/reset-password/', views.AdminResetPasswordView.as_view(), name='user-reset-password'),
     path('', include(router.urls)),
+    path('jobs/', views.BackgroundJobListView.as_view(), name='job-list'),
+    path('jobs/<int:job_id>/', views.BackgroundJobDetailView.as_view(), name='job-detail'),
+    path('jobs/<int:job_id>/retry/', views.BackgroundJobRetryView.as_view(), name='job-retry'),
     path('health/', views.HealthView.as_view(), name='health'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('auth/register/', views.RegisterView.as_view(), name='register'),
     path('auth/login/', views.LoginView.as_view(), name='login'),
     path('auth/logout/', views.LogoutView.as_view(), name='logout'),
@@ -0,0 +1,169 @@
+"""
+Admin video uploads to Bunny Stream outside the request cycle.
+
+The request spools the file to VIDEO_UPLOAD_SPOOL_DIR, creates the Bunny video
+(one small API call) and a VideoUpload row; the bytes are then streamed to
+Bunny's TUS endpoint in chunks by a background job. Failed attempts are retried
+by the job queue (or by staff) and resume from the offset Bunny already has.
+"""
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+
+from .bunny_config import get_bunny_config_for_library
+from .bunny_stream import (
+    BunnyStreamError,
+    bunny_tus_create,
+    bunny_tus_offset,
+    bunny_tus_upload_file,
+)
+from . import jobs
+from .models import VideoUpload
+
+logger = logging.getLogger(__name__)
+
+# Progress is written to the row at most this often.
+PROGRESS_SAVE_SECONDS = 2.0
+
+
+def _spool_dir() -> str:
+    path = str(settings.VIDEO_UPLOAD_SPOOL_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_upload(upload) -> tuple[str, int]:
+    """Move an UploadedFile into the spool dir without copying or reading it into memory."""
+    dest = os.path.join(_spool_dir(), f"{uuid.uuid4().hex}.upload")
+    temp_path = getattr(upload, "temporary_file_path", None)
+    if callable(temp_path):
+        # Large uploads are already on disk (TemporaryUploadedFile): rename it into the
+        # spool; Django's close() tolerates the temp file being gone afterwards.
+        upload.file.flush()
+        try:
+            os.replace(temp_path(), dest)
+            return dest, os.path.getsize(dest)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            # FILE_UPLOAD_TEMP_DIR is on another filesystem: fall back to a streamed copy.
+    with open(dest, "wb") as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    return dest, os.path.getsize(dest)
+
+
+def start_upload(video, upload, library_id: str, bunny_video_id: str, user=None) -> VideoUpload:
+    """Spool the file and queue the Bunny transfer for after the response."""
+    path, size = spool_upload(upload)
+    row = VideoUpload.objects.create(
+        video=video,
+        library_id=str(library_id),
+        bunny_video_id=bunny_video_id,
+        file_path=path,
+        file_name=(getattr(upload, "name", "") or "")[:255],
+        file_size=size,
+        created_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+    _enqueue(row)
+    return row
+
+
+def _enqueue(row: VideoUpload) -> None:
+    jobs.enqueue("video_upload.run", [str(row.id)], dedupe_key=f"video_upload:{row.id}")
+
+
+@jobs.job("video_upload.run")
+def run_upload(upload_id) -> None:
+    """Stream one spooled file to Bunny (creating or resuming the TUS upload)."""
+    row = VideoUpload.objects.select_related("video").filter(id=upload_id).first()
+    # The job lock keeps this single-runner; "uploading" here means a worker died mid-way.
+    if row is None or row.status == VideoUpload.STATUS_COMPLETED:
+        return
+    cfg = get_bunny_config_for_library(row.library_id) or {}
+    api_key = str(cfg.get("stream_api_key", "") or "").strip()
+
+    row.status = VideoUpload.STATUS_UPLOADING
+    row.attempts += 1
+    row.error = ""
+    row.save(update_fields=["status", "attempts", "error", "updated_at"])
+    try:
+        if not api_key:
+            raise BunnyStreamError(f"No Stream API key for library {row.library_id}")
+        if not os.path.exists(row.file_path):
+            raise BunnyStreamError("Spooled file is gone (server restarted?); upload the video again.")
+        if row.tus_url:
+            offset = bunny_tus_offset(row.tus_url, row.library_id, api_key, row.bunny_video_id)
+        else:
+            row.tus_url = bunny_tus_create(
+                row.library_id, api_key, row.bunny_video_id, row.file_size, row.video.title
+            )
+            row.save(update_fields=["tus_url", "updated_at"])
+            offset = 0
+
+        last_save = [0.0]
+
+        def _progress(done: int) -> None:
+            # Uploads can outlast JOBS_STALE_AFTER_SECONDS; keep the job claim fresh.
+            jobs.heartbeat()
+            now = time.monotonic()
+            if now - last_save[0] < PROGRESS_SAVE_SECONDS:
+                return
+            last_save[0] = now
+            VideoUpload.objects.filter(id=row.id).update(bytes_uploaded=done)
+
+        done = bunny_tus_upload_file(
+            row.tus_url,
+            row.library_id,
+            api_key,
+            row.bunny_video_id,
+            row.file_path,
+            offset=offset,
+            progress=_progress,
+        )
+    except jobs.JobLost:
+        # Requeued as stale while we were uploading; the new runner owns the row now.
+        raise
+    except Exception as exc:
+        logger.warning("Bunny upload %s failed: %s", row.id, exc)
+        row.status = VideoUpload.STATUS_FAILED
+        row.error = str(exc)[:2000]
+        row.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    row.bytes_uploaded = done
+    row.status = VideoUpload.STATUS_COMPLETED
+    row.save(update_fields=["bytes_uploaded", "status", "updated_at"])
+    try:
+        os.remove(row.file_path)
+    except OSError:
+        pass
+
+
+def retry_upload(row: VideoUpload) -> None:
+    row.status = VideoUpload.STATUS_PENDING
+    row.save(update_fields=["status", "updated_at"])
+    _enqueue(row)
+
+
+def upload_payload(row: VideoUpload) -> dict:
+    return {
+        "id": str(row.id),
+        "video_id": row.video_id,
+        "bunny_video_id": row.bunny_video_id,
+        "library_id": row.library_id,
+        "status": row.status,
+        "file_name": row.file_name,
+        "file_size": row.file_size,
+        "bytes_uploaded": row.bytes_uploaded,
+        "progress": round(row.bytes_uploaded * 100 / row.file_size, 1) if row.file_size else 0,
+        "error": row.error,
+        "attempts": row.attempts,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
@@ -21,7 +21,7 @@ from .models import (
     Question, Answer, Video, File, StudentProgress, LessonProgress,
     QuizAttempt, VideoWatch, IncorrectAnswer,
     StudentGroup, StudentGroupMembership, VideoAccessLog,
-    BunnyStreamLibrary,
+    BunnyStreamLibrary, VideoUpload, BackgroundJob,
 )
 
 _CHAPTER_SHALLOW_QS = Chapter.objects.annotate(
@@ -29,7 +29,11 @@ _CHAPTER_SHALLOW_QS = Chapter.objects.annotate(
 ).order_by('order')
 from .utils import get_client_ip, extract_bunny_video_id, extract_bunny_library_id
 from .bunny_config import get_bunny_library_configs, get_bunny_config_for_library
-from .bunny_stream import bunny_create_and_upload, bunny_video_exists, BunnyStreamError
+from .bunny_stream import bunny_create_video, BunnyStreamError
+from . import (
+    abuse_signals, access_log, bunny_library_map, cloudinary_urls, db_routing, file_cache, file_proxy,
+    http_client, jobs, metrics, video_upload,
+)
 from .permissions import IsAuthenticatedDeviceAllowed
 from . import tiger_test
 from . import trial as trial_content
@@ -99,7 +103,7 @@ class IsStaffUser(permissions.BasePermission):
 
 
 class HealthView(APIView):
-    """Health check. Use ?db=1 to also ping Postgres/Neon (wakes suspended compute)."""
+    """Health check. Use ?db=1 to also ping Postgres/Neon (wakes suspended compute) and the read replica."""
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
@@ -115,6 +119,13 @@ class HealthView(APIView):
                 payload["db"] = "ok"
             except Exception:
                 payload["db"] = "error"
+            if db_routing.replica_configured():
+                payload["db_replica"] = db_routing.status()
+        if request.query_params.get("file_cache") in ("1", "true", "yes"):
+            payload["file_cache"] = file_cache.stats()
+            payload["signed_urls"] = cloudinary_urls.stats()
+        if request.query_params.get("http") in ("1", "true", "yes"):
+            payload["outbound_http"] = http_client.metrics()
         # Safe flags for debugging Bunny (never expose secret values)
         if request.query_params.get("bunny") in ("1", "true", "yes"):
             cfg = get_bunny_library_configs()
@@ -378,6 +389,7 @@ class ExportDbView(APIView):
         try:
             call_command(
                 'dumpdata',
+                '--database', db_routing.read_alias(),
                 '--natural-foreign',
                 '--exclude', 'contenttypes',
                 '--exclude', 'auth.Permission',
@@ -816,7 +828,7 @@ class ChapterViewSet(viewsets.ModelViewSet):
             seen.add(cid)
             next_order += 1
             updated += 1
-            invalidate_chapter_dashboard_cache(cid)
+            invalidate_chapter_dashboard_cache(cid, tiger_pool=False)
         # Trailing chapters (not in order list) keep relative order
         trailing = [c for c in chapters if c.id not in seen]
         trailing.sort(key=lambda c: (c.order or 0, c.name))
@@ -824,7 +836,7 @@ class ChapterViewSet(viewsets.ModelViewSet):
             ch.order = next_order
             ch.save(update_fields=['order'])
             next_order += 1
-            invalidate_chapter_dashboard_cache(ch.id)
+            invalidate_chapter_dashboard_cache(ch.id, tiger_pool=False)
         return Response({'updated': updated})
 
     def perform_create(self, serializer):
@@ -919,7 +931,7 @@ class LessonViewSet(viewsets.ModelViewSet):
             le.order = next_order
             le.save(update_fields=['order'])
             next_order += 1
-        invalidate_chapter_dashboard_cache(chapter_id)
+        invalidate_chapter_dashboard_cache(chapter_id, tiger_pool=False)
         return Response({'updated': updated})
 
     def perform_create(self, serializer):
@@ -1032,7 +1044,8 @@ class QuestionViewSet(viewsets.ModelViewSet):
             if qid in id_to_question:
                 id_to_question[qid].order_index = i + 1
                 id_to_question[qid].save(update_fields=['order_index'])
-        invalidate_chapter_dashboard_for_lesson(lesson_id)
+        # Order is not part of the Tiger pool; keep it cached.
+        invalidate_chapter_dashboard_for_lesson(lesson_id, tiger_pool=False)
         return Response({'updated': len(order_ids)})
     
     def perform_create(self, serializer):
@@ -1070,16 +1083,20 @@ class QuestionViewSet(viewsets.ModelViewSet):
         
         # Update serializer instance for response
         serializer.instance = question
-        invalidate_chapter_dashboard_cache(getattr(question, 'chapter_id', None))
+        invalidate_chapter_dashboard_cache(getattr(question, 'chapter_id', None), tiger_pool=False)
+        tiger_test.update_slot_pool([question.id])
 
     def perform_update(self, serializer):
         question = serializer.save()
-        invalidate_chapter_dashboard_cache(getattr(question, 'chapter_id', None))
+        invalidate_chapter_dashboard_cache(getattr(question, 'chapter_id', None), tiger_pool=False)
+        tiger_test.update_slot_pool([question.id])
 
     def perform_destroy(self, instance):
         chapter_id = instance.chapter_id
+        question_id = instance.id
         instance.delete()
-        invalidate_chapter_dashboard_cache(chapter_id)
+        invalidate_chapter_dashboard_cache(chapter_id, tiger_pool=False)
+        tiger_test.update_slot_pool([question_id])
 
 
 class BunnyStreamLibraryViewSet(viewsets.ModelViewSet):
@@ -1155,9 +1172,10 @@ class VideoViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'lesson required'}, status=status.HTTP_400_BAD_REQUEST)
             title = (request.data.get('title') or '').strip() or 'Video'
             description = request.data.get('description', '') or ''
+            if not upload.size:
+                return Response({'error': 'Empty file'}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                raw = upload.read()
-                guid = bunny_create_and_upload(library_id, stream_key, title, raw)
+                guid = bunny_create_video(library_id, stream_key, title)
             except BunnyStreamError as e:
                 return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
             vid = request.data.get('id') or f"v_{uuid.uuid4().hex[:12]}"
@@ -1170,6 +1188,8 @@ class VideoViewSet(viewsets.ModelViewSet):
                 bunny_library_id=library_id_str,
                 created_by=request.user,
             )
+            bunny_library_map.remember_video_library(guid, library_id_str)
+            upload_row = video_upload.start_upload(video, upload, library_id_str, guid, request.user)
             self._sync_video_hierarchy(video)
             if trial_content.is_trial_video(video) and not video.is_public:
                 video.is_public = True
@@ -1178,7 +1198,9 @@ class VideoViewSet(viewsets.ModelViewSet):
             if video.lesson_id:
                 invalidate_chapter_dashboard_for_lesson(video.lesson_id)
             serializer = self.get_serializer(video)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            data = dict(serializer.data)
+            data['upload'] = video_upload.upload_payload(upload_row)
+            return Response(data, status=status.HTTP_201_CREATED)
         return super().create(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
@@ -1203,9 +1225,10 @@ class VideoViewSet(viewsets.ModelViewSet):
                 instance.title = (title or '').strip() or instance.title
             if request.data.get('description') is not None:
                 instance.description = request.data.get('description', '') or ''
+            if not upload.size:
+                return Response({'error': 'Empty file'}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                raw = upload.read()
-                guid = bunny_create_and_upload(library_id, stream_key, instance.title, raw)
+                guid = bunny_create_video(library_id, stream_key, instance.title)
             except BunnyStreamError as e:
                 return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
             if instance.video_file:
@@ -1214,12 +1237,16 @@ class VideoViewSet(viewsets.ModelViewSet):
             instance.video_url = guid
             instance.bunny_library_id = library_id_str
             instance.save()
+            bunny_library_map.remember_video_library(guid, library_id_str)
+            upload_row = video_upload.start_upload(instance, upload, library_id_str, guid, request.user)
             self._sync_video_hierarchy(instance)
             invalidate_chapter_dashboard_cache(instance.chapter_id)
             if instance.lesson_id:
                 invalidate_chapter_dashboard_for_lesson(instance.lesson_id)
             serializer = self.get_serializer(instance)
-            return Response(serializer.data)
+            data = dict(serializer.data)
+            data['upload'] = video_upload.upload_payload(upload_row)
+            return Response(data)
         return super().update(request, *args, **kwargs)
     
     def perform_create(self, serializer):
@@ -1248,6 +1275,10 @@ class VideoViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         video = serializer.save()
         video.sync_hierarchy_from_lesson()
+        if 'video_url' in serializer.validated_data or 'bunny_library_id' in serializer.validated_data:
+            # Admin re-pointed the video; verify its library again on next play.
+            if video.bunny_video_id:
+                bunny_library_map.forget_video_library(video.bunny_video_id)
         invalidate_chapter_dashboard_cache(video.chapter_id)
         if video.lesson_id:
             invalidate_chapter_dashboard_for_lesson(video.lesson_id)
@@ -1334,71 +1365,29 @@ class FileViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='content')
     def content(self, request, pk=None):
-        """Stream file content for embedding (e.g. PDF viewer). Auth required. Proxies Cloudinary with signed URLs."""
-        import urllib.request
+        """Stream file content for embedding (e.g. PDF viewer). Auth required. Proxies Cloudinary with signed URLs; supports Range."""
         f = self.get_object()
         if not f.file:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        ct = 'application/octet-stream'
-        if (f.file_type or '').lower() == 'application/pdf':
-            ct = 'application/pdf'
-        elif (f.title or '').lower().endswith('.pdf'):
-            ct = 'application/pdf'
-        elif (f.file_type or '').lower() in ('application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'):
-            ct = (f.file_type or '').lower()
-
-        file_url = None
-        is_cloudinary = False
-        raw_url = getattr(f.file, 'url', None) or ''
-        if isinstance(raw_url, str) and ('cloudinary.com' in raw_url or raw_url.startswith('http')):
-            is_cloudinary = 'cloudinary.com' in raw_url
-            file_url = raw_url
-
-        if file_url and is_cloudinary:
-            try:
-                from django.conf import settings
-                import cloudinary.utils
-                creds = getattr(settings, 'CLOUDINARY_STORAGE', {}) or {}
-                api_secret = creds.get('API_SECRET')
-                if api_secret:
-                    public_id = getattr(f.file, 'name', None) or ''
-                    if not public_id:
-                        return Response({'detail': 'File path not found.'}, status=status.HTTP_404_NOT_FOUND)
-                    resource_type = 'image' if '/image/' in raw_url else ('raw' if '/raw/' in raw_url else 'image')
-                    signed_url, _ = cloudinary.utils.cloudinary_url(
-                        public_id,
-                        resource_type=resource_type,
-                        sign_url=True,
-                        api_secret=api_secret,
-                        cloud_name=creds.get('CLOUD_NAME'),
-                        api_key=creds.get('API_KEY'),
-                    )
-                    if signed_url:
-                        file_url = signed_url
-            except Exception:
-                pass
-
+        ct = file_proxy.content_type_for(f)
+        file_url = file_proxy.upstream_url(f)
         if file_url and (file_url.startswith('http://') or file_url.startswith('https://')):
-            try:
-                req = urllib.request.Request(file_url, headers={'User-Agent': 'Mozilla/5.0'})
-                with urllib.request.urlopen(req, timeout=30) as r:
-                    data = r.read()
-            except Exception:
+            etag = None
+            if file_cache.enabled():
+                key = file_cache.cache_key(f)
+                etag = file_cache.etag_for(key)
+                entry = file_cache.open_entry(key) or file_cache.miss(key, file_url)
+                if entry:
+                    return file_proxy.serve_open(request, *entry, etag, ct, f.title)
+            resp = file_proxy.proxy_remote(request, file_url, ct, f.title, etag=etag)
+            if resp is None:
                 return Response(
                     {'detail': 'Failed to fetch file from storage. File may be private - ensure CLOUDINARY credentials are set.'},
                     status=status.HTTP_502_BAD_GATEWAY
                 )
-        else:
-            try:
-                f.file.open('rb')
-                data = f.file.read()
-            finally:
-                f.file.close()
-
-        resp = HttpResponse(data, content_type=ct)
-        resp['Content-Disposition'] = 'inline; filename="%s"' % (f.title or 'file')
-        return resp
+            return resp
+        return file_proxy.serve_local(request, f.file, ct, f.title)
 
 
 class StudentProgressViewSet(viewsets.ModelViewSet):
@@ -1916,30 +1905,40 @@ class TrackerAdminSummaryView(APIView):
     """Admin overview: per-student stats, averages, video watch counts, incorrect answers."""
     permission_classes = [IsAdminUser]
 
+    @db_routing.replica_view
     def get(self, request):
-        from django.db.models import Count, Avg
-        from collections import defaultdict
         students = User.objects.filter(role='student', is_active=True)
-        result = []
-        for s in students:
-            attempts = QuizAttempt.objects.filter(user=s).aggregate(
+        # One grouped query per table instead of three per student.
+        attempt_map = {
+            row['user_id']: row
+            for row in QuizAttempt.objects.filter(user__in=students).values('user_id').annotate(
                 total_attempts=Count('id'),
                 avg_score=Avg('score'),
-                avg_duration=Avg('duration_seconds')
+                avg_duration=Avg('duration_seconds'),
             )
-            total_video_watches = VideoWatch.objects.filter(user=s).aggregate(
+        }
+        watch_map = dict(
+            VideoWatch.objects.filter(user__in=students).values('user_id').annotate(
                 t=Sum('watch_count')
-            ).get('t') or 0
-            incorrect_count = IncorrectAnswer.objects.filter(user=s).count()
+            ).values_list('user_id', 't')
+        )
+        incorrect_map = dict(
+            IncorrectAnswer.objects.filter(user__in=students).values('user_id').annotate(
+                n=Count('id')
+            ).values_list('user_id', 'n')
+        )
+        result = []
+        for s in students.only('id', 'username', 'first_name'):
+            attempts = attempt_map.get(s.id, {})
             result.append({
                 'user_id': s.id,
                 'username': s.username,
                 'first_name': s.first_name or s.username,
-                'total_exam_attempts': attempts['total_attempts'] or 0,
-                'avg_exam_score': round(attempts['avg_score'] or 0, 1),
-                'avg_exam_duration_seconds': round(attempts['avg_duration'] or 0),
-                'total_video_watches': total_video_watches,
-                'incorrect_answers_count': incorrect_count,
+                'total_exam_attempts': attempts.get('total_attempts') or 0,
+                'avg_exam_score': round(attempts.get('avg_score') or 0, 1),
+                'avg_exam_duration_seconds': round(attempts.get('avg_duration') or 0),
+                'total_video_watches': watch_map.get(s.id) or 0,
+                'incorrect_answers_count': incorrect_map.get(s.id, 0),
             })
         return Response({
             'students': result,
@@ -1951,6 +1950,7 @@ class TrackerAdminStudentDetailView(APIView):
     """Admin: detailed progress for a specific student - per lesson/bank."""
     permission_classes = [IsAdminUser]
 
+    @db_routing.replica_view
     def get(self, request):
         user_id = request.query_params.get('user_id')
         if not user_id:
@@ -2201,6 +2201,7 @@ class TrackerByLessonView(APIView):
     """Admin: for a group and lesson, return table of students with per-question scores (like the image)."""
     permission_classes = [IsAdminUser]
 
+    @db_routing.replica_view
     def get(self, request):
         group_id = request.query_params.get('group_id')
         lesson_id = request.query_params.get('lesson_id')
@@ -2305,24 +2306,57 @@ class BunnySignedUrlView(APIView):
     - BUNNY_SECURITY_KEY never touches the frontend.
     - Every request is logged to VideoAccessLog for traceability.
     - Token includes user identity so each URL is session-bound.
+    - A still-valid URL is handed back to the same user/IP/device instead of minting a new one.
     """
     permission_classes = [IsAuthenticatedDeviceAllowed]
 
+    SIGNED_URL_TTL = 4 * 60 * 60
+    # Reuse a cached URL only while it has at least this long left.
+    SIGNED_URL_REUSE_MIN_REMAINING = 60 * 60
+    SIGNED_URL_CACHE_PREFIX = 'bunny_signed_v1:'
+
+    def _signed_url_cache_key(self, user_id, library_id, video_id, security_key):
+        # Key fingerprint: rotating the library's token key stops reuse of old URLs.
+        key_fp = hashlib.sha1(security_key.encode()).hexdigest()[:8]
+        return f'{self.SIGNED_URL_CACHE_PREFIX}{user_id}:{library_id}:{video_id}:{key_fp}'
+
+    def _reusable(self, cached, ip, session_key):
+        if not cached:
+            return False
+        if cached.get('ip') != (ip or '') or cached.get('sk') != session_key:
+            return False
+        return cached['expires'] - int(time.time()) >= self.SIGNED_URL_REUSE_MIN_REMAINING
+
+    def _reuse_signed_url(self, cache_key, user_id, video_id, ip, session_key):
+        cached = cache.get(cache_key)
+        if not self._reusable(cached, ip, session_key):
+            return None
+        access_log.access_log_buffer.add_reuse(user_id, video_id, cached['expires'])
+        return cached
+
+    def _signed_url_cache_entry(self, url, expires, risk, ip, session_key):
+        return {'url': url, 'expires': expires, 'risk': risk, 'ip': ip or '', 'sk': session_key}
+
+    def _sign(self, library_id, video_id, security_key):
+        expires = int(time.time()) + self.SIGNED_URL_TTL  # 4-hour window
+        # Bunny token formula (standard): SHA256(security_key + video_id + expires)
+        token_data = f"{security_key}{video_id}{expires}"
+        token = hashlib.sha256(token_data.encode()).hexdigest()
+        signed_url = (
+            f"https://iframe.mediadelivery.net/embed/{library_id}/{video_id}"
+            f"?token={token}&expires={expires}&autoplay=false"
+        )
+        return signed_url, expires
+
     def _find_video_by_bunny_id(self, bunny_video_id):
-        qs = Video.objects.select_related('category', 'lesson')
-
-        # Fast path: modern rows store raw Bunny video ID directly in video_url.
-        video = qs.filter(video_url=bunny_video_id).first()
-        if video:
-            return video
-
-        # Backward compatibility: some legacy rows stored a full Bunny URL.
-        # Narrow in SQL first, then verify exact extracted ID in Python.
-        candidates = qs.filter(video_url__icontains=bunny_video_id)[:100]
-        for candidate in candidates:
-            if extract_bunny_video_id(candidate.video_url or '') == bunny_video_id:
-                return candidate
-        return None
+        # Video.bunny_video_id is parsed from video_url on save (legacy full URLs
+        # included), so this is one index lookup.
+        return (
+            Video.objects.select_related('category', 'lesson')
+            .filter(bunny_video_id=bunny_video_id)
+            .order_by()
+            .first()
+        )
 
     def _find_video_by_lesson_hint(self, lesson_id, requested_video_id=None):
         """
@@ -2336,32 +2370,32 @@ class BunnySignedUrlView(APIView):
             Video.objects
             .select_related('category', 'lesson')
             .filter(lesson_id=lesson_id)
-            .exclude(video_url__isnull=True)
-            .exclude(video_url='')
-        )[:20]
+            .exclude(bunny_video_id='')
+            .order_by()
+        )
 
-        # 1) Prefer a row that matches the requested id after extraction.
+        # 1) Prefer a row that matches the requested id.
         if requested_video_id:
-            for candidate in qs:
-                candidate_id = extract_bunny_video_id(candidate.video_url or '')
-                if candidate_id and candidate_id == requested_video_id:
-                    return candidate, candidate_id
-
-        # 2) If lesson has exactly one Bunny-like row, trust it.
-        bunny_candidates = []
-        for candidate in qs:
-            candidate_id = extract_bunny_video_id(candidate.video_url or '')
-            if candidate_id:
-                bunny_candidates.append((candidate, candidate_id))
+            video = qs.filter(bunny_video_id=requested_video_id).first()
+            if video:
+                return video, video.bunny_video_id
+
+        # 2) If lesson has exactly one Bunny row, trust it.
+        bunny_candidates = list(qs[:2])
         if len(bunny_candidates) == 1:
-            return bunny_candidates[0]
+            return bunny_candidates[0], bunny_candidates[0].bunny_video_id
 
         return None, requested_video_id
 
-    def _resolve_bunny_library(self, video, video_id, requested_library_id=None):
+    def _resolve_bunny_library(self, video, video_id, requested_library_id=None, deferred_probes=None,
+                               probe_deadline=None):
         """
         Resolve the Bunny library config for this video across multiple libraries.
-        Prefers verifiable matches (via Bunny Stream API) and caches the match on the video row.
+        Prefers verified matches (BunnyVideoLibrary, probed via the Bunny Stream API on a
+        cold miss) and caches the match on the video row. A caller that already knows the
+        video is unmapped can pass a list as deferred_probes: the Bunny probe is then
+        appended there as (video_id, library order) instead of run now. probe_deadline
+        (time.monotonic()) lets several resolves share one probe time budget.
         """
         configs = get_bunny_library_configs()
         if not configs:
@@ -2380,23 +2414,19 @@ class BunnySignedUrlView(APIView):
             if lib and lib not in ordered_ids:
                 ordered_ids.append(lib)
 
-        # Pass 1: verify existence via per-library API key when available.
-        for lib in ordered_ids:
-            cfg = configs.get(lib) or {}
-            sec = str(cfg.get('security_key', '') or '').strip()
-            api = str(cfg.get('stream_api_key', '') or '').strip()
-            if not sec:
-                continue
-            if not api:
-                continue
-            try:
-                if bunny_video_exists(int(lib), api, video_id):
-                    if str(getattr(video, 'bunny_library_id', '') or '').strip() != lib:
-                        video.bunny_library_id = lib
-                        video.save(update_fields=['bunny_library_id'])
-                    return lib, cfg
-            except (ValueError, BunnyStreamError):
-                continue
+        # Pass 1: library verified via the Bunny Stream API, from the stored
+        # mapping; Bunny itself is only asked on a cold miss.
+        if deferred_probes is not None:
+            deferred_probes.append((video_id, ordered_ids))
+            lib = None
+        else:
+            lib = bunny_library_map.resolve_video_library(video_id, ordered_ids, configs, probe_deadline)
+        cfg = (configs.get(lib) or {}) if lib else {}
+        if lib and str(cfg.get('security_key', '') or '').strip():
+            if str(getattr(video, 'bunny_library_id', '') or '').strip() != lib:
+                video.bunny_library_id = lib
+                video.save(update_fields=['bunny_library_id'])
+            return lib, cfg
 
         # Pass 2: trust explicit per-video / request library when keys exist for that id.
         for lib in [pinned, requested, from_video_url]:
@@ -2421,7 +2451,8 @@ class BunnySignedUrlView(APIView):
 
         return None, None
 
-    def _can_access_video(self, user, video):
+    def _account_access(self, user):
+        """True/False when the account alone decides; None when it depends on the video's category."""
         if not user or not user.is_authenticated:
             return False
         if getattr(user, 'role', None) in ('admin', 'content_admin') or getattr(user, 'is_staff', False):
@@ -2430,17 +2461,25 @@ class BunnySignedUrlView(APIView):
             return False
         if not getattr(user, 'is_active_account', False) or not user.is_within_account_period():
             return False
+        return None
 
-        if not video.category_id:
-            video.sync_hierarchy_from_lesson()
-
-        category_name = video.resolved_category_name()
+    def _category_access(self, user, category_name):
         if category_name == 'التأسيس' or 'تأسيس' in category_name:
             return bool(getattr(user, 'abilities_categories_foundation', False))
         if category_name == 'التجميعات' or 'تجميع' in category_name:
             return bool(getattr(user, 'abilities_categories_collections', False))
         return False
 
+    def _can_access_video(self, user, video):
+        allowed = self._account_access(user)
+        if allowed is not None:
+            return allowed
+
+        if not video.category_id:
+            video.sync_hierarchy_from_lesson()
+
+        return self._category_access(user, video.resolved_category_name())
+
     def get(self, request):
         raw_video_id = request.query_params.get('video_id', '').strip()
         if not raw_video_id:
@@ -2490,21 +2529,23 @@ class BunnySignedUrlView(APIView):
                 status=503,
             )
 
-        expires = int(time.time()) + (4 * 60 * 60)  # 4-hour window
+        ip = get_client_ip(request)
+        session_key = request.query_params.get('sk', '')[:64]  # frontend fingerprint
 
-        # Bunny token formula (standard): SHA256(security_key + video_id + expires)
-        token_data = f"{security_key}{video_id}{expires}"
-        token = hashlib.sha256(token_data.encode()).hexdigest()
+        # Video pages re-request on every remount; hand back the live URL.
+        cache_key = self._signed_url_cache_key(request.user.id, library_id, video_id, security_key)
+        reused = self._reuse_signed_url(cache_key, request.user.id, video_id, ip, session_key)
+        if reused:
+            return Response({
+                'url': reused['url'],
+                'expires': reused['expires'],
+                'risk': reused['risk'],
+            })
 
-        signed_url = (
-            f"https://iframe.mediadelivery.net/embed/{library_id}/{video_id}"
-            f"?token={token}&expires={expires}&autoplay=false"
-        )
+        signed_url, expires = self._sign(library_id, video_id, security_key)
 
         # ── Audit log ──────────────────────────────────────────────────
-        ip = get_client_ip(request)
         ua = request.META.get('HTTP_USER_AGENT', '')[:500]
-        session_key = request.query_params.get('sk', '')[:64]  # frontend fingerprint
 
         log_entry = VideoAccessLog(
             user=request.user,
@@ -2516,28 +2557,24 @@ class BunnySignedUrlView(APIView):
         )
 
         # Flag if this user has accessed the same video from >2 IPs in the last 24h
-        from django.utils.timezone import now
-        from datetime import timedelta
-        recent_ips = (
-            VideoAccessLog.objects
-            .filter(
-                user=request.user,
-                video_id=video_id,
-                requested_at__gte=now() - timedelta(hours=24),
+        # (sliding window kept in the cache, not a query on the log table).
+        try:
+            log_entry.risk_level, log_entry.distinct_ips = access_log.record_ip_and_score(
+                request.user.id, video_id, ip
             )
-            .values_list('ip_address', flat=True)
-            .distinct()
-        )
-        distinct_ip_count = len(set(list(recent_ips) + [ip]))
-        if distinct_ip_count >= 4:
-            log_entry.risk_level = VideoAccessLog.RISK_FLAG
-        elif distinct_ip_count >= 2:
-            log_entry.risk_level = VideoAccessLog.RISK_WARN
-
+        except Exception:
+            pass
         try:
-            log_entry.save()
+            # Queued; a background thread bulk-inserts the rows.
+            access_log.access_log_buffer.add(log_entry)
         except Exception:
             pass  # Never block video delivery over a logging failure
+        else:
+            cache.set(
+                cache_key,
+                self._signed_url_cache_entry(signed_url, expires, log_entry.risk_level, ip, session_key),
+                self.SIGNED_URL_TTL - self.SIGNED_URL_REUSE_MIN_REMAINING,
+            )
 
         return Response({
             'url': signed_url,
@@ -2590,99 +2627,333 @@ class PublicTryFreeBunnySignedUrlView(BunnySignedUrlView):
                 status=503,
             )
 
-        expires = int(time.time()) + (4 * 60 * 60)
-        token_data = f"{security_key}{video_id}{expires}"
-        token = hashlib.sha256(token_data.encode()).hexdigest()
-        signed_url = (
-            f"https://iframe.mediadelivery.net/embed/{library_id}/{video_id}"
-            f"?token={token}&expires={expires}&autoplay=false"
-        )
+        signed_url, expires = self._sign(library_id, video_id, security_key)
         return Response({'url': signed_url, 'expires': expires})
 
 
+class BunnySignedUrlBatchView(BunnySignedUrlView):
+    """
+    Signed URLs for every video of a chapter or lesson in one call
+    (?chapter_id= / ?lesson_id= / ?video_ids=id1,id2). Same access rules,
+    library resolution, URL reuse and audit log as the single endpoint, done in
+    bulk: one hierarchy query, one access decision per category, one log insert.
+    """
+    MAX_VIDEOS = 100
+    # Cold Bunny probes allowed in one request, sharing one PROBE_BUDGET_SECONDS budget;
+    # the rest are resolved by a background job and reported in `resolving`.
+    MAX_COLD_RESOLVES = 3
+
+    def _batch_videos(self, request):
+        qs = (
+            Video.objects
+            .select_related('category', 'lesson__chapter__category')
+            .exclude(bunny_video_id='')
+            .order_by('order', 'id')
+        )
+        raw_ids = request.query_params.get('video_ids', '').strip()
+        lesson_id = request.query_params.get('lesson_id', '').strip()
+        chapter_id = request.query_params.get('chapter_id', '').strip()
+        if raw_ids:
+            ids = {extract_bunny_video_id(v.strip()) for v in raw_ids.split(',')} - {None}
+            qs = qs.filter(bunny_video_id__in=ids)
+        elif lesson_id:
+            qs = qs.filter(lesson_id=lesson_id)
+        elif chapter_id:
+            qs = qs.filter(Q(chapter_id=chapter_id) | Q(lesson__chapter_id=chapter_id))
+        else:
+            return None
+        videos = {}
+        for video in qs[:self.MAX_VIDEOS]:
+            videos.setdefault(video.bunny_video_id, video)
+        return list(videos.values())
+
+    def _batch_libraries(self, videos):
+        """
+        [(video, library_id, security_key)], videos whose library can't sign, and
+        the ids among those still being looked up in the background.
+        """
+        configs = get_bunny_library_configs()
+        known = bunny_library_map.known_video_libraries(
+            [v.bunny_video_id for v in videos], list(configs)
+        )
+        cold = bunny_library_map.needs_probe(
+            [v.bunny_video_id for v in videos if v.bunny_video_id not in known]
+        )
+        cold_budget = self.MAX_COLD_RESOLVES
+        probe_deadline = time.monotonic() + bunny_library_map.PROBE_BUDGET_SECONDS
+        signable, unavailable, resolving, repinned, deferred = [], [], [], [], []
+        for video in videos:
+            lib = known.get(video.bunny_video_id)
+            key = str((configs.get(lib) or {}).get('security_key', '') or '').strip() if lib else ''
+            if lib and key:
+                if str(video.bunny_library_id or '').strip() != lib:
+                    video.bunny_library_id = lib
+                    repinned.append(video)
+            else:
+                # Not mapped yet: same resolution as the single endpoint, but only a
+                # few cold probes per request; the others are queued.
+                defer = video.bunny_video_id in cold and cold_budget <= 0
+                if video.bunny_video_id in cold:
+                    cold_budget -= 1
+                lib, cfg = self._resolve_bunny_library(
+                    video, video.bunny_video_id, deferred_probes=deferred if defer else None,
+                    probe_deadline=probe_deadline,
+                )
+                key = str((cfg or {}).get('security_key', '') or '').strip()
+                if defer and not (lib and key):
+                    resolving.append(video)
+            if lib and key:
+                signable.append((video, lib, key))
+            else:
+                unavailable.append(video)
+        if repinned:
+            Video.objects.bulk_update(repinned, ['bunny_library_id'])
+        if deferred:
+            bunny_library_map.schedule_lookups(deferred)
+        return signable, unavailable, resolving
+
+    def get(self, request):
+        videos = self._batch_videos(request)
+        if videos is None:
+            return Response({'error': 'chapter_id, lesson_id or video_ids is required'}, status=400)
+
+        user = request.user
+        account = self._account_access(user)
+        by_category = {}
+        allowed, denied = [], []
+        for video in videos:
+            ok = account
+            if ok is None:
+                name = video.resolved_category_name()
+                if name not in by_category:
+                    by_category[name] = self._category_access(user, name)
+                ok = by_category[name]
+            (allowed if ok else denied).append(video)
+
+        signable, unavailable, resolving = self._batch_libraries(allowed)
+
+        ip = get_client_ip(request)
+        session_key = request.query_params.get('sk', '')[:64]
+        ua = request.META.get('HTTP_USER_AGENT', '')[:500]
+        cache_keys = {
+            video.bunny_video_id: self._signed_url_cache_key(user.id, lib, video.bunny_video_id, key)
+            for video, lib, key in signable
+        }
+        cached = cache.get_many(list(cache_keys.values()))
+
+        def _item(video, url, expires, risk):
+            return {
+                'id': video.id,
+                'video_id': video.bunny_video_id,
+                'lesson_id': video.lesson_id,
+                'url': url,
+                'expires': expires,
+                'risk': risk,
+            }
+
+        results, fresh, reused = [], [], []
+        for video, lib, key in signable:
+            hit = cached.get(cache_keys[video.bunny_video_id])
+            if self._reusable(hit, ip, session_key):
+                reused.append((user.id, video.bunny_video_id, hit['expires']))
+                results.append(_item(video, hit['url'], hit['expires'], hit['risk']))
+            else:
+                fresh.append((video, lib, key))
+        access_log.access_log_buffer.add_reuses(reused)
+
+        try:
+            scores = access_log.record_ip_and_score_many(
+                user.id, [video.bunny_video_id for video, _lib, _key in fresh], ip
+            )
+        except Exception:
+            scores = {}
+        entries, to_cache = [], {}
+        for video, lib, key in fresh:
+            vid = video.bunny_video_id
+            signed_url, expires = self._sign(lib, vid, key)
+            entry = VideoAccessLog(
+                user=user,
+                video_id=vid,
+                ip_address=ip or None,
+                user_agent=ua,
+                session_key=session_key,
+                token_expires=expires,
+            )
+            if vid in scores:
+                entry.risk_level, entry.distinct_ips = scores[vid]
+            entries.append(entry)
+            to_cache[cache_keys[vid]] = self._signed_url_cache_entry(
+                signed_url, expires, entry.risk_level, ip, session_key
+            )
+            results.append(_item(video, signed_url, expires, entry.risk_level))
+        try:
+            access_log.access_log_buffer.add_many(entries)
+        except Exception:
+            pass  # Never block video delivery over a logging failure
+        else:
+            cache.set_many(to_cache, self.SIGNED_URL_TTL - self.SIGNED_URL_REUSE_MIN_REMAINING)
+
+        return Response({
+            'videos': results,
+            'denied': [video.id for video in denied],
+            'unavailable': [video.id for video in unavailable],
+            'resolving': [video.id for video in resolving],
+        })
+
+
 class VideoAbuseDetectorView(APIView):
     """
     Admin-only: return accounts with suspicious video access patterns.
-    Patterns detected:
-      1. Same video from ≥3 distinct IPs within 24 h
-      2. Total signed-URL requests > threshold in last 24 h (possible bot/scraper)
-      3. Flagged entries in VideoAccessLog
+    Patterns detected (from the hourly counters in abuse_signals):
+      1. Same video from ≥ VIDEO_ABUSE_MULTI_IP_24H distinct IPs within 24 h
+      2. Total signed-URL requests ≥ VIDEO_ABUSE_HIGH_REQUESTS_24H in 24 h (possible bot/scraper)
+      3. Flagged requests in the last 24 h
+    Thresholds can be overridden per call with ?min_requests= / ?min_ips=.
     """
     permission_classes = [IsAuthenticatedDeviceAllowed]
 
+    def _int_param(self, request, name):
+        try:
+            value = int(request.query_params.get(name))
+        except (TypeError, ValueError):
+            return None
+        return value if value > 0 else None
+
+    @db_routing.replica_view
     def get(self, request):
         if not (request.user.is_authenticated and request.user.role == 'admin'):
             return Response({'error': 'Admin only'}, status=403)
 
-        from django.utils.timezone import now
-        from datetime import timedelta
-        from django.db.models import Count
+        from datetime import datetime, timezone as dt_timezone
 
-        since = now() - timedelta(hours=24)
+        min_requests = self._int_param(request, 'min_requests') or abuse_signals.high_request_threshold()
+        min_ips = self._int_param(request, 'min_ips') or abuse_signals.multi_ip_threshold()
+        offenders = abuse_signals.top_offenders(min_requests=min_requests, min_ips=min_ips)
+
+        user_ids = {uid for uid, _n in offenders['high_frequency']}
+        user_ids |= {uid for (uid, _vid), _n in offenders['multi_ip']}
+        user_ids |= {e['user_id'] for e in offenders['flagged']}
+        users = {
+            u['id']: u
+            for u in User.objects.filter(id__in=user_ids).values('id', 'username', 'email')
+        }
+
+        def _who(uid):
+            u = users.get(uid) or {}
+            return {'user_id': uid, 'username': u.get('username'), 'email': u.get('email')}
 
-        # ── 1. Users with flagged entries ──────────────────────────────
-        flagged_logs = (
-            VideoAccessLog.objects
-            .filter(risk_level=VideoAccessLog.RISK_FLAG)
-            .select_related('user')
-            .order_by('-requested_at')[:100]
-        )
         flagged = [
             {
-                'user_id': l.user_id,
-                'username': l.user.username,
-                'email': l.user.email,
-                'video_id': l.video_id,
-                'ip': l.ip_address,
-                'at': l.requested_at.isoformat(),
-                'risk': l.risk_level,
+                **_who(e['user_id']),
+                'video_id': e['video_id'],
+                'ip': e['ip'],
+                'at': datetime.fromtimestamp(e['at'], tz=dt_timezone.utc).isoformat(),
+                'risk': e['risk'],
             }
-            for l in flagged_logs
+            for e in offenders['flagged']
         ]
-
-        # ── 2. High-frequency requesters (last 24 h) ───────────────────
-        HIGH_REQ_THRESHOLD = 30
-        high_freq = (
-            VideoAccessLog.objects
-            .filter(requested_at__gte=since)
-            .values('user_id', 'user__username', 'user__email')
-            .annotate(total=Count('id'))
-            .filter(total__gte=HIGH_REQ_THRESHOLD)
-            .order_by('-total')
-        )
         high_freq_list = [
-            {
-                'user_id': r['user_id'],
-                'username': r['user__username'],
-                'email': r['user__email'],
-                'requests_24h': r['total'],
-            }
-            for r in high_freq
+            {**_who(uid), 'requests_24h': n}
+            for uid, n in offenders['high_frequency']
         ]
-
-        # ── 3. Multi-IP per video in 24 h ──────────────────────────────
-        multi_ip = (
-            VideoAccessLog.objects
-            .filter(requested_at__gte=since)
-            .values('user_id', 'user__username', 'user__email', 'video_id')
-            .annotate(distinct_ips=Count('ip_address', distinct=True))
-            .filter(distinct_ips__gte=3)
-            .order_by('-distinct_ips')
-        )
         multi_ip_list = [
-            {
-                'user_id': r['user_id'],
-                'username': r['user__username'],
-                'email': r['user__email'],
-                'video_id': r['video_id'],
-                'distinct_ips_24h': r['distinct_ips'],
-            }
-            for r in multi_ip
+            {**_who(uid), 'video_id': vid, 'distinct_ips_24h': n}
+            for (uid, vid), n in offenders['multi_ip']
         ]
 
         return Response({
             'flagged_entries': flagged,
             'high_frequency_users': high_freq_list,
             'multi_ip_access': multi_ip_list,
-            'since': since.isoformat(),
+            'since': datetime.fromtimestamp(offenders['since'], tz=dt_timezone.utc).isoformat(),
+            'thresholds': {'min_requests': min_requests, 'min_ips': min_ips},
+        })
+
+
+class VideoUploadStatusView(APIView):
+    """Staff-only: progress of a background Bunny upload (polled by the admin UI)."""
+    permission_classes = [IsStaffUser]
+
+    def get(self, request, upload_id):
+        row = VideoUpload.objects.filter(id=upload_id).first()
+        if row is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(video_upload.upload_payload(row))
+
+
+class VideoUploadRetryView(APIView):
+    """Staff-only: resume a failed Bunny upload from the offset Bunny already has."""
+    permission_classes = [IsStaffUser]
+
+    def post(self, request, upload_id):
+        row = VideoUpload.objects.filter(id=upload_id).first()
+        if row is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        if row.status != VideoUpload.STATUS_FAILED:
+            return Response(
+                {'error': f'Upload is {row.status}; only failed uploads can be retried'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        video_upload.retry_upload(row)
+        return Response(video_upload.upload_payload(row), status=status.HTTP_202_ACCEPTED)
+
+
+class MetricsView(APIView):
+    """Staff-only: request and outbound HTTP metrics for this process in Prometheus text format."""
+    permission_classes = [IsStaffUser]
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class BackgroundJobListView(APIView):
+    """Staff-only: recent background jobs, filterable by ?status= and ?name=."""
+    permission_classes = [IsStaffUser]
+
+    def get(self, request):
+        qs = BackgroundJob.objects.all()
+        job_status = request.query_params.get('status')
+        name = request.query_params.get('name')
+        if job_status:
+            qs = qs.filter(status=job_status)
+        if name:
+            qs = qs.filter(name=name)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 500)
+        except (TypeError, ValueError):
+            limit = 100
+        counts = dict(
+            BackgroundJob.objects.values_list('status').annotate(n=Count('id')).values_list('status', 'n')
+        )
+        return Response({
+            'counts': counts,
+            'results': [jobs.job_payload(row) for row in qs[:limit]],
         })
+
+
+class BackgroundJobDetailView(APIView):
+    """Staff-only: one background job."""
+    permission_classes = [IsStaffUser]
+
+    def get(self, request, job_id):
+        row = BackgroundJob.objects.filter(id=job_id).first()
+        if row is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(jobs.job_payload(row))
+
+
+class BackgroundJobRetryView(APIView):
+    """Staff-only: queue a failed job again with a fresh set of attempts."""
+    permission_classes = [IsStaffUser]
+
+    def post(self, request, job_id):
+        row = BackgroundJob.objects.filter(id=job_id).first()
+        if row is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if row.status != BackgroundJob.STATUS_FAILED:
+            return Response(
+                {'error': f'Job is {row.status}; only failed jobs can be retried'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        row = jobs.requeue(row)
+        return Response(jobs.job_payload(row), status=status.HTTP_202_ACCEPTED)
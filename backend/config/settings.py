@@ -4,6 +4,7 @@ Django settings for educational platform backend.
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
@@ -28,6 +29,26 @@ def _normalize_database_url(url: str) -> str:
     except Exception:
         return url
 
+
+def _database_from_url(url: str) -> dict:
+    # Always-on Gunicorn (Render Starter) should reuse connections. Opening a new
+    # SSL session to Neon in us-west-2 from Frankfurt costs ~1s on every request.
+    is_neon = "neon.tech" in url.lower() or "pooler" in url.lower()
+    db = dj_database_url.parse(
+        url,
+        conn_max_age=300,
+        ssl_require=is_neon or "sslmode" in url.lower(),
+    )
+    if "sqlite" in db["ENGINE"]:
+        return db
+    db.setdefault("OPTIONS", {})
+    db["OPTIONS"].setdefault("connect_timeout", 15)
+    if is_neon:
+        db["DISABLE_SERVER_SIDE_CURSORS"] = True
+    db["CONN_HEALTH_CHECKS"] = True
+    return db
+
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -67,8 +88,10 @@ if os.environ.get('USE_CLOUDINARY', 'false').lower() == 'true':
     INSTALLED_APPS += ['cloudinary_storage', 'cloudinary']
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',  # Per-view latency/query/cache/bytes metrics + Server-Timing
+    'api.query_budget.QueryBudgetMiddleware',  # Query ceilings / N+1 warnings per view (QUERY_BUDGET_MODE)
     'django.middleware.security.SecurityMiddleware',
-    'django.middleware.gzip.GZipMiddleware',  # Compress JSON/API responses
+    'api.middleware.RangeAwareGZipMiddleware',  # Compress JSON/API responses (not byte-range file streams)
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -77,6 +100,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaStickinessMiddleware',  # Read-your-writes when DATABASE_REPLICA_URL is set
 ]
 
 # Cache chapter dashboard content (videos/files/lessons). Prefer Redis when set.
@@ -85,7 +109,7 @@ _redis_url = (os.environ.get('REDIS_URL') or '').strip()
 if _redis_url:
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'BACKEND': 'api.cache_backends.InstrumentedRedisCache',
             'LOCATION': _redis_url,
             'KEY_PREFIX': 'qk',
             'TIMEOUT': 60 * 15,
@@ -94,13 +118,21 @@ if _redis_url:
 else:
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'BACKEND': 'api.cache_backends.InstrumentedLocMemCache',
             'LOCATION': 'qodrat-api',
             'TIMEOUT': 60 * 15,
             'OPTIONS': {'MAX_ENTRIES': 2000},
         }
     }
 
+# Request metrics (staff-only /api/metrics/, Prometheus text) and Server-Timing headers
+# (sent to staff users only, or to everyone when DEBUG).
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').strip().lower() == 'true'
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'true').strip().lower() == 'true'
+
+# Query budgets (api/query_budgets.py) and N+1 detection: off | log (staging) | raise (tests).
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'off').strip().lower()
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -125,25 +157,23 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {'default': {}}
 _db_url = _normalize_database_url((os.environ.get('DATABASE_URL') or '').strip())
 if _db_url:
-    # Always-on Gunicorn (Render Starter) should reuse connections. Opening a new
-    # SSL session to Neon in us-west-2 from Frankfurt costs ~1s on every request.
-    _is_neon = "neon.tech" in _db_url.lower() or "pooler" in _db_url.lower()
-    DATABASES["default"] = dj_database_url.parse(
-        _db_url,
-        conn_max_age=300,
-        ssl_require=_is_neon or "sslmode" in _db_url.lower(),
-    )
-    DATABASES["default"].setdefault("OPTIONS", {})
-    DATABASES["default"]["OPTIONS"].setdefault("connect_timeout", 15)
-    if _is_neon:
-        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
-    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["default"] = _database_from_url(_db_url)
 else:
     DATABASES["default"] = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
     }
 
+# Optional read-only replica (e.g. a Neon read replica endpoint). Only views marked
+# with api.db_routing.replica_view read from it; writes always go to "default".
+_replica_url = _normalize_database_url((os.environ.get('DATABASE_REPLICA_URL') or '').strip())
+if _replica_url:
+    DATABASES["replica"] = _database_from_url(_replica_url)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ['api.db_routing.ReplicaRouter']
+# After a successful POST/PUT/PATCH/DELETE, that user's replica reads use the primary for this long.
+REPLICA_READ_AFTER_WRITE_SECONDS = int(os.environ.get('REPLICA_READ_AFTER_WRITE_SECONDS', '10'))
+
 # Custom User Model
 AUTH_USER_MODEL = 'api.User'
 
@@ -187,6 +217,8 @@ if _use_cloudinary:
         'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET', '').strip(),
     }
     DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Signed Cloudinary file URLs are reused for this long per process (0 = sign every time).
+CLOUDINARY_SIGNED_URL_TTL_SECONDS = int(os.environ.get('CLOUDINARY_SIGNED_URL_TTL_SECONDS', '3600'))
 
 # Bunny Stream (video hosting & security)
 BUNNY_LIBRARY_ID = os.environ.get('BUNNY_LIBRARY_ID', '').strip()
@@ -195,6 +227,33 @@ BUNNY_SECURITY_KEY = os.environ.get('BUNNY_SECURITY_KEY', '').strip()
 BUNNY_STREAM_API_KEY = os.environ.get('BUNNY_STREAM_API_KEY', '').strip()
 BUNNY_CDN_HOSTNAME = os.environ.get('BUNNY_CDN_HOSTNAME', '').strip()  # e.g. vz-xxxxx.b-cdn.net
 
+# Follow-up work (e.g. Tiger Test wrong answers, Bunny uploads) is queued as
+# BackgroundJob rows and run by a worker after the response; set to false to
+# run queued jobs inline right after commit.
+DEFER_BACKGROUND_WORK = os.environ.get('DEFER_BACKGROUND_WORK', 'true').strip().lower() == 'true'
+# Run a job worker thread inside each web process. Turn off when a separate
+# `python manage.py run_worker` service handles the queue.
+JOBS_IN_PROCESS_WORKER = os.environ.get('JOBS_IN_PROCESS_WORKER', 'true').strip().lower() == 'true'
+JOBS_POLL_SECONDS = float(os.environ.get('JOBS_POLL_SECONDS', '5'))
+# Running jobs not finished after this long are assumed lost with their worker and requeued.
+JOBS_STALE_AFTER_SECONDS = int(os.environ.get('JOBS_STALE_AFTER_SECONDS', '3600'))
+
+# Video abuse detector thresholds (24 h window)
+VIDEO_ABUSE_HIGH_REQUESTS_24H = int(os.environ.get('VIDEO_ABUSE_HIGH_REQUESTS_24H', '30'))
+VIDEO_ABUSE_MULTI_IP_24H = int(os.environ.get('VIDEO_ABUSE_MULTI_IP_24H', '3'))
+
+# Local disk cache for study files proxied from Cloudinary (LRU, 0 disables).
+FILE_CACHE_DIR = os.environ.get('FILE_CACHE_DIR', '').strip() or os.path.join(tempfile.gettempdir(), 'file-cache')
+FILE_CACHE_MAX_BYTES = int(os.environ.get('FILE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Admin video files wait here until the background TUS upload to Bunny finishes.
+VIDEO_UPLOAD_SPOOL_DIR = os.environ.get('VIDEO_UPLOAD_SPOOL_DIR', '').strip() or os.path.join(tempfile.gettempdir(), 'video-upload-spool')
+
+# Outbound HTTP (Bunny, Cloudinary, Telegram JWKS): keep-alive connections per host.
+OUTBOUND_HTTP_MAX_PER_HOST = int(os.environ.get('OUTBOUND_HTTP_MAX_PER_HOST', '8'))
+# "host=origin,..." redirects a host's calls, e.g. video.bunnycdn.com=http://127.0.0.1:8765 for a stub server.
+OUTBOUND_HTTP_OVERRIDES = os.environ.get('OUTBOUND_HTTP_OVERRIDES', '').strip()
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -258,6 +317,8 @@ else:
         CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
+# Range reads of /api/files/<id>/content/ from the frontend origin (PDF.js) need these.
+CORS_EXPOSE_HEADERS = ['Accept-Ranges', 'Content-Length', 'Content-Range']
 
 # If you ever switch to cookie-based auth, CSRF must trust the frontend origin.
 # Even with Token auth, this is harmless and prevents CSRF issues if SessionAuth is used.
@@ -275,5 +336,6 @@ CSRF_TRUSTED_ORIGINS = list(set(
 CSRF_TRUSTED_ORIGINS = [o.strip() for o in CSRF_TRUSTED_ORIGINS if o.strip()]
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
+# Larger uploads are streamed to a temp file instead of held in memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
@@ -9,3 +9,21 @@ graceful_timeout = 30
 keepalive = 5
 max_requests = 1000
 max_requests_jitter = 50
+
+
+def worker_exit(server, worker):
+    # Write queued VideoAccessLog rows before the worker goes away.
+    try:
+        from api.access_log import flush_access_log
+    except Exception:
+        return
+    flush_access_log()
+
+
+def post_worker_init(worker):
+    # Pick up queued background jobs (incl. ones left from before a restart).
+    try:
+        from api.jobs import start_worker_thread
+    except Exception:
+        return
+    start_worker_thread()
@@ -275,18 +275,6 @@ function SectionTimer({ sessionId, initialSeconds, onExpire }) {
     return () => clearInterval(id);
   }, [sessionId]);
 
-  useEffect(() => {
-    if (!sessionId) return;
-    const id = setInterval(() => {
-      backendApi
-        .syncTigerTestSession(sessionId, {
-          section_time_remaining: remainingRef.current,
-        })
-        .catch(() => {});
-    }, 20000);
-    return () => clearInterval(id);
-  }, [sessionId]);
-
   return (
     <div className="tiger-test-timer-box">
       <div className="tiger-test-timer-label">الوقت المتبقي</div>